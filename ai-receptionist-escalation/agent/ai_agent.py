@@ -1,35 +1,30 @@
 """
 LiveKit AI Receptionist Agent
 Handles incoming calls, checks knowledge base, and escalates unknown questions
+
+Importing this module is cheap and has no side effects: LiveKit and the
+provider plugins are imported when a worker starts (main) or a call
+arrives (entrypoint), and .env.local is loaded by main().
 """
 
 import asyncio
 import os
-from livekit import agents
-from livekit.agents import (
-    JobContext,
-    WorkerOptions,
-    cli,
-    llm,
-)
-from livekit.agents.voice import Agent, AgentSession
-from livekit.plugins import openai, silero
-try:
-    # Prefer Deepgram when available (for STT/TTS)
-    from livekit.plugins import deepgram
-except Exception:
-    deepgram = None
-from dotenv import load_dotenv
+from typing import TYPE_CHECKING
 
+from agent.answer_listener import get_answer_listener
 from agent.help_request import HelpRequestService
-from agent.knowledge_base import KnowledgeBaseManager
+from agent.pipeline import warm_pipeline
+from agent.retrieval import PREFETCH_INSTRUCTIONS, KBPrefetcher, prefetch_enabled
+from agent.tenants import DEFAULT_PROFILE, get_tenant_kbs, get_tenant_registry
+from agent.tools import make_tool_handlers, get_tool_executor
+from agent.tts_cache import get_audio_cache, say, warm_for_call
+from utils.tracing import record_pipeline_metrics, span, start_call, start_metrics_server
 
-# Load environment variables
-load_dotenv('.env.local')
+if TYPE_CHECKING:
+    from livekit.agents import JobContext, JobProcess
 
 # Initialize services (lazy initialization to handle errors gracefully)
 help_service = None
-kb_manager = None
 
 def get_help_service():
     """Lazy initialization of help service"""
@@ -42,40 +37,19 @@ def get_help_service():
             help_service = None
     return help_service
 
-def get_kb_manager():
-    """Lazy initialization of KB manager"""
-    global kb_manager
-    if kb_manager is None:
-        try:
-            kb_manager = KnowledgeBaseManager()
-        except Exception as e:
-            print(f"⚠️ Warning: Could not initialize KB manager: {e}")
-            kb_manager = None
-    return kb_manager
-
-# Salon business context prompt
-SALON_PROMPT = """You are a friendly and professional AI receptionist for a hair salon called "Glamour Cuts".
-
-Business Information:
-- Hours: Monday-Saturday 9am-7pm, Sunday 10am-6pm
-- Services: Haircuts, coloring, highlights, perms, styling, keratin treatments
-- Location: Downtown area, street parking available
-- Booking: Appointments preferred, walk-ins welcome
-- Contact: Phone or online booking available
-
-Your role:
-1. Greet callers warmly and professionally
-2. Answer questions about services, hours, pricing, and booking
-3. If you don't know an answer, you must escalate it by calling the request_help function
-4. Before answering questions about specific services or pricing, check your knowledge base
-5. Be helpful, concise, and friendly
-
-Important: You have access to a knowledge base. For any question about specific services, pricing, or treatments that you're not sure about, 
-you should first check the knowledge base. If the information is not found, you must call the request_help function.
-"""
+def get_kb_manager(tenant: str = None):
+    """Warm KB manager for a tenant (kept in a per-process LRU)"""
+    try:
+        return get_tenant_kbs().get(tenant)
+    except Exception as e:
+        print(f"⚠️ Warning: Could not initialize KB manager: {e}")
+        return None
+
+# Salon business context prompt (the default tenant; see agent/tenants.py)
+SALON_PROMPT = DEFAULT_PROFILE.prompt
 
 
-def extract_caller_info(ctx: JobContext) -> str:
+def extract_caller_info(ctx: 'JobContext') -> str:
     """Extract caller phone number from room metadata or generate default"""
     # In real implementation, this would come from LiveKit room metadata
     # For now, we'll use a default or generate from participant
@@ -90,162 +64,113 @@ def extract_caller_info(ctx: JobContext) -> str:
     return os.getenv('DEFAULT_CALLER_PHONE', '+1234567890')
 
 
-def prewarm(ctx: JobContext):
-    """Pre-initialize services"""
+def prewarm(proc: 'JobProcess'):
+    """Pre-initialize services and the shared voice pipeline"""
     print("🔥 Pre-warming agent services...")
     try:
-        get_help_service()
-        get_kb_manager()
+        warm_pipeline(proc.userdata)
+    except Exception as e:
+        # entrypoint retries and surfaces the configuration error per call
+        print(f"⚠️ Warning: Could not warm voice pipeline: {e}")
+    try:
+        service = get_help_service()
+        if service is not None:
+            # Duplicate questions are matched against this live view, not a query per escalation
+            service.pending_hub.start()
+        get_kb_manager(get_tenant_registry().default.tenant_id)
+        get_tool_executor()
+        # Subscribed here so the first escalation doesn't wait on its initial snapshot
+        get_answer_listener().start()
+        get_audio_cache()
+        start_metrics_server()
         print("✅ Services initialized successfully")
     except Exception as e:
         print(f"⚠️ Warning during prewarm: {e}")
 
 
-async def entrypoint(ctx: JobContext):
+async def entrypoint(ctx: 'JobContext'):
     """Main entry point for LiveKit agent"""
-    print(f"📞 Incoming call in room: {ctx.room.name if hasattr(ctx.room, 'name') else 'unknown'}")
-    
+    from livekit.agents import llm
+    from livekit.agents.voice import AgentSession
+
+    from agent.receptionist import ReceptionistAgent
+
+    room_name = ctx.room.name if hasattr(ctx.room, 'name') else 'unknown'
+    print(f"📞 Incoming call in room: {room_name}")
+
+    # Every span from here on (tools, storage calls) is tagged with this call
+    call = start_call(room=room_name)
+
     # Connect to room first
-    await ctx.connect()
+    with span('call.connect'):
+        await ctx.connect()
     print("✅ Connected to room")
     
     # Wait for participant to connect
-    await ctx.wait_for_participant()
+    with span('call.wait_participant'):
+        await ctx.wait_for_participant()
     print("✅ Participant connected")
     
     # Get caller phone (for help requests)
     caller_phone = extract_caller_info(ctx)
+    call.caller = caller_phone
     print(f"📱 Caller: {caller_phone}")
+
+    # Which business this call is for (room metadata, then a tenant_<id> room name)
+    tenant = get_tenant_registry().resolve(room_name, getattr(ctx.room, 'metadata', None))
+    print(f"🏢 Tenant: {tenant.tenant_id} ({tenant.name})")
     
     # Initialize services
-    kb_mgr = get_kb_manager()
+    kb_mgr = get_kb_manager(tenant.tenant_id)
     help_svc = get_help_service()
     
-    # Create function tools for LLM
-    def check_knowledge_base(question: str) -> str:
-        """Check if we have information about the caller's question in our knowledge base.
-        
-        Args:
-            question: The question the caller is asking
-            
-        Returns:
-            The answer if found, or empty string if not found
-        """
-        if not kb_mgr:
-            return ""
-        try:
-            answer = kb_mgr.check_knowledge(question)
-            if answer:
-                print(f"✅ Found answer in KB for: '{question}'")
-                return answer
-            else:
-                print(f"❌ No answer found in KB for: '{question}'")
-                return ""
-        except Exception as e:
-            print(f"⚠️ Error checking KB: {e}")
-            return ""
-    
-    def request_help(question: str) -> str:
-        """Request help from supervisor when you don't know the answer to a question.
-        
-        Call this function when the caller asks something you cannot answer from your knowledge base.
-        
-        Args:
-            question: The question the caller is asking that you cannot answer
-            
-        Returns:
-            Confirmation message
-        """
-        if not help_svc:
-            print("⚠️ Help service not available, cannot create request")
-            return "I apologize, but I'm having trouble processing your request right now."
-        
-        try:
-            print(f"🆘 Requesting help for question: '{question}'")
-            request_id = help_svc.create_request(question, caller_phone)
-            print(f"✅ Help request created: {request_id}")
-            return "Let me check with my supervisor and get back to you on that."
-        except Exception as e:
-            print(f"❌ Error creating help request: {e}")
-            return "I apologize, but I'm having trouble processing your request right now."
-    
-    # Initialize voice components (prefer Deepgram if configured)
-    vad = silero.VAD.load()
-    use_deepgram = bool(os.getenv("DEEPGRAM_API_KEY")) and deepgram is not None
+    # Supervisor answers that arrive while the caller is still connected are spoken
+    loop = asyncio.get_running_loop()
+    answer_listener = get_answer_listener()
+    session = None
+    waiting_on = set()
+    escalations = 0
 
-    llm_instance = None
+    def speak_answer(request_id: str, request: dict):
+        waiting_on.discard(request_id)
+        if session is None or not ctx.room.isconnected:
+            return
+        print(f"🗣️ Supervisor answered {request_id} during the call")
+        session.say(
+            f"Thanks for holding. I just heard back about your question, \"{request['question']}\". "
+            f"{request['supervisor_answer']}"
+        )
 
-    if use_deepgram:
-        print("🟦 Using Deepgram STT/TTS")
-        stt = deepgram.STT(model="nova-2")
-        try:
-            tts = deepgram.TTS(model="aura-asteria-en")
-        except TypeError:
-            tts = deepgram.TTS()
-
-        # LLM selection (FREE first): Groq → OpenAI → Anthropic
-        if os.getenv("GROQ_API_KEY"):
-            try:
-                print("🟢 Using Groq LLM (FREE tier!)")
-                from livekit.plugins.openai import LLM as OpenAICompatLLM
-                original_openai_key = os.environ.get("OPENAI_API_KEY")
-                original_base_url = os.environ.get("OPENAI_BASE_URL")
-                os.environ["OPENAI_API_KEY"] = os.getenv("GROQ_API_KEY")
-                os.environ["OPENAI_BASE_URL"] = "https://api.groq.com/openai/v1"
-                try:
-                    llm_instance = OpenAICompatLLM(model="llama-3.1-8b-instant")
-                    print("✅ Groq LLM initialized successfully")
-                finally:
-                    if original_openai_key is not None:
-                        os.environ["OPENAI_API_KEY"] = original_openai_key
-                    else:
-                        os.environ.pop("OPENAI_API_KEY", None)
-                    if original_base_url is not None:
-                        os.environ["OPENAI_BASE_URL"] = original_base_url
-                    else:
-                        os.environ.pop("OPENAI_BASE_URL", None)
-            except Exception as e:
-                print(f"⚠️ Groq LLM failed: {e}")
-
-        if llm_instance is None and os.getenv("OPENAI_API_KEY"):
-            try:
-                print("🟧 Using OpenAI LLM (Deepgram STT/TTS + OpenAI LLM)")
-                from livekit.plugins import openai as _openai
-                llm_instance = _openai.LLM(model="gpt-4o-mini")
-            except Exception as e:
-                print(f"⚠️ OpenAI LLM failed: {e}")
-
-        if llm_instance is None and os.getenv("ANTHROPIC_API_KEY"):
-            try:
-                print("🟦 Trying Anthropic Claude LLM...")
-                from livekit.plugins.openai import LLM as OpenAICompatLLM
-                llm_instance = OpenAICompatLLM(model="claude-3-5-haiku-latest")
-                print("✅ Using Anthropic Claude LLM")
-            except Exception as e:
-                print(f"⚠️ Anthropic LLM failed: {e}")
-
-        if llm_instance is None:
-            raise RuntimeError(
-                "\n❌ LLM required but not available!\n"
-                "Deepgram provides STT/TTS but not LLM.\n\n"
-                "🆓 FREE OPTION (recommended): Add GROQ_API_KEY from https://console.groq.com/\n"
-                "Or add OPENAI_API_KEY / ANTHROPIC_API_KEY, or remove DEEPGRAM_API_KEY to use OpenAI for all."
-            )
-    else:
-        # No Deepgram → require OpenAI for STT/TTS
-        if not os.getenv("OPENAI_API_KEY"):
-            raise RuntimeError(
-                "\n❌ No voice provider configured.\n"
-                "Set one of these in .env.local:\n"
-                "  - DEEPGRAM_API_KEY (uses Deepgram STT/TTS + Groq/OpenAI/Claude for LLM)\n"
-                "  - OPENAI_API_KEY (uses OpenAI STT/TTS/LLM)\n"
-            )
-
-        print("🟧 Using OpenAI STT/TTS/LLM (Deepgram not configured)")
-        stt = openai.STT()
-        tts = openai.TTS(voice="alloy")
-        llm_instance = openai.LLM(model="gpt-4o-mini")
+    def on_answer(request_id: str, request: dict):
+        # Called on the listener thread; the session belongs to this event loop
+        loop.call_soon_threadsafe(speak_answer, request_id, request)
+
+    def on_escalated(request_id: str):
+        nonlocal escalations
+        escalations += 1
+        waiting_on.add(request_id)
+        answer_listener.watch(request_id, on_answer)
+
+    # Tool handlers run blocking data access off the event loop
+    check_knowledge_base, request_help = make_tool_handlers(
+        kb_mgr, help_svc, caller_phone, tenant=tenant.tenant_id, on_escalated=on_escalated,
+    )
     
+    # Voice components were built once for this worker process in prewarm
+    pipeline = warm_pipeline(ctx.proc.userdata)
+    vad, stt, llm_instance = pipeline.vad, pipeline.stt, pipeline.llm
+    tts = pipeline.tts_for(tenant.voice)
+
+    # Greeting and frequent KB answers replay from the on-disk TTS cache (TTS_CACHE)
+    audio_cache = get_audio_cache()
+    speech_cache = None
+    warm_task = None
+    if audio_cache is not None:
+        speech_cache = (audio_cache, pipeline.voice_provider, pipeline.voice_name(tenant.voice))
+        if kb_mgr is not None:
+            audio_cache.watch(kb_mgr)
+        warm_task = asyncio.create_task(warm_for_call(audio_cache, kb_mgr, tts, *speech_cache[1:], tenant.greeting))
+
     # Create function tools using function_tool decorator
     from livekit.agents.llm import function_tool
     
@@ -255,7 +180,7 @@ async def entrypoint(ctx: JobContext):
     )
     async def check_kb_tool(question: str) -> str:
         """Check knowledge base for question"""
-        return check_knowledge_base(question)
+        return await check_knowledge_base(question)
     
     @function_tool(
         name="request_help",
@@ -263,20 +188,28 @@ async def entrypoint(ctx: JobContext):
     )
     async def request_help_tool(question: str) -> str:
         """Request help from supervisor"""
-        return request_help(question)
+        return await request_help(question)
     
     tools = [check_kb_tool, request_help_tool]
     
+    # Optional KB retrieval before each LLM turn (KB_PREFETCH), saving the tool-call round trip,
+    # started speculatively on interim transcripts with KB_SPECULATE
+    prefetcher = KBPrefetcher(kb_mgr) if prefetch_enabled() and kb_mgr is not None else None
+    instructions = tenant.prompt + PREFETCH_INSTRUCTIONS if prefetcher else tenant.prompt
+
     # Create chat context with system message
     chat_ctx = llm.ChatContext()
     chat_ctx.add_message(
         role="system",
-        content=SALON_PROMPT,
+        content=instructions,
     )
     
     # Create agent with all components
-    agent = Agent(
-        instructions=SALON_PROMPT,
+    agent = ReceptionistAgent(
+        prefetcher=prefetcher,
+        speech_cache=speech_cache,
+        llm_router=pipeline.router,
+        instructions=instructions,
         chat_ctx=chat_ctx,
         tools=tools,
         vad=vad,
@@ -292,15 +225,60 @@ async def entrypoint(ctx: JobContext):
         llm=llm_instance,
         tts=tts,
     )
-    await session.start(agent, room=ctx.room)
+
+    # Per-turn STT/LLM/TTS timings from LiveKit, next to our own spans
+    @session.on("metrics_collected")
+    def _on_metrics(ev):
+        record_pipeline_metrics(ev.metrics)
+
+    @session.on("user_input_transcribed")
+    def _on_transcript(ev):
+        if getattr(ev, 'is_final', False):
+            call.next_turn()
+        elif prefetcher is not None:
+            # Deepgram interim hypotheses: start the KB lookup before the caller finishes
+            prefetcher.on_interim(ev.transcript)
+
+    with span('call.session_start'):
+        await session.start(agent, room=ctx.room)
     
     print("✅ Agent started and ready to handle conversation")
+    await say(session, tenant.greeting, *(speech_cache or ()))
     
     # Keep running until room disconnects
     while ctx.room.isconnected:
         await asyncio.sleep(1)
 
+    # Hung up before the supervisor answered: the SMS still goes out
+    for request_id in list(waiting_on):
+        answer_listener.unwatch(request_id, on_answer)
 
-if __name__ == "__main__":
-    # Run agent via LiveKit CLI
+    if kb_mgr is not None:
+        print(f"📊 KB answer cache: {kb_mgr.cache_stats()}")
+    if audio_cache is not None:
+        if warm_task is not None and not warm_task.done():
+            warm_task.cancel()
+        if kb_mgr is not None:
+            audio_cache.record_demand(kb_mgr.tenant, kb_mgr.take_answer_hits())
+        print(f"📊 TTS cache: {audio_cache.stats()}")
+    if prefetcher is not None:
+        print(f"📊 KB prefetch: {prefetcher.stats()}")
+    if pipeline.router is not None:
+        print(f"📊 LLM router: {pipeline.router.stats()}")
+    # One record per call for comparing runs with KB_PREFETCH on and off
+    with span('call.end', kb_prefetch=prefetcher is not None, turns=call.turn, escalations=escalations):
+        pass
+
+
+def main():
+    """Run the agent worker via the LiveKit CLI"""
+    from dotenv import load_dotenv
+    from livekit.agents import WorkerOptions, cli
+
+    # Job processes inherit the environment from the worker
+    load_dotenv('.env.local')
     cli.run_app(WorkerOptions(entrypoint_fnc=entrypoint, prewarm_fnc=prewarm))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,154 @@
+"""
+Delivers supervisor answers to callers who are still on the line.
+
+One AnswerListener per worker process holds a single subscription to the
+storage backend's pending-queue change stream (the same one the supervisor's
+live pending page uses) and routes changes to the calls waiting on each
+request ID. When a watched request leaves the queue, one read tells whether
+it was answered; if so, every callback registered for it gets the answer.
+
+The worker starts it in prewarm, so watch() on the escalation path only
+registers a callback and never touches storage.
+"""
+
+import threading
+from collections import OrderedDict
+
+from utils.change_events import split_path
+
+
+DEPARTED_MAX = 1000
+
+
+class AnswerListener:
+    def __init__(self, storage=None, source=None):
+        if storage is None:
+            from utils.storage import get_storage
+            storage = get_storage()
+        self.storage = storage
+        self.source = source
+        self._lock = threading.Lock()
+        self._watchers: dict[str, list] = {}
+        # Requests seen leaving the queue, for a watch() that arrives just after
+        self._departed: OrderedDict[str, None] = OrderedDict()
+        self._registration = None
+
+    def watch(self, request_id: str, callback):
+        """Call callback(request_id, request) once the request is answered.
+
+        Runs on the listener's thread, so callers hand it over to their own
+        event loop (see ai_agent.entrypoint).
+        """
+        with self._lock:
+            self._watchers.setdefault(request_id, []).append(callback)
+            started = self._registration is not None
+            departed = request_id in self._departed
+        if not started:
+            # prewarm didn't start it: don't block the caller on the first snapshot
+            threading.Thread(target=self.start, name='answer-listener-start', daemon=True).start()
+        elif departed:
+            # Answered before the watch was registered
+            threading.Thread(target=self._check, args=(request_id,), daemon=True).start()
+
+    def unwatch(self, request_id: str, callback=None):
+        """Stop waiting (e.g. the caller hung up); all callbacks when callback is None"""
+        with self._lock:
+            callbacks = self._watchers.get(request_id, [])
+            if callback is not None and callback in callbacks:
+                callbacks.remove(callback)
+            if callback is None or not callbacks:
+                self._watchers.pop(request_id, None)
+
+    def watching(self) -> list[str]:
+        with self._lock:
+            return list(self._watchers)
+
+    def stop(self):
+        with self._lock:
+            registration, self._registration = self._registration, None
+        if registration is not None:
+            registration.close()
+
+    def start(self):
+        """Subscribe to the pending change stream (blocks on its first snapshot)"""
+        with self._lock:
+            if self._registration is not None:
+                return
+            source = self.source or self.storage.pending_event_source()
+            if source is None:
+                print("⚠️ Storage has no pending change stream, answers will only go out by SMS")
+                return
+            self._registration = _Starting()
+        try:
+            registration = source.listen(self._on_event)
+        except Exception as e:
+            print(f"⚠️ Could not listen for supervisor answers: {e}")
+            registration = None
+        with self._lock:
+            self._registration = registration
+
+    # Change stream
+
+    def _on_event(self, event):
+        try:
+            parts = split_path(event.path)
+            if not parts:
+                # Full snapshot: anything watched that isn't pending anymore
+                pending = event.data or {}
+                for request_id in self.watching():
+                    if request_id not in pending:
+                        self._check(request_id)
+            elif event.event_type == 'patch':
+                for child_path, value in (event.data or {}).items():
+                    self._changed(parts + split_path(child_path), value)
+            else:
+                self._changed(parts, event.data)
+        except Exception as e:
+            print(f"⚠️ Answer listener failed on {event.event_type} {event.path}: {e}")
+
+    def _changed(self, parts: list[str], data):
+        request_id = parts[0]
+        if not (len(parts) == 1 and data is None or len(parts) == 2 and parts[1] == 'status' and data != 'pending'):
+            return
+        if request_id in self._watchers:
+            self._check(request_id)
+            return
+        with self._lock:
+            self._departed[request_id] = None
+            if len(self._departed) > DEPARTED_MAX:
+                self._departed.popitem(last=False)
+        if request_id in self._watchers:
+            # watch() registered in between
+            self._check(request_id)
+
+    def _check(self, request_id: str):
+        request = self.storage.get_help_request(request_id)
+        if request is None or request.get('status') == 'pending':
+            return
+        with self._lock:
+            callbacks = self._watchers.pop(request_id, [])
+        if request.get('status') != 'resolved':
+            return
+        for callback in callbacks:
+            try:
+                callback(request_id, request)
+            except Exception as e:
+                print(f"⚠️ Answer callback for {request_id} failed: {e}")
+
+
+class _Starting:
+    """Placeholder registration while the first snapshot is being read"""
+
+    def close(self):
+        pass
+
+
+_answer_listener = None
+
+
+def get_answer_listener() -> AnswerListener:
+    """Process-wide listener shared by every call in the worker"""
+    global _answer_listener
+    if _answer_listener is None:
+        _answer_listener = AnswerListener()
+    return _answer_listener
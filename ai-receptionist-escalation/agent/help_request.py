@@ -1,18 +1,64 @@
-from utils.firebase_client import FirebaseClient
-from utils.notification import NotificationService
+import os
+import threading
+
+from utils.storage import get_storage, subscribers_of, tenant_key
+from utils.notification_queue import get_notification_queue
 from agent.knowledge_base import KnowledgeBaseManager
+from utils.kb_index import KnowledgeBaseIndex, normalize
+from utils.tracing import span
+
+# Near-identical questions only: a wrong merge sends one caller another's
+# answer ("mens haircut" vs "womens haircut" scores ~0.7)
+COALESCE_THRESHOLD = float(os.getenv('REQUEST_COALESCE_THRESHOLD', 0.9))
+
 
 class HelpRequestService:
-    def __init__(self):
-        self.firebase = FirebaseClient()
-        self.notification = NotificationService()
-        self.kb = KnowledgeBaseManager()
+    def __init__(self, storage=None, notification=None, kb=None, coalesce: bool = None, pending_hub=None):
+        self.storage = storage or get_storage()
+        self.notification = notification or get_notification_queue()
+        self.kb = kb or KnowledgeBaseManager(storage=self.storage)
+        if coalesce is None:
+            coalesce = os.getenv('REQUEST_COALESCE', 'true').lower() != 'false'
+        self.coalesce = coalesce
+        self._pending_hub = pending_hub
+        # Open questions per tenant, matched with the KB's scorer
+        self._pending_indexes: dict[str, KnowledgeBaseIndex] = {}
+        # Requests created here that the hub may not have seen yet: {id: (tenant, question)}
+        self._recent: dict[str, tuple[str, str]] = {}
+        # Creations in flight: {(tenant, normalized question): _InFlight}
+        self._creating: dict[tuple[str, str], _InFlight] = {}
+        # Guards the in-memory state above only, never held across storage I/O
+        self._create_lock = threading.Lock()
+
+    @property
+    def pending_hub(self):
+        """Live view of the pending queue that questions are matched against"""
+        if self._pending_hub is None:
+            from utils.pending_hub import PendingQueueHub
+            self._pending_hub = PendingQueueHub(self.storage)
+        return self._pending_hub
 
-    def create_request(self, question: str, caller_phone: str) -> str:
-        """Create help request and notify supervisor"""
-        request_id = self.firebase.create_help_request(question, caller_phone)
+    def create_request(self, question: str, caller_phone: str, tenant: str = None) -> str:
+        """Create help request and notify supervisor.
 
-        # Notify supervisor
+        A question matching one that is already waiting for the supervisor
+        joins that request instead; its caller is texted the same answer.
+        """
+        tenant = tenant_key(tenant)
+        in_flight = None
+        if self.coalesce:
+            with span('help.coalesce') as tags:
+                request_id, in_flight = self._join_open_request(question, caller_phone, tenant)
+                if request_id:
+                    tags['status'] = 'joined'
+                    print(f"🔗 Caller {caller_phone} joined open request {request_id}")
+                    print(f"   Q: {question}")
+                    return request_id
+
+        with span('storage.create_help_request'):
+            request_id = self._create(question, caller_phone, tenant, in_flight)
+
+        # Notify supervisor (queued, delivered in the background)
         self.notification.notify_supervisor(request_id, question, caller_phone)
 
         print(f"🆘 Help request created: {request_id}")
@@ -21,10 +67,78 @@ class HelpRequestService:
 
         return request_id
 
+    def find_open_request(self, question: str, tenant: str = None):
+        """ID of a pending request of this tenant asking the same question, or None"""
+        tenant = tenant_key(tenant)
+        pending = self.pending_hub.questions(tenant)
+        with self._create_lock:
+            return self._match(question, tenant, pending)
+
+    def _match(self, question: str, tenant: str, pending: dict):
+        """Best open request for the question (caller holds _create_lock; no I/O)"""
+        for request_id, (recent_tenant, recent_question) in list(self._recent.items()):
+            if request_id in pending:
+                # The hub has it now
+                del self._recent[request_id]
+            elif recent_tenant == tenant:
+                pending[request_id] = recent_question
+        index = self._pending_indexes.setdefault(tenant, KnowledgeBaseIndex())
+        # Only requests created since the last call get normalized
+        index.sync({request_id: {'question': q, 'answer': request_id} for request_id, q in pending.items()})
+        matches = index.search_top_k(question, 1, COALESCE_THRESHOLD, substring=False)
+        return matches[0][2] if matches else None
+
+    def _join_open_request(self, question: str, caller_phone: str, tenant: str):
+        """Subscribe the caller to a matching open request.
+
+        Returns (request_id, None) on success. Otherwise (None, in_flight),
+        where in_flight is this caller's claim on creating the question
+        (None if it can't be claimed).
+        """
+        key = (tenant, normalize(question))
+        pending = self.pending_hub.questions(tenant)
+        with self._create_lock:
+            in_flight = self._creating.get(key)
+            if in_flight is None:
+                request_id = self._match(question, tenant, pending)
+                if request_id is None:
+                    # Same question from another caller here waits for ours
+                    self._creating[key] = _InFlight(key)
+                    return None, self._creating[key]
+
+        if in_flight is not None:
+            # Someone in this worker is creating this exact question right now
+            in_flight.done.wait(10)
+            request_id = in_flight.request_id
+
+        if request_id and self.storage.add_subscriber(request_id, caller_phone):
+            return request_id, None
+        if request_id:
+            # Resolved or timed out since we last saw it
+            with self._create_lock:
+                self._recent.pop(request_id, None)
+        return None, None
+
+    def _create(self, question: str, caller_phone: str, tenant: str, in_flight: '_InFlight' = None) -> str:
+        request_id = None
+        try:
+            request_id = self.storage.create_help_request(question, caller_phone, tenant)
+            with self._create_lock:
+                self._recent[request_id] = (tenant, question)
+            return request_id
+        finally:
+            if in_flight is not None:
+                in_flight.request_id = request_id
+                with self._create_lock:
+                    if self._creating.get(in_flight.key) is in_flight:
+                        del self._creating[in_flight.key]
+                in_flight.done.set()
+
     def respond_to_request(self, request_id: str, answer: str):
         """Supervisor provides answer - update KB and notify customer"""
-        # Get original request
-        request_data = self.firebase.get_ref(f'help_requests/{request_id}').get()
+        # Resolve and learn in one atomic write (guards the pending check too)
+        with span('storage.resolve_request'):
+            request_data = self.storage.resolve_request(request_id, answer)
 
         if not request_data:
             raise ValueError(f"Request {request_id} not found")
@@ -33,20 +147,28 @@ class HelpRequestService:
             print(f"⚠️ Request {request_id} already {request_data['status']}")
             return
 
-        # Update request as resolved
-        self.firebase.update_request_with_answer(request_id, answer)
+        # The KB entry is keyed by the request ID (other tenants' managers
+        # pick it up through their own KB version)
+        if tenant_key(request_data.get('tenant_id')) == self.kb.tenant:
+            self.kb.apply_learned_answer(
+                request_id,
+                request_data['question'],
+                answer,
+                request_id
+            )
+
+        # Simulate text back to every caller waiting on this question, in one batch
+        message = f"Re: '{request_data['question']}'\n\n{answer}"
+        phones = subscribers_of(request_data)
+        self.notification.text_customers([(phone, message) for phone in phones])
+
+        print(f"✅ Request {request_id} resolved and KB updated ({len(phones)} caller(s) notified)")
 
-        # Add to knowledge base
-        self.kb.add_learned_answer(
-            request_data['question'], 
-            answer, 
-            request_id
-        )
 
-        # Simulate text back to customer
-        self.notification.text_customer(
-            request_data['caller_phone'],
-            f"Re: '{request_data['question']}'\n\n{answer}"
-        )
+class _InFlight:
+    """A help request being created; waiters join it once it exists"""
 
-        print(f"✅ Request {request_id} resolved and KB updated")
\ No newline at end of file
+    def __init__(self, key: tuple[str, str]):
+        self.key = key
+        self.done = threading.Event()
+        self.request_id = None
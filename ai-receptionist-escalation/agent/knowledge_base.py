@@ -1,18 +1,199 @@
-from utils.firebase_client import FirebaseClient
+import atexit
+import os
+import threading
+from collections import Counter
+
+from utils.answer_cache import AnswerCache
+from utils.storage import get_storage, tenant_key, DEFAULT_TENANT, PROJECT_ROOT
+from utils.kb_replica import KnowledgeBaseReplica
+from utils.tracing import span
 
 class KnowledgeBaseManager:
-    def __init__(self):
-        self.firebase = FirebaseClient()
+    def __init__(self, live_sync: bool = False, storage=None, match_mode: str = None, tenant: str = None):
+        self.storage = storage or get_storage()
+        # KB partition this manager reads and writes (see agent/tenants.py)
+        self.tenant = tenant_key(tenant)
+        self.replica = None
+        # 'fuzzy' (token/difflib scorer) or 'semantic' (vector search, fuzzy fallback)
+        self.match_mode = (match_mode or os.getenv('KB_MATCH_MODE', 'fuzzy')).lower()
+        self.vectors = None
+        self._vectors_live = False
+        self._vectors_lock = threading.Lock()
+        # Repeated caller questions (and repeated misses) skip the lookup entirely
+        self.cache = AnswerCache()
+        # Answers given since the last take_answer_hits() (ranks what the TTS cache pre-synthesizes)
+        self.answer_hits = Counter()
+        self._hits_lock = threading.Lock()
+        if live_sync:
+            self.start_live_sync()
+            if self.match_mode == 'semantic':
+                self.start_semantic_index()
+
+    def start_live_sync(self, source=None, timeout: float = 10.0):
+        """Keep a local KB replica warm from child change events.
+
+        `source` defaults to the storage backend's KB change stream; tests can
+        pass a LocalEventSource instead.
+        """
+        if self.replica is not None:
+            return self.replica
+        if source is None:
+            source = self.storage.kb_event_source(self.tenant)
+        if source is None:
+            print("ℹ️ Storage backend has no KB change stream, using direct lookups")
+            return None
+        self.replica = KnowledgeBaseReplica()
+        self.replica.start(source)
+        if self.replica.wait_ready(timeout):
+            print(f"🔄 KB replica live with {len(self.replica)} entries")
+        else:
+            print("⚠️ KB replica not ready yet, falling back to direct lookups until it is")
+        return self.replica
+
+    def stop_live_sync(self):
+        if self.replica is not None:
+            self.replica.stop()
+            self.replica = None
+
+    def start_semantic_index(self, path: str = None):
+        """Build the question vector matrix (reusing vectors persisted next to the KB)"""
+        from utils.kb_vectors import VectorIndex
+
+        with self._vectors_lock:
+            if self.vectors is not None:
+                return self.vectors
+            self.vector_path = path or self._default_vector_path()
+            vectors = self.vectors = VectorIndex()
+            if self.replica is not None and self.replica.is_ready():
+                # Follow the replica from the snapshot the matrix was built from
+                self.replica.subscribe(
+                    self._on_replica_change,
+                    bootstrap=lambda entries: vectors.build(entries, self.vector_path),
+                )
+                self._vectors_live = True
+            else:
+                vectors.build(self.storage.get_all_knowledge_base(self.tenant), self.vector_path)
+            self.save_vectors()
+            atexit.register(self.save_vectors)
+            return vectors
+
+    def save_vectors(self):
+        if self.vectors is not None and self.vectors.dirty:
+            try:
+                self.vectors.save(self.vector_path)
+            except Exception as e:
+                print(f"⚠️ Could not persist KB vectors: {e}")
+
+    def _default_vector_path(self):
+        suffix = '' if self.tenant == DEFAULT_TENANT else f'.{self.tenant}'
+        configured = os.getenv('KB_VECTOR_PATH')
+        if configured:
+            root, ext = os.path.splitext(configured)
+            return f'{root}{suffix}{ext}'
+        db_path = getattr(self.storage, 'db_path', None)
+        if db_path and db_path != ':memory:':
+            return f'{db_path}{suffix}.vectors.npz'
+        return os.path.join(PROJECT_ROOT, f'kb_vectors{suffix}.npz')
+
+    def _on_replica_change(self, key, data):
+        if self.vectors is None:
+            return
+        if data is None:
+            self.vectors.remove(key)
+        else:
+            self.vectors.add(key, data.get('question', ''), data.get('answer'))
 
     def check_knowledge(self, question: str) -> str | None:
         """Check if we have an answer in KB"""
-        return self.firebase.search_knowledge_base(question)
+        version = self.kb_version()
+        hit, answer = self.cache.get(question, version)
+        if not hit:
+            with span('kb.search'):
+                answer = self._lookup(question)
+            self.cache.put(question, answer, version)
+        # Cached answers count too: they are the most frequent ones
+        if answer is not None:
+            self._count_hit(answer)
+        return answer
+
+    def _count_hit(self, answer: str):
+        with self._hits_lock:
+            self.answer_hits[answer] += 1
+
+    def take_answer_hits(self) -> dict[str, int]:
+        with self._hits_lock:
+            hits, self.answer_hits = dict(self.answer_hits), Counter()
+        return hits
+
+    def kb_version(self):
+        """Version the answer cache is keyed on: the replica's when it is live, else the backend's"""
+        if self.replica is not None and self.replica.is_ready():
+            return ('replica', self.replica.version)
+        with span('storage.get_kb_version'):
+            return self.storage.get_kb_version(self.tenant)
+
+    def cache_stats(self) -> dict:
+        return self.cache.stats()
+
+    def _lookup(self, question: str) -> str | None:
+        if self.match_mode == 'semantic' and self.vectors is None:
+            self.start_semantic_index()
+        if self.vectors is not None:
+            if not self._vectors_live:
+                self.vectors.sync(self.storage.get_all_knowledge_base(self.tenant))
+            answer = self.vectors.search(question)
+            if answer:
+                return answer
+        if self.replica is not None and self.replica.is_ready():
+            return self.replica.search(question)
+        return self.storage.search_knowledge_base(question, self.tenant)
+
+    def retrieve(self, question: str, k: int = 3) -> list[tuple[str, str]]:
+        """Up to k (question, answer) KB entries relevant to a caller question, best first"""
+        if self.replica is not None and self.replica.is_ready():
+            index = self.replica.index
+        else:
+            index = self.storage.synced_kb_index(self.tenant)
+        keys = [key for _, key, _ in index.search_top_k(question, k)]
+        if self.vectors is not None:
+            # Paraphrases the token scorer misses
+            keys += [key for score, key, _ in self.vectors.search_top_k(question, k) if score >= self.vectors.threshold]
+        matches = [index.get(key) for key in dict.fromkeys(keys)]
+        matches = [match for match in matches if match is not None][:k]
+        if matches:
+            self._count_hit(matches[0][1])
+        return matches
 
     def add_learned_answer(self, question: str, answer: str, request_id: str = None):
         """Store new learned Q&A"""
-        self.firebase.add_to_knowledge_base(question, answer, request_id)
+        key = self.storage.add_to_knowledge_base(question, answer, request_id, tenant=self.tenant)
+        self.apply_learned_answer(key, question, answer, request_id)
+
+    def add_learned_answers(self, entries: list[dict]) -> list[str]:
+        """Store a batch of Q&A in one write and index just those entries"""
+        keys = self.storage.add_kb_entries(entries, tenant=self.tenant)
+        if self.replica is not None:
+            for key, entry in zip(keys, entries):
+                self.replica.child_added(key, {
+                    'question': entry['question'].lower().strip(),
+                    'answer': entry.get('answer'),
+                    'learned_from_request_id': entry.get('learned_from_request_id'),
+                })
+        self.cache.clear()
+        return keys
+
+    def apply_learned_answer(self, key: str, question: str, answer: str, request_id: str = None):
+        """Reflect a Q&A the storage layer already saved"""
+        if self.replica is not None and key:
+            # Visible locally right away; the listener echo is idempotent
+            self.replica.child_added(key, {
+                'question': question.lower().strip(),
+                'answer': answer,
+                'learned_from_request_id': request_id,
+            })
+        self.cache.clear()
         print(f"📚 Added to KB: Q='{question[:50]}...' A='{answer[:50]}...'")
 
     def get_all_learned_answers(self):
         """Get all KB entries for display"""
-        return self.firebase.get_all_knowledge_base()
\ No newline at end of file
+        return self.storage.get_all_knowledge_base(self.tenant)
@@ -0,0 +1,209 @@
+"""
+Per-turn LLM routing across the configured providers (Groq, OpenAI, Anthropic).
+
+With LLM_ROUTER=true the pipeline builds every provider that has a key,
+and ReceptionistAgent.llm_node sends each turn through LLMRouter instead
+of the single LLM picked at setup:
+
+- Each provider keeps a rolling window (LLM_ROUTER_WINDOW turns) of time
+  to first chunk and of errors. A turn goes to the healthy provider with
+  the lowest p95. Providers that have not been measured yet keep their
+  configured order behind the measured ones.
+- A provider whose error rate reaches LLM_ROUTER_MAX_ERROR_RATE is skipped
+  for LLM_ROUTER_COOLDOWN_SECONDS after its last error.
+- If a provider fails before its first chunk, the turn fails over to the
+  next one. After the first chunk the reply is already being spoken, so a
+  failure is recorded and raised.
+- With LLM_HEDGE_MS set, a turn with no first chunk by that deadline also
+  starts on the next provider. Whichever answers first is used and the
+  other request is cancelled. The loser's elapsed time counts as a latency
+  sample, so a provider that has turned slow drops down the ranking.
+"""
+
+import asyncio
+import os
+import time
+from collections import deque
+
+from utils.tracing import record
+
+
+def router_enabled() -> bool:
+    return os.getenv('LLM_ROUTER', 'false').lower() == 'true'
+
+
+def _percentile(samples, pct: float) -> float:
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))]
+
+
+class ProviderHealth:
+    """Rolling time-to-first-chunk and error window for one provider"""
+
+    def __init__(self, window: int):
+        self.latencies = deque(maxlen=window)
+        self.outcomes = deque(maxlen=window)  # True = ok
+        self.last_error = None
+
+    def success(self, seconds: float):
+        self.latencies.append(seconds)
+        self.outcomes.append(True)
+
+    def slow(self, seconds: float):
+        """Cancelled by a faster hedge: at least this slow"""
+        self.latencies.append(seconds)
+
+    def error(self, now: float):
+        self.outcomes.append(False)
+        self.last_error = now
+
+    def p95(self) -> float | None:
+        return _percentile(self.latencies, 95) if self.latencies else None
+
+    def error_rate(self) -> float:
+        if not self.outcomes:
+            return 0.0
+        return self.outcomes.count(False) / len(self.outcomes)
+
+
+class LLMRouter:
+    def __init__(self, providers: dict, hedge_after: float = None, window: int = None,
+                 max_error_rate: float = None, cooldown: float = None, clock=time.monotonic):
+        """`providers` maps names to LLM clients, in fallback order"""
+        self.providers = dict(providers)
+        if hedge_after is None:
+            hedge_after = float(os.getenv('LLM_HEDGE_MS', 0)) / 1000
+        self.hedge_after = hedge_after or None
+        window = window or int(os.getenv('LLM_ROUTER_WINDOW', 50))
+        self.max_error_rate = max_error_rate if max_error_rate is not None else float(
+            os.getenv('LLM_ROUTER_MAX_ERROR_RATE', 0.5))
+        self.cooldown = cooldown if cooldown is not None else float(os.getenv('LLM_ROUTER_COOLDOWN_SECONDS', 30))
+        self.clock = clock
+        self.health = {name: ProviderHealth(window) for name in self.providers}
+        self.turns = 0
+        self.hedges = 0
+        self.hedge_wins = 0
+        self.failovers = 0
+
+    def healthy(self, name: str) -> bool:
+        health = self.health[name]
+        if health.error_rate() < self.max_error_rate or health.last_error is None:
+            return True
+        return self.clock() - health.last_error >= self.cooldown
+
+    def ranked(self) -> list[str]:
+        """Providers to try for the next turn, best first (unhealthy ones last)"""
+        order = list(self.providers)
+
+        def rank(name):
+            p95 = self.health[name].p95()
+            return (not self.healthy(name), p95 is None, p95 or 0.0, order.index(name))
+
+        return sorted(order, key=rank)
+
+    async def stream(self, open_stream):
+        """Chunks from the first provider to answer; `open_stream(llm)` is an async iterator of chunks"""
+        self.turns += 1
+        candidates = self.ranked()
+        in_flight = []  # [name, iterator, started, first-chunk task]
+        winner = None
+        first = None
+        hedged = False
+        last_error = None
+
+        def launch():
+            name = candidates.pop(0)
+            iterator = open_stream(self.providers[name]).__aiter__()
+            task = asyncio.ensure_future(iterator.__anext__())
+            in_flight.append([name, iterator, self.clock(), task])
+            return name
+
+        try:
+            primary = launch()
+            while winner is None:
+                if not in_flight:
+                    if not candidates:
+                        raise last_error or RuntimeError("No LLM provider available")
+                    self.failovers += 1
+                    print(f"🔀 LLM failover to {launch()}")
+                    continue
+                timeout = None
+                if self.hedge_after and not hedged and candidates:
+                    timeout = max(0.0, in_flight[0][2] + self.hedge_after - self.clock())
+                done, _ = await asyncio.wait([a[3] for a in in_flight], timeout=timeout,
+                                             return_when=asyncio.FIRST_COMPLETED)
+                if not done:
+                    hedged = True
+                    self.hedges += 1
+                    launch()
+                    continue
+                for attempt in [a for a in in_flight if a[3] in done]:
+                    name, _, started, task = attempt
+                    error = task.exception()
+                    if error is None or isinstance(error, StopAsyncIteration):
+                        if winner is None:
+                            # A second one answering in the same tick is closed with the losers
+                            in_flight.remove(attempt)
+                            winner = attempt
+                            first = None if error else task.result()
+                        continue
+                    in_flight.remove(attempt)
+                    self.health[name].error(self.clock())
+                    last_error = error
+                    print(f"⚠️ LLM {name} failed: {error}")
+
+            name, iterator, started, _ = winner
+            ttft = self.clock() - started
+            self.health[name].success(ttft)
+            record('llm_router_ttft', ttft, provider=name)
+            if hedged and name != primary:
+                self.hedge_wins += 1
+            await self._cancel(in_flight)
+            if first is None:
+                return
+            yield first
+            try:
+                async for chunk in iterator:
+                    yield chunk
+            except Exception:
+                self.health[name].error(self.clock())
+                raise
+        finally:
+            await self._cancel(in_flight)
+
+    async def _cancel(self, in_flight: list):
+        """Cancel requests that lost the race, counting the time they had taken"""
+        while in_flight:
+            name, iterator, started, task = in_flight.pop()
+            task.cancel()
+            await asyncio.wait([task])
+            self.health[name].slow(self.clock() - started)
+            aclose = getattr(iterator, 'aclose', None)
+            if aclose is not None:
+                try:
+                    await aclose()
+                except Exception:
+                    pass
+
+    def stats(self) -> dict:
+        return {
+            'turns': self.turns,
+            'hedges': self.hedges,
+            'hedge_wins': self.hedge_wins,
+            'failovers': self.failovers,
+            'providers': {
+                name: {
+                    'p95_ms': round(health.p95() * 1000, 1) if health.p95() is not None else None,
+                    'error_rate': round(health.error_rate(), 3),
+                    'healthy': self.healthy(name),
+                }
+                for name, health in self.health.items()
+            },
+        }
+
+
+async def chat_chunks(llm_instance, chat_ctx, tools, model_settings):
+    """What Agent.default.llm_node streams, for one given LLM"""
+    async with llm_instance.chat(chat_ctx=chat_ctx, tools=tools, tool_choice=model_settings.tool_choice) as stream:
+        async for chunk in stream:
+            yield chunk
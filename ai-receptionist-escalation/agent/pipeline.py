@@ -0,0 +1,172 @@
+"""
+Voice pipeline components shared by every call in a worker process.
+
+prewarm() builds the Silero VAD and the STT/TTS/LLM provider clients once
+and keeps them in proc.userdata; each entrypoint reuses them instead of
+reloading the VAD model and opening new HTTP clients per call. Provider
+credentials are passed to the client constructors explicitly, so nothing
+touches os.environ while sessions are starting.
+"""
+
+import os
+
+from agent.llm_router import LLMRouter, router_enabled
+
+GROQ_BASE_URL = "https://api.groq.com/openai/v1"
+ANTHROPIC_BASE_URL = "https://api.anthropic.com/v1/"
+
+GROQ_MODEL = "llama-3.1-8b-instant"
+OPENAI_MODEL = "gpt-4o-mini"
+ANTHROPIC_MODEL = "claude-3-5-haiku-latest"
+
+
+class VoicePipeline:
+    """VAD + STT + LLM + TTS, safe to share between concurrent sessions"""
+
+    def __init__(self, vad, stt, llm, tts, description: str, tts_factory=None,
+                 voice_provider: str = None, default_voice: str = None, router: LLMRouter = None):
+        self.vad = vad
+        self.stt = stt
+        self.llm = llm
+        self.tts = tts
+        self.description = description
+        self.tts_factory = tts_factory
+        # Which audio a TTS client produces, for the TTS cache key
+        self.voice_provider = voice_provider
+        self.default_voice = default_voice
+        # Per-turn routing over every configured LLM (LLM_ROUTER), None to always use `llm`
+        self.router = router
+        self._voices = {}
+
+    def tts_for(self, voice: str = None):
+        """TTS client for a tenant's voice, built once per voice per process"""
+        if not voice or self.tts_factory is None:
+            return self.tts
+        if voice not in self._voices:
+            try:
+                self._voices[voice] = self.tts_factory(voice)
+            except Exception as e:
+                print(f"⚠️ Voice '{voice}' unavailable, using the default: {e}")
+                self._voices[voice] = self.tts
+        return self._voices[voice]
+
+    def voice_name(self, voice: str = None) -> str:
+        """Voice tts_for(voice) actually speaks with"""
+        if not voice or self.tts_for(voice) is self.tts:
+            return self.default_voice
+        return voice
+
+
+def deepgram_available() -> bool:
+    try:
+        from livekit.plugins import deepgram  # noqa: F401
+    except Exception:
+        return False
+    return True
+
+
+def select_providers(env=None, has_deepgram: bool = None) -> dict:
+    """Decide which providers to use from the configured API keys.
+
+    Returns {'voice': 'deepgram' | 'openai', 'llm': [candidates in order]}.
+    """
+    env = os.environ if env is None else env
+    if has_deepgram is None:
+        has_deepgram = deepgram_available()
+
+    if env.get("DEEPGRAM_API_KEY") and has_deepgram:
+        # LLM selection (FREE first): Groq → OpenAI → Anthropic
+        candidates = [name for name, key in (
+            ('groq', 'GROQ_API_KEY'), ('openai', 'OPENAI_API_KEY'), ('anthropic', 'ANTHROPIC_API_KEY'),
+        ) if env.get(key)]
+        if not candidates:
+            raise RuntimeError(
+                "\n❌ LLM required but not available!\n"
+                "Deepgram provides STT/TTS but not LLM.\n\n"
+                "🆓 FREE OPTION (recommended): Add GROQ_API_KEY from https://console.groq.com/\n"
+                "Or add OPENAI_API_KEY / ANTHROPIC_API_KEY, or remove DEEPGRAM_API_KEY to use OpenAI for all."
+            )
+        return {'voice': 'deepgram', 'llm': candidates}
+
+    # No Deepgram → require OpenAI for STT/TTS
+    if not env.get("OPENAI_API_KEY"):
+        raise RuntimeError(
+            "\n❌ No voice provider configured.\n"
+            "Set one of these in .env.local:\n"
+            "  - DEEPGRAM_API_KEY (uses Deepgram STT/TTS + Groq/OpenAI/Claude for LLM)\n"
+            "  - OPENAI_API_KEY (uses OpenAI STT/TTS/LLM)\n"
+        )
+    return {'voice': 'openai', 'llm': ['openai']}
+
+
+def build_llm(provider: str, env=None):
+    """OpenAI-compatible LLM client with explicit credentials (no env mutation)"""
+    from livekit.plugins import openai
+
+    env = os.environ if env is None else env
+    if provider == 'groq':
+        return openai.LLM(model=GROQ_MODEL, api_key=env["GROQ_API_KEY"], base_url=GROQ_BASE_URL)
+    if provider == 'anthropic':
+        return openai.LLM(model=ANTHROPIC_MODEL, api_key=env["ANTHROPIC_API_KEY"], base_url=ANTHROPIC_BASE_URL)
+    return openai.LLM(model=OPENAI_MODEL, api_key=env["OPENAI_API_KEY"])
+
+
+def build_pipeline(env=None) -> VoicePipeline:
+    from livekit.plugins import openai, silero
+
+    env = os.environ if env is None else env
+    plan = select_providers(env)
+    vad = silero.VAD.load()
+
+    if plan['voice'] == 'deepgram':
+        from livekit.plugins import deepgram
+
+        print("🟦 Using Deepgram STT/TTS")
+        stt = deepgram.STT(model="nova-2", api_key=env["DEEPGRAM_API_KEY"])
+        default_voice = "aura-asteria-en"
+        try:
+            tts = deepgram.TTS(model=default_voice, api_key=env["DEEPGRAM_API_KEY"])
+        except TypeError:
+            tts = deepgram.TTS()
+
+        def tts_factory(voice):
+            return deepgram.TTS(model=voice, api_key=env["DEEPGRAM_API_KEY"])
+    else:
+        print("🟧 Using OpenAI STT/TTS/LLM (Deepgram not configured)")
+        stt = openai.STT(api_key=env["OPENAI_API_KEY"])
+        default_voice = "alloy"
+        tts = openai.TTS(voice=default_voice, api_key=env["OPENAI_API_KEY"])
+
+        def tts_factory(voice):
+            return openai.TTS(voice=voice, api_key=env["OPENAI_API_KEY"])
+
+    # The router needs every provider; otherwise the first that initializes is enough
+    route = router_enabled()
+    llms = {}
+    for provider in plan['llm']:
+        try:
+            llms[provider] = build_llm(provider, env)
+            print(f"✅ {provider.capitalize()} LLM initialized")
+            if not route:
+                break
+        except Exception as e:
+            print(f"⚠️ {provider.capitalize()} LLM failed: {e}")
+    if not llms:
+        raise RuntimeError(f"❌ Could not initialize any LLM ({', '.join(plan['llm'])})")
+    provider, llm_instance = next(iter(llms.items()))
+    router = LLMRouter(llms) if len(llms) > 1 else None
+    if router is not None:
+        provider = '/'.join(llms)
+        print(f"🔀 Routing LLM turns across {provider}")
+
+    return VoicePipeline(vad, stt, llm_instance, tts, f"{plan['voice']} voice + {provider} LLM", tts_factory,
+                         voice_provider=plan['voice'], default_voice=default_voice, router=router)
+
+
+def warm_pipeline(userdata: dict) -> VoicePipeline:
+    """Build the pipeline once per worker process and cache it in proc.userdata"""
+    pipeline = userdata.get('pipeline')
+    if pipeline is None:
+        pipeline = userdata['pipeline'] = build_pipeline()
+        print(f"🔥 Voice pipeline warm: {pipeline.description}")
+    return pipeline
@@ -0,0 +1,40 @@
+"""
+The LiveKit Agent used for every call (imported by entrypoint, not at worker start).
+"""
+
+from livekit.agents import llm
+from livekit.agents.voice import Agent
+
+from agent.llm_router import chat_chunks
+from agent.retrieval import KBPrefetcher
+from agent.tts_cache import cached_tts_node
+
+
+class ReceptionistAgent(Agent):
+    """Agent that can add matching KB entries to each turn before the LLM runs"""
+
+    def __init__(self, *, prefetcher: KBPrefetcher = None, speech_cache=None, llm_router=None, **kwargs):
+        super().__init__(**kwargs)
+        self.prefetcher = prefetcher
+        self.llm_router = llm_router
+        # (AudioCache, provider, voice) when replies that match cached text replay its audio
+        self.speech_cache = speech_cache
+
+    async def on_user_turn_completed(self, turn_ctx: llm.ChatContext, new_message: llm.ChatMessage) -> None:
+        if self.prefetcher is None:
+            return
+        context = await self.prefetcher.context_for(new_message.text_content)
+        if context:
+            turn_ctx.add_message(role="assistant", content=context)
+
+    async def llm_node(self, chat_ctx, tools, model_settings):
+        if self.llm_router is None:
+            return Agent.default.llm_node(self, chat_ctx, tools, model_settings)
+        return self.llm_router.stream(lambda llm_instance: chat_chunks(llm_instance, chat_ctx, tools, model_settings))
+
+    async def tts_node(self, text, model_settings):
+        if self.speech_cache is None:
+            return Agent.default.tts_node(self, text, model_settings)
+        return cached_tts_node(
+            text, lambda stream: Agent.default.tts_node(self, stream, model_settings), *self.speech_cache,
+        )
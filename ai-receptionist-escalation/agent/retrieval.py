@@ -0,0 +1,197 @@
+"""
+Proactive KB retrieval before each LLM turn.
+
+With KB_PREFETCH=true the agent runs the KB matcher on every final caller
+transcript and adds the top matching Q&A pairs to that turn's context, so
+the LLM can answer in one pass instead of first calling
+check_knowledge_base and then generating again. The tools stay available;
+request_help is still how unknown questions get escalated.
+
+Each call logs a `call.end` span tagged with kb_prefetch, turns and
+escalations, so runs with the flag on and off can be compared on latency
+(receptionist_pipeline_seconds llm_ttft) and escalation rate.
+
+With KB_SPECULATE=true as well, the lookup starts on interim STT
+hypotheses once they stop changing for KB_SPECULATE_STABLE_MS, and the
+final transcript reuses that result when it matches, so the KB context is
+usually ready by the time the caller stops talking.
+"""
+
+import asyncio
+import os
+
+from agent.tools import ToolExecutor, get_tool_executor
+from utils.kb_index import normalize
+
+PREFETCH_INSTRUCTIONS = """
+Relevant knowledge base entries are added to the conversation before each of your turns.
+Answer from them directly when they cover the caller's question; you don't need to call
+check_knowledge_base for those. If they don't cover it, call request_help.
+"""
+
+
+def prefetch_enabled() -> bool:
+    return os.getenv('KB_PREFETCH', 'false').lower() == 'true'
+
+
+def speculation_enabled() -> bool:
+    return os.getenv('KB_SPECULATE', 'false').lower() == 'true'
+
+
+def format_kb_context(matches: list[tuple[str, str]]) -> str:
+    if not matches:
+        return "Knowledge base: no entry matches the caller's last question."
+    lines = ["Knowledge base entries relevant to the caller's last question:"]
+    for question, answer in matches:
+        lines.append(f"Q: {question}\nA: {answer}")
+    return '\n'.join(lines)
+
+
+def _transcript_key(text: str) -> str:
+    return normalize(text).strip()
+
+
+class SpeculativeLookup:
+    """Starts a lookup on a stable interim transcript; the final one reuses it if it matches.
+
+    A hypothesis is stable once no different interim text has arrived for
+    `stable_seconds`. A newer stable hypothesis cancels the lookup for the
+    old one. Everything runs on the session's event loop.
+    """
+
+    def __init__(self, lookup, stable_seconds: float = None, min_words: int = None):
+        self.lookup = lookup
+        if stable_seconds is None:
+            stable_seconds = float(os.getenv('KB_SPECULATE_STABLE_MS', 150)) / 1000
+        self.stable_seconds = stable_seconds
+        self.min_words = min_words or int(os.getenv('KB_SPECULATE_MIN_WORDS', 3))
+        self._timer = None
+        self._timer_key = None
+        self._current = None  # (transcript key, task)
+        self.started = 0
+        self.hits = 0
+        self.misses = 0
+        self.cancelled = 0
+        self.unused = 0
+
+    def on_interim(self, text: str):
+        key = _transcript_key(text)
+        if len(key.split()) < self.min_words:
+            return
+        if key == self._timer_key or (self._current and self._current[0] == key and self._timer is None):
+            return
+        self._cancel_timer()
+        self._timer_key = key
+        self._timer = asyncio.get_running_loop().call_later(self.stable_seconds, self._launch, key, text)
+
+    def _launch(self, key: str, text: str):
+        self._timer = self._timer_key = None
+        self._discard_current()
+        self._current = (key, asyncio.ensure_future(self.lookup(text)))
+        self.started += 1
+
+    async def result_for(self, text: str):
+        """Result for the final transcript, reusing the speculative lookup when it matches"""
+        self._cancel_timer()
+        key = _transcript_key(text)
+        if self._current and self._current[0] == key:
+            _, task = self._current
+            self._current = None
+            self.hits += 1
+            try:
+                # Shielded, so cancelling the turn doesn't look like a cancelled speculation
+                return await asyncio.shield(task)
+            except asyncio.CancelledError:
+                if not task.cancelled():
+                    # The turn itself was cancelled (e.g. the caller interrupted)
+                    task.cancel()
+                    raise
+        else:
+            self._discard_current()
+            self.misses += 1
+        return await self.lookup(text)
+
+    def _cancel_timer(self):
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = self._timer_key = None
+
+    def _discard_current(self):
+        if self._current is None:
+            return
+        _, task = self._current
+        self._current = None
+        if task.done():
+            self.unused += 1
+        else:
+            task.cancel()
+            self.cancelled += 1
+
+    def stats(self) -> dict:
+        finals = self.hits + self.misses
+        return {
+            'speculated': self.started,
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': round(self.hits / finals, 3) if finals else 0.0,
+            # Lookups that ran (or were cut short) for a hypothesis the caller didn't end on
+            'wasted': self.cancelled + self.unused,
+            'cancelled': self.cancelled,
+        }
+
+
+class KBPrefetcher:
+    """Runs KnowledgeBaseManager.retrieve off the event loop for one call"""
+
+    def __init__(self, kb_mgr, executor: ToolExecutor = None, k: int = None, timeout: float = None,
+                 speculate: bool = None):
+        self.kb = kb_mgr
+        self.executor = executor or get_tool_executor()
+        self.k = k or int(os.getenv('KB_PREFETCH_TOP_K', 3))
+        self.timeout = timeout if timeout is not None else float(os.getenv('KB_LOOKUP_TIMEOUT_SECONDS', 2.0))
+        if speculate is None:
+            speculate = speculation_enabled()
+        self.speculation = SpeculativeLookup(self.matches_for) if speculate else None
+        self.turns = 0
+        self.hits = 0
+
+    def on_interim(self, transcript: str):
+        """Feed an interim STT hypothesis (no-op unless speculation is on)"""
+        if self.speculation is not None:
+            self.speculation.on_interim(transcript)
+
+    async def matches_for(self, transcript: str) -> list[tuple[str, str]] | None:
+        """Top-k (question, answer) pairs; None if the lookup timed out"""
+        if not self.kb or not (transcript or '').strip():
+            return None
+        try:
+            return await self.executor.run(
+                self.kb.retrieve, transcript, self.k,
+                timeout=self.timeout, fallback=None, label="KB prefetch", span_name='kb.prefetch',
+            )
+        except Exception as e:
+            print(f"⚠️ KB prefetch failed: {e}")
+            return None
+
+    async def context_for(self, transcript: str) -> str | None:
+        """Text to add to the turn context, or None to leave the turn as it is"""
+        if self.speculation is not None:
+            matches = await self.speculation.result_for(transcript)
+        else:
+            matches = await self.matches_for(transcript)
+        if matches is None:
+            return None
+        self.turns += 1
+        if matches:
+            self.hits += 1
+        return format_kb_context(matches)
+
+    def stats(self) -> dict:
+        stats = {
+            'turns': self.turns,
+            'hits': self.hits,
+            'hit_rate': round(self.hits / self.turns, 3) if self.turns else 0.0,
+        }
+        if self.speculation is not None:
+            stats['speculation'] = self.speculation.stats()
+        return stats
@@ -0,0 +1,195 @@
+"""
+Business profiles for serving several salons from one deployment.
+
+Profiles come from tenants.json (TENANTS_PATH); without it there is a
+single 'default' tenant identical to the original Glamour Cuts setup. A
+call's tenant is resolved from the room metadata ({"tenant": "<id>"}) or
+a `tenant_<id>` segment in the room name, the same way extract_caller_info
+reads the caller from `caller_<phone>`.
+
+Each tenant has its own KB partition. TenantKnowledgeBases keeps one warm
+KnowledgeBaseManager (replica + index) per tenant in the worker process
+and evicts the least recently used ones when there are too many or they
+hold too many entries in total.
+"""
+
+import json
+import os
+import re
+import threading
+from collections import OrderedDict
+
+from utils.storage import DEFAULT_TENANT, PROJECT_ROOT, tenant_key
+
+PROMPT_TEMPLATE = """You are a friendly and professional AI receptionist for a hair salon called "{name}".
+
+Business Information:
+- Hours: {hours}
+- Services: {services}
+- Location: {location}
+- Booking: {booking}
+- Contact: {contact}
+
+Your role:
+1. Greet callers warmly and professionally
+2. Answer questions about services, hours, pricing, and booking
+3. If you don't know an answer, you must escalate it by calling the request_help function
+4. Before answering questions about specific services or pricing, check your knowledge base
+5. Be helpful, concise, and friendly
+
+Important: You have access to a knowledge base. For any question about specific services, pricing, or treatments that you're not sure about,
+you should first check the knowledge base. If the information is not found, you must call the request_help function.
+"""
+
+DEFAULT_BUSINESS = {
+    'name': 'Glamour Cuts',
+    'hours': 'Monday-Saturday 9am-7pm, Sunday 10am-6pm',
+    'services': 'Haircuts, coloring, highlights, perms, styling, keratin treatments',
+    'location': 'Downtown area, street parking available',
+    'booking': 'Appointments preferred, walk-ins welcome',
+    'contact': 'Phone or online booking available',
+}
+
+GREETING_TEMPLATE = "Thank you for calling {name}! How can I help you today?"
+
+# Room names look like "tenant_<id>_caller_<phone>"; the ID may contain
+# underscores (anything tenant_key accepts), so it runs up to "_caller_"
+_ROOM_TENANT = re.compile(r'(?:^|_)tenant_([A-Za-z0-9_-]{1,64}?)(?=_caller_|$)')
+
+
+class TenantProfile:
+    def __init__(self, tenant_id: str, prompt: str = None, voice: str = None,
+                 timeout_hours: float = None, greeting: str = None, **business):
+        self.tenant_id = tenant_key(tenant_id)
+        self.business = {**DEFAULT_BUSINESS, **business}
+        self.name = self.business['name']
+        self.hours = self.business['hours']
+        # Explicit prompt wins; otherwise it is filled in from the business details
+        self.prompt = prompt or PROMPT_TEMPLATE.format(**self.business)
+        self.greeting = greeting or GREETING_TEMPLATE.format(**self.business)
+        self.voice = voice
+        self.timeout_hours = timeout_hours
+
+    def __repr__(self):
+        return f"TenantProfile({self.tenant_id!r}, name={self.name!r})"
+
+
+DEFAULT_PROFILE = TenantProfile(DEFAULT_TENANT)
+
+
+class TenantRegistry:
+    def __init__(self, profiles: list[TenantProfile] = None, default: str = DEFAULT_TENANT):
+        self.profiles = {p.tenant_id: p for p in profiles or []}
+        self.profiles.setdefault(DEFAULT_TENANT, DEFAULT_PROFILE)
+        self.default = self.profiles.get(default, DEFAULT_PROFILE)
+
+    @classmethod
+    def load(cls, path: str = None) -> 'TenantRegistry':
+        """Read tenants.json: {"default": "<id>", "tenants": {"<id>": {profile fields}}}"""
+        path = path or os.getenv('TENANTS_PATH') or os.path.join(PROJECT_ROOT, 'tenants.json')
+        if not os.path.exists(path):
+            return cls()
+        with open(path) as f:
+            config = json.load(f)
+        profiles = [TenantProfile(tenant_id, **fields) for tenant_id, fields in config.get('tenants', {}).items()]
+        registry = cls(profiles, config.get('default', DEFAULT_TENANT))
+        print(f"🏢 Loaded {len(registry.profiles)} tenant profiles from {path}")
+        return registry
+
+    def get(self, tenant_id: str = None) -> TenantProfile:
+        return self.profiles.get(tenant_id) or self.default
+
+    def resolve(self, room_name: str = None, metadata=None) -> TenantProfile:
+        """Tenant for a call from room/participant metadata, then the room name"""
+        tenant_id = None
+        if metadata:
+            try:
+                data = json.loads(metadata) if isinstance(metadata, str) else metadata
+                tenant_id = data.get('tenant') or data.get('tenant_id')
+            except (ValueError, AttributeError):
+                pass
+        if not tenant_id and room_name:
+            match = _ROOM_TENANT.search(room_name)
+            if match:
+                tenant_id = match.group(1)
+        if tenant_id and tenant_id not in self.profiles:
+            print(f"⚠️ Unknown tenant '{tenant_id}', using '{self.default.tenant_id}'")
+        return self.get(tenant_id)
+
+    def timeouts(self) -> dict[str, float]:
+        """Per-tenant request timeout overrides (hours)"""
+        return {t: p.timeout_hours for t, p in self.profiles.items() if p.timeout_hours is not None}
+
+
+class TenantKnowledgeBases:
+    """LRU of warm per-tenant KnowledgeBaseManagers in one worker process"""
+
+    def __init__(self, storage=None, max_warm: int = None, max_entries: int = None, factory=None):
+        self.storage = storage
+        self.max_warm = max_warm or int(os.getenv('TENANT_KB_MAX_WARM', 8))
+        self.max_entries = max_entries or int(os.getenv('TENANT_KB_MAX_ENTRIES', 200000))
+        self.factory = factory or self._build
+        self.evictions = 0
+        self._managers: OrderedDict = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _build(self, tenant_id: str):
+        from agent.knowledge_base import KnowledgeBaseManager
+        return KnowledgeBaseManager(live_sync=True, storage=self.storage, tenant=tenant_id)
+
+    def get(self, tenant_id: str = None):
+        tenant_id = tenant_key(tenant_id)
+        with self._lock:
+            manager = self._managers.get(tenant_id)
+            if manager is not None:
+                self._managers.move_to_end(tenant_id)
+                return manager
+        manager = self.factory(tenant_id)
+        with self._lock:
+            # Another call may have warmed it meanwhile; keep the first one
+            existing = self._managers.get(tenant_id)
+            if existing is not None:
+                self._close(manager)
+                return existing
+            self._managers[tenant_id] = manager
+            self._evict()
+        return manager
+
+    def warm_tenants(self) -> list[str]:
+        return list(self._managers)
+
+    def _entries(self) -> int:
+        return sum(len(m.replica) for m in self._managers.values() if getattr(m, 'replica', None) is not None)
+
+    def _evict(self):
+        while len(self._managers) > 1 and (len(self._managers) > self.max_warm or self._entries() > self.max_entries):
+            tenant_id, manager = self._managers.popitem(last=False)
+            self._close(manager)
+            self.evictions += 1
+            print(f"♻️ Evicted warm KB for tenant '{tenant_id}'")
+
+    @staticmethod
+    def _close(manager):
+        if hasattr(manager, 'save_vectors'):
+            manager.save_vectors()
+        if hasattr(manager, 'stop_live_sync'):
+            manager.stop_live_sync()
+
+
+_registry = None
+_tenant_kbs = None
+
+
+def get_tenant_registry() -> TenantRegistry:
+    global _registry
+    if _registry is None:
+        _registry = TenantRegistry.load()
+    return _registry
+
+
+def get_tenant_kbs() -> TenantKnowledgeBases:
+    """Process-wide per-tenant KB managers"""
+    global _tenant_kbs
+    if _tenant_kbs is None:
+        _tenant_kbs = TenantKnowledgeBases()
+    return _tenant_kbs
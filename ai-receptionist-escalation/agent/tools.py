@@ -0,0 +1,144 @@
+"""
+Function tool handlers for the AI receptionist.
+
+The KB and help-request services make blocking HTTP calls, so the handlers
+run them on a bounded thread pool with per-call timeouts instead of on the
+LiveKit event loop (which also drives audio, VAD and STT for the session).
+Each handler and the call it makes on the pool are traced (utils.tracing).
+"""
+
+import asyncio
+import contextvars
+import functools
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+from utils.tracing import span
+
+HELP_FALLBACK_REPLY = "Let me check with my supervisor and get back to you on that."
+ERROR_REPLY = "I apologize, but I'm having trouble processing your request right now."
+
+
+class ToolExecutor:
+    """Bounded thread pool for blocking data-access calls"""
+
+    def __init__(self, max_workers: int = None):
+        max_workers = max_workers or int(os.getenv('TOOL_EXECUTOR_WORKERS', 8))
+        self._pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='tool-io')
+
+    async def run(self, fn, *args, timeout: float, fallback=None, cancel_on_timeout: bool = True,
+                  label: str = None, span_name: str = None):
+        """Await fn(*args) on the pool; return `fallback` if it takes longer than `timeout`.
+
+        With cancel_on_timeout the call is dropped if it has not started yet;
+        otherwise it is left to finish in the background (used for writes
+        that must still land after we have answered the caller).
+        """
+        loop = asyncio.get_running_loop()
+        # Carry the call's trace context into the worker thread
+        context = contextvars.copy_context()
+        future = loop.run_in_executor(self._pool, functools.partial(context.run, fn, *args))
+        with span(span_name or f"tool.{getattr(fn, '__name__', 'call')}") as tags:
+            try:
+                if cancel_on_timeout:
+                    return await asyncio.wait_for(future, timeout)
+                return await asyncio.wait_for(asyncio.shield(future), timeout)
+            except asyncio.TimeoutError:
+                tags['status'] = 'timeout'
+                print(f"⏱️ {label or getattr(fn, '__name__', 'tool call')} timed out after {timeout}s")
+                return fallback
+
+    def shutdown(self):
+        self._pool.shutdown(wait=False, cancel_futures=True)
+
+
+_executor = None
+
+
+def get_tool_executor() -> ToolExecutor:
+    """Process-wide executor shared by every session in the worker"""
+    global _executor
+    if _executor is None:
+        _executor = ToolExecutor()
+    return _executor
+
+
+def make_tool_handlers(kb_mgr, help_svc, caller_phone: str, executor: ToolExecutor = None, tenant: str = None,
+                       on_escalated=None):
+    """Build the check_knowledge_base / request_help coroutines for one call.
+
+    on_escalated(request_id) runs after each help request is created, e.g. to
+    wait for the supervisor's answer while the caller is still connected.
+    """
+    executor = executor or get_tool_executor()
+    kb_timeout = float(os.getenv('KB_LOOKUP_TIMEOUT_SECONDS', 2.0))
+    help_timeout = float(os.getenv('HELP_REQUEST_TIMEOUT_SECONDS', 5.0))
+
+    def check_knowledge_base(question: str) -> str:
+        """Check if we have information about the caller's question in our knowledge base.
+
+        Args:
+            question: The question the caller is asking
+
+        Returns:
+            The answer if found, or empty string if not found
+        """
+        if not kb_mgr:
+            return ""
+        try:
+            answer = kb_mgr.check_knowledge(question)
+            if answer:
+                print(f"✅ Found answer in KB for: '{question}'")
+                return answer
+            else:
+                print(f"❌ No answer found in KB for: '{question}'")
+                return ""
+        except Exception as e:
+            print(f"⚠️ Error checking KB: {e}")
+            return ""
+
+    def request_help(question: str) -> str:
+        """Request help from supervisor when you don't know the answer to a question.
+
+        Call this function when the caller asks something you cannot answer from your knowledge base.
+
+        Args:
+            question: The question the caller is asking that you cannot answer
+
+        Returns:
+            Confirmation message
+        """
+        if not help_svc:
+            print("⚠️ Help service not available, cannot create request")
+            return ERROR_REPLY
+
+        try:
+            print(f"🆘 Requesting help for question: '{question}'")
+            request_id = help_svc.create_request(question, caller_phone, tenant)
+            print(f"✅ Help request created: {request_id}")
+            if on_escalated:
+                try:
+                    on_escalated(request_id)
+                except Exception as e:
+                    print(f"⚠️ Could not watch request {request_id} for an answer: {e}")
+            return HELP_FALLBACK_REPLY
+        except Exception as e:
+            print(f"❌ Error creating help request: {e}")
+            return ERROR_REPLY
+
+    async def check_knowledge_base_async(question: str) -> str:
+        # A slow lookup reads as "not found", which steers the LLM to request_help
+        return await executor.run(
+            check_knowledge_base, question,
+            timeout=kb_timeout, fallback="", label="KB lookup",
+        )
+
+    async def request_help_async(question: str) -> str:
+        # Keep the write going past the timeout so the supervisor still sees it
+        return await executor.run(
+            request_help, question,
+            timeout=help_timeout, fallback=HELP_FALLBACK_REPLY,
+            cancel_on_timeout=False, label="Help request",
+        )
+
+    return check_knowledge_base_async, request_help_async
@@ -0,0 +1,351 @@
+"""
+On-disk cache of synthesized speech for text the agent says on every call.
+
+Audio is content-addressed by (provider, voice, text) and kept as raw
+16-bit PCM in a SQLite file (TTS_CACHE_PATH), shared by every worker
+process on the host. The total is capped at TTS_CACHE_MAX_MB; the least
+recently played entries are evicted first.
+
+What gets cached: the tenant greeting and the KB answers callers hit most
+(TTS_CACHE_WARM_ANSWERS). prewarm opens the cache; the synthesis itself
+runs in the background at the start of a call, because the TTS plugins'
+HTTP clients belong to the job's event loop. Cached audio goes straight
+into the session: the greeting through session.say(audio=...), LLM replies
+through ReceptionistAgent.tts_node when the reply matches a cached text.
+
+Entries made from a KB answer are dropped when that answer changes or is
+removed (live through the KB replica, and checked again on every warm-up).
+"""
+
+import asyncio
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+
+from utils.storage import PROJECT_ROOT, tenant_key
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS audio (
+    key TEXT PRIMARY KEY,
+    provider TEXT NOT NULL,
+    voice TEXT NOT NULL,
+    text TEXT NOT NULL,
+    pcm BLOB NOT NULL,
+    size INTEGER NOT NULL,
+    sample_rate INTEGER NOT NULL,
+    channels INTEGER NOT NULL,
+    tenant TEXT,
+    kb_key TEXT,
+    hits INTEGER NOT NULL DEFAULT 0,
+    last_used REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_audio_last_used ON audio (last_used);
+CREATE INDEX IF NOT EXISTS idx_audio_kb_key ON audio (kb_key);
+
+CREATE TABLE IF NOT EXISTS answer_demand (
+    tenant TEXT NOT NULL,
+    text TEXT NOT NULL,
+    count INTEGER NOT NULL,
+    PRIMARY KEY (tenant, text)
+);
+"""
+
+FRAME_MS = 20
+
+
+def tts_cache_enabled() -> bool:
+    return os.getenv('TTS_CACHE', 'false').lower() == 'true'
+
+
+def clean_text(text: str) -> str:
+    """Whitespace-insensitive form of spoken text (case and punctuation change the audio)"""
+    return ' '.join((text or '').split())
+
+
+def cache_key(provider: str, voice: str, text: str) -> str:
+    return hashlib.sha256(f"{provider}\0{voice}\0{clean_text(text)}".encode('utf-8')).hexdigest()
+
+
+class AudioCache:
+    def __init__(self, path: str = None, max_bytes: int = None):
+        self.path = path or os.getenv('TTS_CACHE_PATH') or os.path.join(PROJECT_ROOT, 'tts_cache.db')
+        if max_bytes is None:
+            max_bytes = int(float(os.getenv('TTS_CACHE_MAX_MB', 200)) * 1024 * 1024)
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+        self._replicas = []
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(self.path, timeout=30, check_same_thread=False, isolation_level=None)
+        if self.path != ':memory:':
+            self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.executescript(SCHEMA)
+
+    def get(self, provider: str, voice: str, text: str):
+        """(pcm, sample_rate, channels) for cached speech, else None"""
+        key = cache_key(provider, voice, text)
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT pcm, sample_rate, channels FROM audio WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+            self._conn.execute(
+                "UPDATE audio SET hits = hits + 1, last_used = ? WHERE key = ?", (time.time(), key)
+            )
+            self.hits += 1
+        return bytes(row[0]), row[1], row[2]
+
+    def contains(self, provider: str, voice: str, text: str) -> bool:
+        key = cache_key(provider, voice, text)
+        with self._lock:
+            return self._conn.execute("SELECT 1 FROM audio WHERE key = ?", (key,)).fetchone() is not None
+
+    def put(self, provider: str, voice: str, text: str, pcm: bytes, sample_rate: int, channels: int,
+            tenant: str = None, kb_key: str = None) -> bool:
+        """Store synthesized speech; False when it alone is over the size cap"""
+        if not pcm or len(pcm) > self.max_bytes:
+            return False
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO audio "
+                    "(key, provider, voice, text, pcm, size, sample_rate, channels, tenant, kb_key, last_used) "
+                    "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                    (cache_key(provider, voice, text), provider, voice, clean_text(text), pcm, len(pcm),
+                     sample_rate, channels, kb_key and tenant_key(tenant), kb_key, time.time()),
+                )
+                self._evict()
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+        return True
+
+    def _evict(self):
+        total = self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM audio").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        victims = []
+        for key, size in self._conn.execute("SELECT key, size FROM audio ORDER BY last_used"):
+            if total <= self.max_bytes:
+                break
+            victims.append((key,))
+            total -= size
+        self._conn.executemany("DELETE FROM audio WHERE key = ?", victims)
+        self.evictions += len(victims)
+
+    def texts(self, provider: str, voice: str) -> list[str]:
+        """Every cached text for one voice (what an LLM reply can be matched against)"""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT text FROM audio WHERE provider = ? AND voice = ?", (provider, voice)
+            ).fetchall()
+        return [row[0] for row in rows]
+
+    # KB answers
+
+    def record_demand(self, tenant: str, answers: dict[str, int]):
+        """Add per-answer hit counts (from KnowledgeBaseManager.take_answer_hits)"""
+        if not answers:
+            return
+        tenant = tenant_key(tenant)
+        with self._lock:
+            self._conn.executemany(
+                "INSERT INTO answer_demand (tenant, text, count) VALUES (?, ?, ?) "
+                "ON CONFLICT(tenant, text) DO UPDATE SET count = count + excluded.count",
+                [(tenant, clean_text(text), count) for text, count in answers.items()],
+            )
+
+    def demand(self, tenant: str = None) -> dict[str, int]:
+        with self._lock:
+            return dict(self._conn.execute(
+                "SELECT text, count FROM answer_demand WHERE tenant = ?", (tenant_key(tenant),)
+            ))
+
+    def on_kb_change(self, kb_key: str, data: dict | None):
+        """KB change listener: drop audio made from an answer that changed or was removed"""
+        answer = clean_text((data or {}).get('answer'))
+        with self._lock:
+            removed = self._conn.execute(
+                "DELETE FROM audio WHERE kb_key = ? AND text != ?", (kb_key, answer)
+            ).rowcount
+        self.invalidations += removed
+
+    def sync_kb(self, tenant: str, entries: dict):
+        """Drop a tenant's audio and demand for KB answers that changed while nothing was listening"""
+        tenant = tenant_key(tenant)
+        with self._lock:
+            tagged = self._conn.execute(
+                "SELECT DISTINCT kb_key FROM audio WHERE tenant = ?", (tenant,)
+            ).fetchall()
+        for (kb_key,) in tagged:
+            self.on_kb_change(kb_key, entries.get(kb_key))
+        answers = {clean_text(data.get('answer')) for data in entries.values()}
+        with self._lock:
+            gone = [(tenant, text) for (text,) in self._conn.execute(
+                "SELECT text FROM answer_demand WHERE tenant = ?", (tenant,)
+            ) if text not in answers]
+            self._conn.executemany("DELETE FROM answer_demand WHERE tenant = ? AND text = ?", gone)
+
+    def watch(self, kb_mgr):
+        """Follow a KnowledgeBaseManager's live replica (once per replica)"""
+        replica = getattr(kb_mgr, 'replica', None)
+        if replica is None or any(r is replica for r in self._replicas):
+            return
+        self._replicas.append(replica)
+        replica.subscribe(self.on_kb_change)
+
+    def stats(self) -> dict:
+        with self._lock:
+            entries, size = self._conn.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM audio").fetchone()
+        lookups = self.hits + self.misses
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': round(self.hits / lookups, 3) if lookups else 0.0,
+            'entries': entries,
+            'bytes': size,
+            'max_bytes': self.max_bytes,
+            'evictions': self.evictions,
+            'invalidations': self.invalidations,
+        }
+
+
+def warm_items(greeting: str, kb_entries: dict, demand: dict[str, int], limit: int) -> list[tuple[str, str | None]]:
+    """(text, kb_key) pairs worth having audio for: the greeting, then the most-hit KB answers"""
+    by_answer = {}
+    for key, data in kb_entries.items():
+        answer = clean_text(data.get('answer'))
+        if answer:
+            by_answer.setdefault(answer, key)
+    ranked = sorted((text for text in demand if text in by_answer), key=lambda t: (-demand[t], t))
+    items = [(greeting, None)] if greeting else []
+    return items + [(text, by_answer[text]) for text in ranked[:limit]]
+
+
+async def synthesize(tts, text: str) -> tuple[bytes, int, int]:
+    """Run a TTS plugin to completion: (pcm, sample_rate, channels)"""
+    pcm = bytearray()
+    sample_rate, channels = tts.sample_rate, tts.num_channels
+    async with tts.synthesize(text) as stream:
+        async for event in stream:
+            pcm += bytes(event.frame.data)
+            sample_rate, channels = event.frame.sample_rate, event.frame.num_channels
+    return bytes(pcm), sample_rate, channels
+
+
+async def warm_cache(cache: AudioCache, tts, provider: str, voice: str, items, tenant: str = None) -> int:
+    """Synthesize whatever in `items` isn't cached yet; returns how many were added"""
+    added = 0
+    for text, kb_key in items:
+        if await asyncio.to_thread(cache.contains, provider, voice, text):
+            continue
+        try:
+            pcm, sample_rate, channels = await synthesize(tts, text)
+        except Exception as e:
+            print(f"⚠️ Could not pre-synthesize '{text[:40]}': {e}")
+            continue
+        if await asyncio.to_thread(cache.put, provider, voice, text, pcm, sample_rate, channels, tenant, kb_key):
+            added += 1
+    if added:
+        print(f"🔊 TTS cache: {added} new clips for {provider}/{voice}")
+    return added
+
+
+async def warm_for_call(cache: AudioCache, kb_mgr, tts, provider: str, voice: str, greeting: str,
+                        limit: int = None) -> int:
+    """Make sure the greeting and the tenant's most-hit KB answers have audio"""
+    limit = limit if limit is not None else int(os.getenv('TTS_CACHE_WARM_ANSWERS', 20))
+    tenant = kb_mgr.tenant if kb_mgr is not None else None
+    # The cache file is shared between workers: its reads and writes stay off the event loop
+    demand = await asyncio.to_thread(cache.demand, tenant)
+    top = sorted(demand, key=lambda t: (-demand[t], t))[:limit]
+    kb_entries = {}
+    missing = await asyncio.to_thread(lambda: any(not cache.contains(provider, voice, text) for text in top))
+    if kb_mgr is not None and missing:
+        # Only read the KB when there is something new to synthesize
+        kb_entries = await asyncio.to_thread(kb_mgr.get_all_learned_answers) or {}
+        await asyncio.to_thread(cache.sync_kb, tenant, kb_entries)
+    return await warm_cache(cache, tts, provider, voice, warm_items(greeting, kb_entries, demand, limit), tenant)
+
+
+async def say(session, text: str, cache: AudioCache = None, provider: str = None, voice: str = None):
+    """session.say with the cached audio when there is some (looked up off the event loop)"""
+    audio = await asyncio.to_thread(cache.get, provider, voice, text) if cache is not None else None
+    if audio is None:
+        return session.say(text)
+    return session.say(text, audio=audio_frames(*audio))
+
+
+async def audio_frames(pcm: bytes, sample_rate: int, channels: int):
+    """Cached PCM as 20ms rtc.AudioFrames"""
+    from livekit import rtc
+
+    step = sample_rate * FRAME_MS // 1000 * channels * 2
+    for start in range(0, len(pcm), step):
+        chunk = pcm[start:start + step]
+        yield rtc.AudioFrame(chunk, sample_rate, channels, len(chunk) // (channels * 2))
+
+
+def could_match(buffered: str, texts: list[str]) -> bool:
+    """Whether a reply that starts with `buffered` can still end up being one of `texts`"""
+    prefix = clean_text(buffered)
+    return any(text.startswith(prefix) for text in texts)
+
+
+async def cached_tts_node(text, fallback, cache: AudioCache, provider: str, voice: str):
+    """tts_node body: replay cached audio when the whole reply is a cached text.
+
+    LLM text is held back only while it is still a prefix of some cached
+    text; as soon as it diverges, it is passed to `fallback` (the default
+    TTS node) together with the rest of the stream.
+    """
+    # SQLite reads on a file shared between workers: off the event loop
+    texts = await asyncio.to_thread(cache.texts, provider, voice)
+    stream = text.__aiter__()
+    buffered = ''
+    finished = False
+    while texts and could_match(buffered, texts):
+        try:
+            buffered += await stream.__anext__()
+        except StopAsyncIteration:
+            finished = True
+            break
+
+    if finished:
+        audio = await asyncio.to_thread(cache.get, provider, voice, buffered)
+        if audio is not None:
+            async for frame in audio_frames(*audio):
+                yield frame
+            return
+
+    async def replay():
+        if buffered:
+            yield buffered
+        if not finished:
+            async for chunk in stream:
+                yield chunk
+
+    async for frame in fallback(replay()):
+        yield frame
+
+
+_audio_cache = None
+
+
+def get_audio_cache() -> AudioCache | None:
+    """Process-wide cache, or None when TTS_CACHE is off or the file can't be opened"""
+    global _audio_cache
+    if _audio_cache is None and tts_cache_enabled():
+        try:
+            _audio_cache = AudioCache()
+        except Exception as e:
+            print(f"⚠️ TTS cache unavailable: {e}")
+    return _audio_cache
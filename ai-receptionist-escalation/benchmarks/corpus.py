@@ -0,0 +1,123 @@
+"""
+Synthetic salon-style KB corpora and caller query sets.
+
+Everything is generated from a seed, so two runs with the same arguments
+benchmark exactly the same data.
+"""
+
+import itertools
+import random
+import string
+
+SERVICES = [
+    'haircut', 'mens haircut', 'kids haircut', 'blowout', 'beard trim', 'balayage', 'highlights',
+    'lowlights', 'root touch up', 'full color', 'gloss treatment', 'keratin treatment', 'perm',
+    'hair extensions', 'bridal updo', 'braids', 'scalp treatment', 'deep conditioning', 'bang trim',
+    'olaplex treatment', 'brazilian blowout', 'hair botox', 'silk press', 'color correction',
+    'ombre', 'toner refresh', 'wash and style', 'curly cut', 'pixie cut', 'buzz cut', 'fade',
+    'shave', 'eyebrow wax', 'lash lift', 'manicure', 'pedicure', 'gel nails', 'head massage',
+    'hair consultation', 'wig styling', 'dreadlock maintenance', 'hot oil treatment',
+]
+
+TEMPLATES = [
+    'how much does a {service} cost{where}{stylist}',
+    'do you offer {service}{where}{stylist}',
+    'how long does a {service} take{where}{stylist}',
+    'can i book a {service} on {day}{where}{stylist}',
+    'is a {service} available for {audience}{where}{stylist}',
+    'any {service} openings on {day} for {audience}{where}',
+    'who does {service} on {day}{where}',
+    'do i need a deposit for a {service}{where}{stylist}',
+    'can i get a {service} and {other} together{where}',
+]
+
+DAYS = ['monday', 'tuesday', 'wednesday', 'thursday', 'friday', 'saturday', 'sunday', 'weekends', 'evenings']
+AUDIENCES = ['kids', 'teens', 'seniors', 'men', 'brides', 'students', 'first time clients', 'groups']
+BRANCHES = [
+    '', ' at the downtown salon', ' at the mall location', ' at the airport location',
+    ' at the uptown studio', ' at the riverside branch', ' at the eastside branch',
+    ' at the westfield location', ' at the harbor studio', ' at the north campus salon',
+]
+STYLISTS = ['', ' with maria', ' with jess', ' with andre', ' with priya', ' with tom', ' with lena', ' with carlos']
+
+# Caller-style rewrites used to build paraphrased queries
+REWRITES = [
+    ('how much does a', "what's the price of a"),
+    ('how much does a', 'what do you charge for a'),
+    ('do you offer', 'do you guys do'),
+    ('do you offer', 'is there'),
+    ('how long does a', 'how much time is a'),
+    ('can i book a', 'could i schedule a'),
+    ('do i need a deposit for', 'is there a deposit on'),
+]
+FILLERS = ['hi ', 'hey there ', 'quick question ', 'um ', 'hello ']
+
+# Topics a salon KB never covers
+UNKNOWN_QUESTIONS = [
+    'do you sell car insurance', 'can you fix my laptop screen', 'what is the weather tomorrow',
+    'do you deliver pizza', 'can i adopt a puppy here', 'how do i renew my passport',
+    'do you repair bicycles', 'what stocks should i buy', 'can you recommend a plumber',
+    'is the museum open late', 'do you rent kayaks', 'how far is the train station',
+    'can you notarize documents', 'do you teach guitar lessons', 'where is the nearest pharmacy',
+]
+
+
+def distinct_questions() -> list[str]:
+    """Every question the templates can produce (about 120k), in a fixed order"""
+    slots = {
+        'service': SERVICES, 'other': SERVICES, 'day': DAYS, 'audience': AUDIENCES,
+        'where': BRANCHES, 'stylist': STYLISTS,
+    }
+    questions = []
+    for template in TEMPLATES:
+        fields = [name for _, name, _, _ in string.Formatter().parse(template) if name]
+        for values in itertools.product(*(slots[name] for name in fields)):
+            question = template.format(**dict(zip(fields, values)))
+            if 'other' not in fields or values[fields.index('other')] != values[fields.index('service')]:
+                questions.append(question)
+    return questions
+
+
+def make_corpus(size: int, seed: int = 0) -> dict:
+    """`size` distinct KB entries shaped like the Firebase knowledge_base node"""
+    rng = random.Random(seed)
+    pool = distinct_questions()
+    if size > len(pool):
+        raise ValueError(f"Corpus size {size} exceeds the {len(pool)} distinct synthetic questions")
+    questions = rng.sample(pool, size)
+
+    entries = {}
+    for i, question in enumerate(questions):
+        entries[f'-kb{i:07d}'] = {
+            'question': question,
+            'answer': f'Answer #{i}: {question}',
+            'learned_from_request_id': None,
+            'created_at': f'2024-01-01T00:00:{i % 60:02d}',
+        }
+    return entries
+
+
+def paraphrase(question: str, rng: random.Random) -> str:
+    for old, new in rng.sample(REWRITES, len(REWRITES)):
+        if old in question:
+            question = question.replace(old, new, 1)
+            break
+    if rng.random() < 0.5:
+        question = rng.choice(FILLERS) + question
+    return question.capitalize() + '?'
+
+
+def make_queries(entries: dict, count: int, mix=(0.4, 0.4, 0.2), seed: int = 1) -> list[tuple[str, str]]:
+    """(kind, question) pairs mixing exact, paraphrased and unknown questions"""
+    rng = random.Random(seed)
+    questions = [data['question'] for data in entries.values()]
+    queries = []
+    for _ in range(count):
+        roll = rng.random()
+        if roll < mix[0]:
+            queries.append(('exact', rng.choice(questions).upper() + '?'))
+        elif roll < mix[0] + mix[1]:
+            queries.append(('paraphrase', paraphrase(rng.choice(questions), rng)))
+        else:
+            queries.append(('unknown', rng.choice(UNKNOWN_QUESTIONS).capitalize() + '?'))
+    return queries
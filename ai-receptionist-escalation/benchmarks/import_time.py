@@ -0,0 +1,102 @@
+"""
+Cold import benchmark for the agent and supervisor entry points.
+
+Imports each module in a fresh interpreter (the way a LiveKit job process
+or `python run_supervisor.py` starts) several times and reports the median
+import time. It also reports what the import drags in and starts: how many
+modules load, which heavy dependencies (LiveKit, provider plugins,
+firebase-admin, numpy) come with it, and how many threads are running
+when it returns. A clean import starts no threads and touches no storage.
+
+    python -m benchmarks.import_time
+    python -m benchmarks.import_time agent.ai_agent --runs 10 --out imports.json
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, PROJECT_ROOT)
+
+DEFAULT_MODULES = ('agent.ai_agent', 'supervisor.app', 'run_agent', 'run_supervisor')
+HEAVY_MODULES = (
+    'livekit.agents', 'livekit.plugins.openai', 'livekit.plugins.silero', 'livekit.plugins.deepgram',
+    'firebase_admin', 'numpy', 'openai',
+)
+
+PROBE = """
+import json, sys, threading, time
+before, threads = len(sys.modules), threading.active_count()
+started = time.perf_counter()
+error = None
+try:
+    __import__(sys.argv[1])
+except Exception as e:
+    error = f"{type(e).__name__}: {e}"
+print(json.dumps({
+    'seconds': time.perf_counter() - started,
+    'modules': len(sys.modules) - before,
+    'threads_started': threading.active_count() - threads,
+    'heavy': [m for m in json.loads(sys.argv[2]) if m in sys.modules],
+    'error': error,
+}))
+"""
+
+
+def measure_import(module: str, runs: int = 5, env: dict = None) -> dict:
+    """Median cold import time of `module` over `runs` fresh interpreters"""
+    env = dict(os.environ if env is None else env)
+    # Never reach a real database from a benchmark
+    env.setdefault('STORAGE_BACKEND', 'sqlite')
+    env.setdefault('SQLITE_DB_PATH', ':memory:')
+    samples = []
+    for _ in range(runs):
+        result = subprocess.run(
+            [sys.executable, '-c', PROBE, module, json.dumps(HEAVY_MODULES)],
+            cwd=PROJECT_ROOT, env=env, capture_output=True, text=True, check=True,
+        )
+        samples.append(json.loads(result.stdout.strip().splitlines()[-1]))
+    last = samples[-1]
+    return {
+        'module': module,
+        'runs': runs,
+        'median_ms': round(statistics.median(s['seconds'] for s in samples) * 1000, 1),
+        'min_ms': round(min(s['seconds'] for s in samples) * 1000, 1),
+        'modules_loaded': last['modules'],
+        'threads_started': last['threads_started'],
+        'heavy_imports': last['heavy'],
+        'error': last['error'],
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('modules', nargs='*', default=list(DEFAULT_MODULES))
+    parser.add_argument('--runs', type=int, default=5)
+    parser.add_argument('--out', help='write the JSON report here')
+    args = parser.parse_args(argv)
+
+    report = [measure_import(module, args.runs) for module in args.modules]
+    print(f"⏱️ Cold import, median of {args.runs} fresh interpreters")
+    for row in report:
+        line = (f"   {row['module']:<16} {row['median_ms']:>8.1f}ms  {row['modules_loaded']:>4} modules  "
+                f"{row['threads_started']} threads")
+        if row['heavy_imports']:
+            line += f"  heavy: {', '.join(row['heavy_imports'])}"
+        if row['error']:
+            line += f"  ❌ {row['error']}"
+        print(line)
+
+    if args.out:
+        with open(args.out, 'w') as f:
+            json.dump(report, f, indent=2)
+        print(f"\n💾 Results written to {args.out}")
+    return report
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,213 @@
+"""
+KB search benchmark.
+
+Builds synthetic salon KBs (see benchmarks/corpus.py), runs the same mix of
+exact, paraphrased and unknown caller questions through every matcher and
+reports build time, memory, p50/p99 latency, throughput and how often each
+matcher agrees with the original linear scorer. Runs fully offline.
+
+    python -m benchmarks.kb_search --sizes 100,1000,10000 --queries 500
+    python -m benchmarks.kb_search --sizes 100000 --matchers index,sqlite --out results.json
+
+Matchers:
+    linear     original algorithm, a full scan per question (the reference)
+    firebase   StorageBackend.search_knowledge_base, i.e. FirebaseClient's code
+               path, over an in-memory snapshot instead of the network read
+    sqlite     SQLiteStore(':memory:').search_knowledge_base
+    index      KnowledgeBaseIndex built once (what the live replica serves)
+    manager    KnowledgeBaseManager over SQLite, including the answer cache
+    semantic   VectorIndex (needs NumPy; not expected to agree exactly)
+"""
+
+import argparse
+import json
+import os
+import platform
+import statistics
+import sys
+import time
+import tracemalloc
+from datetime import datetime
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.corpus import make_corpus, make_queries
+from utils.kb_index import KnowledgeBaseIndex, linear_search
+from utils.storage import StorageBackend
+
+DEFAULT_MATCHERS = ('linear', 'firebase', 'sqlite', 'index', 'manager', 'semantic')
+
+
+class MemoryKnowledgeBase(StorageBackend):
+    """Holds a KB snapshot in memory so the shared search path runs without Firebase"""
+
+    def __init__(self, entries: dict):
+        self.entries = entries
+
+    def get_all_knowledge_base(self, tenant=None):
+        return self.entries
+
+
+def _load_sqlite(entries: dict):
+    from utils.sqlite_store import SQLiteStore
+
+    store = SQLiteStore()
+    store.conn.execute("BEGIN")
+    store.conn.executemany(
+        "INSERT INTO knowledge_base (id, question, answer, learned_from_request_id, created_at) VALUES (?, ?, ?, ?, ?)",
+        [(key, e['question'], e['answer'], e['learned_from_request_id'], e['created_at']) for key, e in entries.items()],
+    )
+    store.conn.execute("COMMIT")
+    return store
+
+
+def build_matcher(name: str, entries: dict):
+    """Returns search(question) -> answer | None for the named matcher"""
+    if name == 'linear':
+        return lambda question: linear_search(entries, question)
+    if name == 'firebase':
+        return MemoryKnowledgeBase(entries).search_knowledge_base
+    if name == 'sqlite':
+        store = _load_sqlite(entries)
+        store.search_knowledge_base('warm up')
+        return store.search_knowledge_base
+    if name == 'index':
+        index = KnowledgeBaseIndex()
+        index.sync(entries)
+        return index.search
+    if name == 'manager':
+        from agent.knowledge_base import KnowledgeBaseManager
+        kb = KnowledgeBaseManager(storage=_load_sqlite(entries), match_mode='fuzzy')
+        return kb.check_knowledge
+    if name == 'semantic':
+        from utils.kb_vectors import VectorIndex
+        vectors = VectorIndex()
+        vectors.build(entries)
+        return vectors.search
+    raise ValueError(f"Unknown matcher '{name}'")
+
+
+def _percentile(samples: list[float], pct: float) -> float:
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))]
+
+
+def run_matcher(name: str, entries: dict, queries: list, reference: list) -> dict:
+    tracemalloc.start()
+    started = time.perf_counter()
+    search = build_matcher(name, entries)
+    build_seconds = time.perf_counter() - started
+    retained, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    latencies, answers = [], []
+    started = time.perf_counter()
+    for _, question in queries:
+        t0 = time.perf_counter()
+        answers.append(search(question))
+        latencies.append(time.perf_counter() - t0)
+    elapsed = time.perf_counter() - started
+
+    result = {
+        'build_seconds': round(build_seconds, 4),
+        'build_memory_bytes': retained,
+        'build_peak_bytes': peak,
+        'queries': len(queries),
+        'p50_ms': round(_percentile(latencies, 50) * 1000, 4),
+        'p99_ms': round(_percentile(latencies, 99) * 1000, 4),
+        'mean_ms': round(statistics.fmean(latencies) * 1000, 4),
+        'throughput_qps': round(len(queries) / elapsed, 1) if elapsed else None,
+        'answered': {},
+    }
+    for kind in ('exact', 'paraphrase', 'unknown'):
+        kind_answers = [a for (k, _), a in zip(queries, answers) if k == kind]
+        result['answered'][kind] = round(sum(a is not None for a in kind_answers) / len(kind_answers), 3) if kind_answers else None
+
+    if reference is None:
+        result['answers'] = answers
+        return result
+
+    # Agreement with the linear scorer on the queries it was run for
+    compared = list(zip(answers, reference))
+    if compared:
+        agreed = sum(a == r for a, r in compared)
+        result['agreement'] = round(agreed / len(compared), 4)
+        result['disagreements'] = [
+            {'question': queries[i][1], 'answer': a, 'reference': r}
+            for i, (a, r) in enumerate(compared) if a != r
+        ][:5]
+    return result
+
+
+def run(sizes: list[int], query_count: int, matchers: list[str], reference_limit: int = 50, seed: int = 0) -> dict:
+    report = {
+        'started_at': datetime.utcnow().isoformat(),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'query_count': query_count,
+        'seed': seed,
+        'sizes': {},
+    }
+    for size in sizes:
+        entries = make_corpus(size, seed)
+        queries = make_queries(entries, query_count, seed=seed + 1)
+        reference_queries = queries[:reference_limit]
+        print(f"\n📚 {size} KB entries, {len(queries)} queries ({len(reference_queries)} checked against the linear scorer)")
+
+        results = {}
+        if 'linear' in matchers:
+            # The timed linear run doubles as the reference answers
+            matchers = ['linear'] + [name for name in matchers if name != 'linear']
+            reference = None
+        else:
+            reference = [linear_search(entries, question) for _, question in reference_queries]
+        for name in matchers:
+            if name == 'semantic':
+                try:
+                    import numpy  # noqa: F401
+                except ImportError:
+                    print("   semantic: skipped (NumPy not installed)")
+                    continue
+            # The linear scan is far too slow to run every query at large sizes
+            run_queries = reference_queries if name in ('linear', 'firebase') else queries
+            results[name] = run_matcher(name, entries, run_queries, reference)
+            if reference is None:
+                reference = results[name].pop('answers')
+                results[name]['agreement'] = 1.0
+            r = results[name]
+            print(
+                f"   {name:<9} p50 {r['p50_ms']:>9.3f}ms  p99 {r['p99_ms']:>9.3f}ms  "
+                f"{r['throughput_qps'] or 0:>10.1f} q/s  build {r['build_seconds']:>7.3f}s  "
+                f"mem {r['build_memory_bytes'] / 1e6:>7.1f}MB  agreement {r.get('agreement', 'n/a')}"
+            )
+        report['sizes'][str(size)] = results
+    return report
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--sizes', default='100,1000,10000', help='comma-separated KB sizes (up to 120k)')
+    parser.add_argument('--queries', type=int, default=500, help='queries per size')
+    parser.add_argument('--matchers', default=','.join(DEFAULT_MATCHERS))
+    parser.add_argument('--reference-limit', type=int, default=50,
+                        help='queries run through the slow linear/firebase paths and used for agreement')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--out', help='write the JSON report here')
+    args = parser.parse_args(argv)
+
+    report = run(
+        [int(size) for size in args.sizes.split(',')],
+        args.queries,
+        [name.strip() for name in args.matchers.split(',') if name.strip()],
+        args.reference_limit,
+        args.seed,
+    )
+    if args.out:
+        with open(args.out, 'w') as f:
+            json.dump(report, f, indent=2)
+        print(f"\n💾 Results written to {args.out}")
+    return report
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,232 @@
+"""
+Load test for the agent's tool path.
+
+Simulates N concurrent callers in one asyncio event loop, the way a LiveKit
+worker hosts its sessions. Each simulated turn awaits the real
+check_knowledge_base / request_help closures from agent.tools (thread pool,
+timeouts, tracing included) backed by HelpRequestService and
+KnowledgeBaseManager. The data layer is SQLite (in memory or a WAL file)
+standing in for Firebase, with an injected per-call round-trip latency.
+No LiveKit, network or API keys needed.
+
+    python -m benchmarks.load_test --sessions 200 --turns 5 --latency-ms 40
+    python -m benchmarks.load_test --sessions 500 --backend sqlite --workers 16 --out load.json
+
+Reports tool-call throughput, p50/p95/p99 latency per tool, tool timeouts
+and event-loop lag (how late a 10ms timer fires while the load runs; audio
+and VAD for every session share that loop in production).
+"""
+
+import argparse
+import asyncio
+import contextlib
+import io
+import json
+import os
+import platform
+import random
+import statistics
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.corpus import make_corpus, make_queries
+from benchmarks.kb_search import _percentile
+from utils.tracing import SPAN_SECONDS
+
+LAG_INTERVAL = 0.01
+
+
+class LatencyStore:
+    """Proxy that sleeps before every storage call, like a network round trip"""
+
+    def __init__(self, store, latency: float, jitter: float = 0.0, seed: int = 0):
+        self._store = store
+        self._latency = latency
+        self._jitter = jitter
+        self._rng = random.Random(seed)
+        self.calls = 0
+
+    def __getattr__(self, name):
+        attr = getattr(self._store, name)
+        if not callable(attr) or name.startswith('_'):
+            return attr
+
+        def call(*args, **kwargs):
+            self.calls += 1
+            delay = self._latency + self._rng.uniform(0, self._jitter)
+            if delay > 0:
+                time.sleep(delay)
+            return attr(*args, **kwargs)
+
+        return call
+
+
+def build_store(backend: str, kb_size: int, seed: int, path: str = None):
+    """SQLite stand-in for Firebase, seeded with a synthetic KB"""
+    from benchmarks.kb_search import _load_sqlite
+    from utils.sqlite_store import SQLiteStore
+
+    entries = make_corpus(kb_size, seed)
+    if backend == 'memory':
+        return _load_sqlite(entries), entries
+    if backend != 'sqlite':
+        raise ValueError(f"Unknown backend '{backend}'")
+    store = SQLiteStore(path)
+    store.conn.execute("BEGIN")
+    store.conn.executemany(
+        "INSERT INTO knowledge_base (id, question, answer, learned_from_request_id, created_at) VALUES (?, ?, ?, ?, ?)",
+        [(key, e['question'], e['answer'], e['learned_from_request_id'], e['created_at']) for key, e in entries.items()],
+    )
+    store.conn.execute("COMMIT")
+    return store, entries
+
+
+async def _monitor_loop_lag(samples: list, stop: asyncio.Event):
+    loop = asyncio.get_running_loop()
+    while not stop.is_set():
+        expected = loop.time() + LAG_INTERVAL
+        await asyncio.sleep(LAG_INTERVAL)
+        samples.append(max(0.0, loop.time() - expected))
+
+
+async def _session(index: int, questions: list, turns: int, think: float, handlers_for, latencies: dict, rng):
+    check_knowledge_base, request_help = handlers_for(f"+1555{index:07d}")
+    # Callers don't all dial in at the same instant
+    await asyncio.sleep(rng.uniform(0, think))
+    for _ in range(turns):
+        _, question = rng.choice(questions)
+        started = time.perf_counter()
+        answer = await check_knowledge_base(question)
+        latencies['check_knowledge_base'].append(time.perf_counter() - started)
+        if not answer:
+            started = time.perf_counter()
+            await request_help(question)
+            latencies['request_help'].append(time.perf_counter() - started)
+        await asyncio.sleep(rng.uniform(0.5, 1.5) * think)
+
+
+def _summary(samples: list[float]) -> dict:
+    if not samples:
+        return {'count': 0}
+    return {
+        'count': len(samples),
+        'p50_ms': round(_percentile(samples, 50) * 1000, 3),
+        'p95_ms': round(_percentile(samples, 95) * 1000, 3),
+        'p99_ms': round(_percentile(samples, 99) * 1000, 3),
+        'max_ms': round(max(samples) * 1000, 3),
+        'mean_ms': round(statistics.fmean(samples) * 1000, 3),
+    }
+
+
+def _timeouts() -> int:
+    return sum(series[-1] for key, series in SPAN_SECONDS.snapshot().items() if ('status', 'timeout') in key)
+
+
+async def run_load(sessions: int = 100, turns: int = 5, latency_ms: float = 20, jitter_ms: float = 10,
+                   think_ms: float = 200, kb_size: int = 1000, workers: int = None, backend: str = 'memory',
+                   seed: int = 0, db_path: str = None) -> dict:
+    from agent.help_request import HelpRequestService
+    from agent.knowledge_base import KnowledgeBaseManager
+    from agent.tools import ToolExecutor, make_tool_handlers
+    from utils.notification import FakeSMSSink
+    from utils.notification_queue import NotificationQueue
+
+    store, entries = build_store(backend, kb_size, seed, db_path)
+    storage = LatencyStore(store, latency_ms / 1000, jitter_ms / 1000, seed)
+    kb = KnowledgeBaseManager(storage=storage, match_mode='fuzzy')
+    sink = FakeSMSSink()
+    help_svc = HelpRequestService(storage=storage, notification=NotificationQueue(sink, rate_per_second=0), kb=kb)
+    executor = ToolExecutor(workers)
+    questions = make_queries(entries, max(sessions * turns, 100), seed=seed + 1)
+
+    def handlers_for(caller_phone):
+        return make_tool_handlers(kb, help_svc, caller_phone, executor=executor)
+
+    latencies = {'check_knowledge_base': [], 'request_help': []}
+    lag = []
+    stop = asyncio.Event()
+    timeouts_before = _timeouts()
+    monitor = asyncio.create_task(_monitor_loop_lag(lag, stop))
+
+    started = time.perf_counter()
+    await asyncio.gather(*(
+        _session(i, questions, turns, think_ms / 1000, handlers_for, latencies, random.Random(seed * 100003 + i))
+        for i in range(sessions)
+    ))
+    elapsed = time.perf_counter() - started
+    stop.set()
+    await monitor
+    executor.shutdown()
+
+    tool_calls = sum(len(samples) for samples in latencies.values())
+    return {
+        'started_at': datetime.utcnow().isoformat(),
+        'python': platform.python_version(),
+        'config': {
+            'sessions': sessions, 'turns': turns, 'latency_ms': latency_ms, 'jitter_ms': jitter_ms,
+            'think_ms': think_ms, 'kb_size': kb_size, 'backend': backend, 'seed': seed,
+            'workers': executor._pool._max_workers,
+        },
+        'elapsed_seconds': round(elapsed, 3),
+        'tool_calls': tool_calls,
+        'throughput_calls_per_second': round(tool_calls / elapsed, 1) if elapsed else None,
+        'storage_calls': storage.calls,
+        'tool_timeouts': _timeouts() - timeouts_before,
+        'help_requests': len(store.get_pending_requests()),
+        'tools': {name: _summary(samples) for name, samples in latencies.items()},
+        'loop_lag': _summary(lag),
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--sessions', type=int, default=100, help='concurrent simulated callers')
+    parser.add_argument('--turns', type=int, default=5, help='questions per caller')
+    parser.add_argument('--latency-ms', type=float, default=20, help='injected round trip per storage call')
+    parser.add_argument('--jitter-ms', type=float, default=10, help='extra random latency (uniform 0..jitter)')
+    parser.add_argument('--think-ms', type=float, default=200, help='mean pause between a caller\'s turns')
+    parser.add_argument('--kb-size', type=int, default=1000)
+    parser.add_argument('--workers', type=int, help='tool thread pool size (default TOOL_EXECUTOR_WORKERS)')
+    parser.add_argument('--backend', choices=('memory', 'sqlite'), default='memory',
+                        help='in-memory SQLite or a WAL database file')
+    parser.add_argument('--db-path', help='database file for --backend sqlite (default: a temp file)')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--verbose', action='store_true', help='keep the services\' per-call logging')
+    parser.add_argument('--out', help='write the JSON report here')
+    args = parser.parse_args(argv)
+
+    db_path = args.db_path
+    if args.backend == 'sqlite' and not db_path:
+        db_path = os.path.join(tempfile.mkdtemp(prefix='receptionist-load-'), 'load.db')
+
+    print(f"📞 {args.sessions} callers x {args.turns} turns, {args.latency_ms:g}ms (+{args.jitter_ms:g}ms) storage latency")
+    logs = contextlib.nullcontext() if args.verbose else contextlib.redirect_stdout(io.StringIO())
+    with logs:
+        report = asyncio.run(run_load(
+            args.sessions, args.turns, args.latency_ms, args.jitter_ms, args.think_ms,
+            args.kb_size, args.workers, args.backend, args.seed, db_path,
+        ))
+
+    print(f"   {report['tool_calls']} tool calls in {report['elapsed_seconds']}s "
+          f"({report['throughput_calls_per_second']} calls/s), {report['tool_timeouts']} timed out")
+    for name, summary in report['tools'].items():
+        if summary['count']:
+            print(f"   {name:<21} p50 {summary['p50_ms']:>8.1f}ms  p95 {summary['p95_ms']:>8.1f}ms  "
+                  f"p99 {summary['p99_ms']:>8.1f}ms  max {summary['max_ms']:>8.1f}ms")
+    lag = report['loop_lag']
+    if lag['count']:
+        print(f"   {'event loop lag':<21} p50 {lag['p50_ms']:>8.1f}ms  p99 {lag['p99_ms']:>8.1f}ms  max {lag['max_ms']:>8.1f}ms")
+
+    if args.out:
+        with open(args.out, 'w') as f:
+            json.dump(report, f, indent=2)
+        print(f"\n💾 Results written to {args.out}")
+    return report
+
+
+if __name__ == '__main__':
+    main()
@@ -9,11 +9,10 @@ import os
 project_root = os.path.dirname(os.path.abspath(__file__))
 sys.path.insert(0, project_root)
 
-# Now import and run
-from agent.ai_agent import entrypoint, prewarm
-from livekit import agents
+# Now import and run (LiveKit and the provider plugins load inside main)
+from agent.ai_agent import main
 
 if __name__ == "__main__":
     print("🤖 Starting AI Receptionist Agent...")
     print(f"📁 Project root: {project_root}")
-    agents.cli.run_app(agents.WorkerOptions(entrypoint_fnc=entrypoint, prewarm_fnc=prewarm))
+    main()
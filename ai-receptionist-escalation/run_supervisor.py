@@ -10,9 +10,10 @@ project_root = os.path.dirname(os.path.abspath(__file__))
 sys.path.insert(0, project_root)
 
 # Now import and run
-from supervisor.app import app
+from supervisor.app import create_app
 
 if __name__ == '__main__':
+    app = create_app()
     print("🌐 Starting Supervisor Web UI...")
     print(f"📁 Project root: {project_root}")
     print("🔗 Visit: http://localhost:5000")
@@ -1,63 +1,133 @@
-from flask import Flask, render_template, request, redirect, url_for, jsonify
-from utils.firebase_client import FirebaseClient
-from agent.help_request import HelpRequestService
-from agent.knowledge_base import KnowledgeBaseManager
-from datetime import datetime
+"""
+Supervisor web UI.
+
+create_app() builds the Flask app and its services; importing this module
+has no side effects. The background threads (timeout scheduler, counter
+reconciliation) start with the app unless start_background=False.
+`supervisor.app.app` still works for `flask run` and older launchers: it
+builds the process-wide app on first access.
+"""
+
+from flask import Blueprint, Flask, Response, current_app, render_template, request, redirect, url_for, jsonify, abort
+from datetime import date, timedelta
+import json
+import os
+import queue
 import threading
 import time
 
-app = Flask(__name__)
-firebase = FirebaseClient()
-help_service = HelpRequestService()
-kb_manager = KnowledgeBaseManager()
-
-
-def background_timeout_check():
-    """Background thread to periodically check for timed-out requests"""
-    while True:
-        try:
-            time.sleep(3600)  # Check every hour
-            print("⏰ Running automatic timeout check...")
-            firebase.check_and_timeout_old_requests()
-        except Exception as e:
-            print(f"⚠️ Error in timeout check: {e}")
-            time.sleep(3600)  # Wait an hour before retrying
-
-
-# Start background timeout checker thread
-timeout_thread = threading.Thread(target=background_timeout_check, daemon=True)
-timeout_thread.start()
-print("✅ Background timeout checker started")
-
-@app.route('/')
+bp = Blueprint('supervisor', __name__)
+
+
+class SupervisorServices:
+    """Storage and services shared by the views of one app"""
+
+    def __init__(self, storage=None):
+        from agent.help_request import HelpRequestService
+        from agent.tenants import get_tenant_registry
+        from utils.pending_hub import PendingQueueHub
+        from utils.storage import get_storage
+        from utils.timeout_scheduler import RequestTimeoutScheduler
+
+        self.page_size = int(os.getenv('SUPERVISOR_PAGE_SIZE', 50))
+        self.storage = storage or get_storage()
+        # One shared pending-queue subscription for every open dashboard and
+        # for matching duplicate questions (started on first use)
+        self.pending_hub = PendingQueueHub(self.storage)
+        self.help_service = HelpRequestService(storage=self.storage, pending_hub=self.pending_hub)
+        self.timeout_scheduler = RequestTimeoutScheduler(
+            self.storage, tenant_timeouts=get_tenant_registry().timeouts(),
+        )
+        self.stats_thread = None
+
+    def start_background(self):
+        # Deadline-driven request timeouts
+        self.timeout_scheduler.start()
+        print("✅ Background timeout scheduler started")
+        if self.stats_thread is None:
+            self.stats_thread = threading.Thread(target=self._reconcile_stats, name='stats-reconcile', daemon=True)
+            self.stats_thread.start()
+
+    def _reconcile_stats(self):
+        """Periodically rebuild the dashboard counters"""
+        interval = float(os.getenv('STATS_RECONCILE_HOURS', 24)) * 3600
+        while True:
+            try:
+                time.sleep(interval)
+                print("🧮 Reconciling dashboard counters...")
+                self.storage.rebuild_stats()
+            except Exception as e:
+                print(f"⚠️ Error reconciling stats: {e}")
+
+
+def create_app(storage=None, start_background: bool = True) -> Flask:
+    """Build the supervisor app (tests pass their own storage and skip the threads)"""
+    app = Flask(__name__)
+    supervisor_services = app.extensions['supervisor'] = SupervisorServices(storage)
+    app.register_blueprint(bp)
+    if start_background:
+        supervisor_services.start_background()
+    return app
+
+
+def services() -> SupervisorServices:
+    return current_app.extensions['supervisor']
+
+
+_app = None
+
+
+def get_app() -> Flask:
+    """Process-wide app for the launchers"""
+    global _app
+    if _app is None:
+        _app = create_app()
+    return _app
+
+
+def __getattr__(name):
+    if name == 'app':
+        return get_app()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+@bp.route('/')
 def index():
     """Dashboard with summary"""
-    all_requests = firebase.get_all_requests()
-
-    stats = {
-        'pending': sum(1 for r in all_requests.values() if r['status'] == 'pending'),
-        'resolved': sum(1 for r in all_requests.values() if r['status'] == 'resolved'),
-        'unresolved': sum(1 for r in all_requests.values() if r['status'] == 'unresolved'),
-        'total_kb_entries': len(kb_manager.get_all_learned_answers())
-    }
+    stats = services().storage.get_stats()
 
     return render_template('index.html', stats=stats)
 
-@app.route('/pending')
+@bp.route('/pending')
 def pending_requests():
-    """View all pending help requests"""
-    pending = firebase.get_pending_requests()
-
-    # Sort by creation time (newest first)
-    sorted_pending = sorted(
-        [(k, v) for k, v in pending.items()],
-        key=lambda x: x[1]['created_at'],
-        reverse=True
-    )
+    """View all pending help requests (kept current by /api/pending/stream)"""
+    return render_template('pending.html', requests=services().pending_hub.snapshot())
+
+@bp.route('/api/pending/stream')
+def pending_stream():
+    """Server-Sent Events: a snapshot, then created/resolved/unresolved events"""
+    pending_hub = services().pending_hub
+    snapshot, events = pending_hub.subscribe()
 
-    return render_template('pending.html', requests=sorted_pending)
+    def sse(event_type, payload):
+        return f"event: {event_type}\ndata: {json.dumps(payload)}\n\n"
 
-@app.route('/respond/<request_id>', methods=['POST'])
+    def generate():
+        try:
+            yield sse('snapshot', {'requests': snapshot})
+            while True:
+                try:
+                    event = events.get(timeout=15)
+                except queue.Empty:
+                    yield ": keep-alive\n\n"
+                    continue
+                yield sse(event['type'], event)
+        finally:
+            pending_hub.unsubscribe(events)
+
+    return Response(generate(), mimetype='text/event-stream',
+                    headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+
+@bp.route('/respond/<request_id>', methods=['POST'])
 def respond_to_request(request_id):
     """Respond to a specific help request"""
     answer = request.form.get('answer', '').strip()
@@ -66,45 +136,113 @@ def respond_to_request(request_id):
         return jsonify({'error': 'Answer cannot be empty'}), 400
 
     try:
-        help_service.respond_to_request(request_id, answer)
-        return redirect(url_for('pending_requests'))
+        services().help_service.respond_to_request(request_id, answer)
+        services().timeout_scheduler.discard(request_id)
+        return redirect(url_for('.pending_requests'))
     except ValueError as e:
         return jsonify({'error': str(e)}), 404
 
-@app.route('/history')
-def history():
-    """View resolved and unresolved requests"""
-    all_requests = firebase.get_all_requests()
+def date_range():
+    """Read ?from=YYYY-MM-DD&to=YYYY-MM-DD as ISO bounds [start, end)"""
+    start = request.args.get('from') or None
+    end = request.args.get('to') or None
+    try:
+        if start:
+            start = date.fromisoformat(start).isoformat()
+        if end:
+            end = (date.fromisoformat(end) + timedelta(days=1)).isoformat()
+    except ValueError:
+        abort(400, 'Dates must be YYYY-MM-DD')
+    return start, end
+
 
-    # Filter resolved/unresolved
-    resolved = [(k, v) for k, v in all_requests.items() if v['status'] == 'resolved']
-    unresolved = [(k, v) for k, v in all_requests.items() if v['status'] == 'unresolved']
+def page_url(endpoint, **changes):
+    """Current URL with some query parameters replaced"""
+    args = request.args.to_dict()
+    args.update(changes)
+    return url_for(f'.{endpoint}', **{k: v for k, v in args.items() if v})
 
-    # Sort by resolution time
-    resolved.sort(key=lambda x: x[1].get('resolved_at', ''), reverse=True)
-    unresolved.sort(key=lambda x: x[1].get('resolved_at', ''), reverse=True)
 
-    return render_template('history.html', resolved=resolved, unresolved=unresolved)
+@bp.route('/history')
+def history():
+    """View resolved and unresolved requests"""
+    start, end = date_range()
+    status_filter = request.args.get('status', 'all')
+
+    storage = services().storage
+    pages = {}
+    for status in ('resolved', 'unresolved'):
+        if status_filter not in ('all', status):
+            continue
+        items, next_cursor = storage.get_requests_page(
+            status,
+            limit=services().page_size,
+            cursor=request.args.get(f'{status}_cursor'),
+            start=start,
+            end=end,
+        )
+        pages[status] = {
+            'items': items,
+            'next_url': page_url('history', **{f'{status}_cursor': next_cursor}) if next_cursor else None,
+            'first_url': page_url('history', **{f'{status}_cursor': None}) if request.args.get(f'{status}_cursor') else None,
+        }
+
+    return render_template(
+        'history.html',
+        pages=pages,
+        stats=storage.get_stats(),
+        filters={'status': status_filter, 'from': request.args.get('from', ''), 'to': request.args.get('to', '')},
+    )
 
-@app.route('/knowledge-base')
+@bp.route('/knowledge-base')
 def knowledge_base():
     """View all learned answers"""
-    kb_entries = kb_manager.get_all_learned_answers()
-
-    # Sort by creation time
-    sorted_kb = sorted(
-        [(k, v) for k, v in kb_entries.items()],
-        key=lambda x: x[1]['created_at'],
-        reverse=True
+    from agent.tenants import get_tenant_registry
+
+    start, end = date_range()
+    storage = services().storage
+    tenants = get_tenant_registry().profiles
+    tenant = request.args.get('tenant') or get_tenant_registry().default.tenant_id
+    if tenant not in tenants:
+        abort(404, f"Unknown business '{tenant}'")
+    kb_entries, next_cursor = storage.get_kb_page(
+        limit=services().page_size,
+        cursor=request.args.get('cursor'),
+        start=start,
+        end=end,
+        tenant=tenant,
     )
 
-    return render_template('knowledge_base.html', kb_entries=sorted_kb)
+    return render_template(
+        'knowledge_base.html',
+        kb_entries=kb_entries,
+        total_kb_entries=storage.count_kb_entries(tenant),
+        next_url=page_url('knowledge_base', cursor=next_cursor) if next_cursor else None,
+        first_url=page_url('knowledge_base', cursor=None) if request.args.get('cursor') else None,
+        tenants=tenants,
+        filters={'from': request.args.get('from', ''), 'to': request.args.get('to', ''), 'tenant': tenant},
+    )
 
-@app.route('/api/timeout-old-requests', methods=['POST'])
+@bp.route('/api/timeout-old-requests', methods=['POST'])
 def timeout_old_requests():
     """API endpoint to manually trigger timeout check"""
-    firebase.check_and_timeout_old_requests()
-    return jsonify({'status': 'success'})
+    timeout_scheduler = services().timeout_scheduler
+    timeout_scheduler.refresh()
+    expired = timeout_scheduler.run_due()
+    return jsonify({'status': 'success', 'expired': expired})
+
+@bp.route('/api/rebuild-stats', methods=['POST'])
+def rebuild_stats():
+    """API endpoint to manually recount the dashboard counters"""
+    stats = services().storage.rebuild_stats()
+    return jsonify({'status': 'success', 'stats': stats})
+
+@bp.route('/metrics')
+def metrics():
+    """Prometheus scrape endpoint for the supervisor's traced storage calls"""
+    from utils.tracing import render_prometheus
+
+    return render_prometheus(), 200, {'Content-Type': 'text/plain; version=0.0.4'}
 
 if __name__ == '__main__':
-    app.run(debug=True, port=5000)
\ No newline at end of file
+    get_app().run(debug=True, port=5000)
\ No newline at end of file
@@ -0,0 +1,139 @@
+"""
+In-memory stand-in for firebase_admin.db references, for exercising
+FirebaseClient's own read/transaction/update logic in tests.
+
+Transactions run atomically under one lock (what Firebase's compare-and-
+retry guarantees); they, and plain reads and writes, sleep `latency`
+seconds outside it, like a network round trip, so races between them
+actually interleave.
+"""
+
+import copy
+import threading
+import time
+
+from utils.firebase_client import FirebaseClient
+from utils.push_id import generate_push_id
+
+
+class FakeDatabase:
+    def __init__(self, latency: float = 0.0):
+        self.data = {}
+        self.latency = latency
+        self.lock = threading.RLock()
+        self.reads = 0
+
+    def reference(self, path: str = '/') -> 'FakeRef':
+        return FakeRef(self, [part for part in path.split('/') if part])
+
+    def client(self) -> FirebaseClient:
+        """A FirebaseClient wired to this database (skips the SDK setup in __new__)"""
+        client = object.__new__(FirebaseClient)
+        client.get_ref = self.reference
+        return client
+
+    # Tree helpers (caller holds the lock)
+
+    def _get(self, parts):
+        node = self.data
+        for part in parts:
+            if not isinstance(node, dict) or part not in node:
+                return None
+            node = node[part]
+        return node
+
+    def _set(self, parts, value):
+        if not parts:
+            self.data = value if isinstance(value, dict) else {}
+            return
+        node = self.data
+        for part in parts[:-1]:
+            node = node.setdefault(part, {})
+        if value is None:
+            node.pop(parts[-1], None)
+        else:
+            node[parts[-1]] = copy.deepcopy(value)
+
+
+class FakeRef:
+    def __init__(self, database: FakeDatabase, parts: list[str]):
+        self.db = database
+        self.parts = parts
+
+    @property
+    def key(self):
+        return self.parts[-1] if self.parts else None
+
+    def get(self, shallow: bool = False):
+        with self.db.lock:
+            self.db.reads += 1
+            # Empty nodes don't exist in Firebase
+            value = copy.deepcopy(self.db._get(self.parts))
+        if value == {}:
+            value = None
+        if shallow and isinstance(value, dict):
+            value = {key: True for key in value}
+        time.sleep(self.db.latency)
+        return value
+
+    def set(self, value):
+        time.sleep(self.db.latency)
+        with self.db.lock:
+            self.db._set(self.parts, value)
+
+    def update(self, values: dict):
+        """Multi-path update relative to this reference (None deletes)"""
+        time.sleep(self.db.latency)
+        with self.db.lock:
+            for path, value in values.items():
+                self.db._set(self.parts + [p for p in path.split('/') if p], value)
+
+    def push(self, value) -> 'FakeRef':
+        child = FakeRef(self.db, self.parts + [generate_push_id()])
+        child.set(value)
+        return child
+
+    def transaction(self, apply):
+        time.sleep(self.db.latency)
+        with self.db.lock:
+            result = apply(copy.deepcopy(self.db._get(self.parts)))
+            self.db._set(self.parts, result)
+            return result
+
+    def order_by_child(self, field: str) -> 'FakeQuery':
+        return FakeQuery(self, field)
+
+
+class FakeQuery:
+    def __init__(self, ref: FakeRef, field: str):
+        self.ref = ref
+        self.field = field
+        self.start = self.end = self.equal = self.last = None
+
+    def start_at(self, value):
+        self.start = value
+        return self
+
+    def end_at(self, value):
+        self.end = value
+        return self
+
+    def equal_to(self, value):
+        self.equal = value
+        return self
+
+    def limit_to_last(self, count):
+        self.last = count
+        return self
+
+    def get(self):
+        rows = sorted(((data.get(self.field) or '', key), data) for key, data in (self.ref.get() or {}).items())
+        rows = [
+            (key, data) for (value, key), data in rows
+            if (self.equal is None or value == self.equal)
+            and (self.start is None or value >= self.start)
+            and (self.end is None or value <= self.end)
+        ]
+        if self.last is not None:
+            rows = rows[-self.last:]
+        return dict(rows)
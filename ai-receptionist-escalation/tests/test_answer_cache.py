@@ -0,0 +1,73 @@
+"""
+Answer cache in front of KB lookups
+"""
+from agent.knowledge_base import KnowledgeBaseManager
+from utils.answer_cache import AnswerCache
+from utils.sqlite_store import SQLiteStore
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_lru_ttl_and_version_invalidation():
+    clock = FakeClock()
+    cache = AnswerCache(max_entries=2, ttl_seconds=60, clock=clock)
+    assert cache.get('What are your hours?', 1) == (False, None)
+    cache.put('What are your hours?', '9am-7pm', 1)
+    cache.put('Do you do perms?', None, 1)
+    assert cache.get('what are your hours', 1) == (True, '9am-7pm')
+    assert cache.get('Do you do perms', 1) == (True, None)
+
+    cache.put('Is there parking?', 'Street parking', 1)
+    assert cache.get('What are your hours?', 1) == (False, None)
+    assert cache.evictions == 1
+
+    clock.now = 61
+    assert cache.get('Is there parking?', 1) == (False, None)
+
+    cache.put('Is there parking?', 'Street parking', 1)
+    assert cache.get('Is there parking?', 2) == (False, None)
+    cache.put('Is there parking?', 'Stale', 1)
+    assert cache.get('Is there parking?', 2) == (False, None)
+    assert cache.stats()['invalidations'] == 1
+
+
+def test_manager_caches_hits_and_misses_until_the_kb_changes():
+    store = SQLiteStore()
+    store.add_to_knowledge_base('What are your opening hours?', '9am-7pm')
+    kb = KnowledgeBaseManager(storage=store)
+    scans = []
+    original = store.search_knowledge_base
+    store.search_knowledge_base = lambda q, tenant=None: scans.append(q) or original(q, tenant)
+
+    assert kb.check_knowledge('What are your opening hours?') == '9am-7pm'
+    assert kb.check_knowledge('what are your opening hours') == '9am-7pm'
+    assert kb.check_knowledge('Do you do perms?') is None
+    assert kb.check_knowledge('Do you do perms?') is None
+    assert len(scans) == 2
+    assert kb.cache_stats()['hits'] == 2
+
+    # A write from another process bumps the version and drops the cached miss
+    SQLiteStore.add_to_knowledge_base(store, 'Do you do perms?', 'Yes, from $90')
+    assert kb.check_knowledge('Do you do perms?') == 'Yes, from $90'
+    assert len(scans) == 3
+
+
+def test_repeated_questions_count_every_answer_hit():
+    store = SQLiteStore()
+    store.add_to_knowledge_base('What are your opening hours?', '9am-7pm')
+    store.add_to_knowledge_base('Is there parking?', 'Street parking')
+    kb = KnowledgeBaseManager(storage=store)
+
+    for _ in range(5):
+        assert kb.check_knowledge('What are your opening hours?') == '9am-7pm'
+    assert kb.check_knowledge('Is there parking?') == 'Street parking'
+    assert kb.check_knowledge('Do you do perms?') is None
+    assert kb.cache_stats()['hits'] == 4
+    assert kb.take_answer_hits() == {'9am-7pm': 5, 'Street parking': 1}
+    assert kb.take_answer_hits() == {}
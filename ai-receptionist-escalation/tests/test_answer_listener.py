@@ -0,0 +1,68 @@
+"""
+Answer listener: one change stream, callbacks routed by request ID
+"""
+import threading
+
+from agent.answer_listener import AnswerListener
+from utils.sqlite_store import RequestEventLog, SQLiteStore
+
+
+def _collector():
+    answers = {}
+    done = threading.Event()
+
+    def callback(request_id, request):
+        answers[request_id] = request['supervisor_answer']
+        done.set()
+
+    return answers, done, callback
+
+
+def test_answer_reaches_the_waiting_call():
+    store = SQLiteStore()
+    listener = AnswerListener(store, source=RequestEventLog(store, poll_seconds=0.01))
+    waiting = store.create_help_request('Do you do balayage?', '+1555')
+    other = store.create_help_request('Gift cards?', '+1556')
+
+    answers, done, callback = _collector()
+    listener.watch(waiting, callback)
+    store.resolve_request(other, 'Yes, at the front desk.')
+    store.resolve_request(waiting, 'Yes, from $150.')
+
+    assert done.wait(2)
+    assert answers == {waiting: 'Yes, from $150.'}
+    assert listener.watching() == []
+    listener.stop()
+
+
+def test_already_answered_and_timed_out_requests():
+    store = SQLiteStore()
+    listener = AnswerListener(store, source=RequestEventLog(store, poll_seconds=0.01))
+    listener.start()
+    answered = store.create_help_request('Parking?', '+1555')
+    store.resolve_request(answered, 'Street parking.')
+    for _ in range(200):
+        if answered in listener._departed:
+            break
+        threading.Event().wait(0.01)
+
+    # Registering a watch never reads storage; the answer comes from the listener
+    reads = []
+    original = store.get_help_request
+    store.get_help_request = lambda request_id: reads.append(threading.current_thread()) or original(request_id)
+    answers, done, callback = _collector()
+    listener.watch(answered, callback)
+    assert threading.main_thread() not in reads
+    assert done.wait(2)
+    assert answers == {answered: 'Street parking.'}
+
+    expired = store.create_help_request('Do you do perms?', '+1556')
+    listener.watch(expired, callback)
+    store.mark_requests_unresolved([expired])
+    for _ in range(200):
+        if not listener.watching():
+            break
+        threading.Event().wait(0.01)
+    assert listener.watching() == []
+    assert expired not in answers
+    listener.stop()
@@ -0,0 +1,29 @@
+"""
+Entry points import without side effects; the supervisor app comes from create_app()
+"""
+from benchmarks.import_time import measure_import
+from supervisor.app import create_app
+from utils.sqlite_store import SQLiteStore
+
+
+def test_entry_points_import_cleanly():
+    for module in ('agent.ai_agent', 'supervisor.app'):
+        row = measure_import(module, runs=1)
+        assert row['error'] is None, row['error']
+        assert row['threads_started'] == 0
+        assert row['heavy_imports'] == []
+
+
+def test_create_app_with_its_own_storage():
+    store = SQLiteStore()
+    request_id = store.create_help_request('Do you do perms?', '+15550001111')
+    app = create_app(storage=store, start_background=False)
+    client = app.test_client()
+
+    assert client.get('/').status_code == 200
+    assert 'Do you do perms?' in client.get('/pending').get_data(as_text=True)
+    response = client.post(f'/respond/{request_id}', data={'answer': 'Yes, from $80.'})
+    assert response.status_code == 302 and response.headers['Location'].endswith('/pending')
+    assert store.search_knowledge_base('do you do perms') == 'Yes, from $80.'
+    assert client.get('/knowledge-base?tenant=nowhere').status_code == 404
+    assert not app.extensions['supervisor'].timeout_scheduler._thread
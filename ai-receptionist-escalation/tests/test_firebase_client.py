@@ -0,0 +1,180 @@
+"""
+FirebaseClient's read/transaction/update logic against an in-memory database
+"""
+import threading
+import time
+
+import pytest
+
+from tests.fake_firebase import FakeDatabase
+
+
+def _resolve_concurrently(client, request_id, answers):
+    results = [None] * len(answers)
+    barrier = threading.Barrier(len(answers))
+
+    def run(i):
+        barrier.wait()
+        results[i] = client.resolve_request(request_id, answers[i])
+
+    threads = [threading.Thread(target=run, args=(i,)) for i in range(len(answers))]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return results
+
+
+def test_concurrent_resolves_claim_the_request_once():
+    database = FakeDatabase(latency=0.02)
+    client = database.client()
+    request_id = client.create_help_request('Do you do perms?', '+15550001111')
+    assert client.add_subscriber(request_id, '+15550002222')
+
+    results = _resolve_concurrently(client, request_id, ['Yes, from $80.', 'Yes, $80 and up.'])
+    winners = [r for r in results if r['status'] == 'pending']
+    assert len(winners) == 1 and sorted(winners[0]['subscribers']) == ['+15550002222']
+    assert [r['status'] for r in results].count('resolved') == 1
+
+    stored = client.get_help_request(request_id)
+    assert stored['status'] == 'resolved'
+    assert client.get_stats() == {'pending': 0, 'resolved': 1, 'unresolved': 0, 'total_kb_entries': 1}
+    assert list(client.get_all_knowledge_base()) == [request_id]
+    assert client.get_all_knowledge_base()[request_id]['answer'] == stored['supervisor_answer']
+    assert client.get_ref('pending_requests').get() is None
+
+
+def test_timeouts_never_flip_a_request_answered_in_between():
+    database = FakeDatabase(latency=0.02)
+    client = database.client()
+    answered = client.create_help_request('Do you do perms?', '+15550001111')
+    waiting = client.create_help_request('Gift cards?', '+15550002222')
+
+    # The supervisor answers while the scheduler is expiring the same batch
+    barrier = threading.Barrier(2)
+    results = {}
+
+    def expire():
+        barrier.wait()
+        results['expired'] = client.mark_requests_unresolved([answered, waiting])
+
+    def answer():
+        barrier.wait()
+        results['answered'] = client.resolve_request(answered, 'Yes, from $80.')
+
+    threads = [threading.Thread(target=expire), threading.Thread(target=answer)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    status = client.get_help_request(answered)['status']
+    won_answer = results['answered']['status'] == 'pending'
+    assert (status == 'resolved') == won_answer
+    assert results['expired'] == ([waiting] if won_answer else [answered, waiting])
+    assert client.get_help_request(waiting)['status'] == 'unresolved'
+    assert client.get_ref('pending_requests').get() is None
+    stats = client.get_stats()
+    assert stats['pending'] == 0 and stats['resolved'] + stats['unresolved'] == 2
+    assert client.mark_requests_unresolved([answered, waiting]) == []
+
+
+def test_stats_count_kb_entries_of_every_tenant():
+    client = FakeDatabase().client()
+    client.add_to_knowledge_base('Do you do perms?', 'Yes')
+    client.add_kb_entries([{'question': 'Beard trims?', 'answer': '$20'},
+                           {'question': 'Hot towel shave?', 'answer': '$35'}], tenant='barber')
+    request_id = client.create_help_request('Gift cards?', '+15550001111', tenant='barber')
+    client.resolve_request(request_id, 'At the front desk')
+    assert client.count_kb_entries() == 1 and client.count_kb_entries('barber') == 3
+
+    client.get_ref('stats').update({'total_kb_entries': 99, 'kb_entries:barber': 0})
+    stats = client.rebuild_stats()
+    assert stats['total_kb_entries'] == 4
+    assert client.get_stats()['total_kb_entries'] == 4
+    assert client.count_kb_entries() == 1 and client.count_kb_entries('barber') == 3
+
+
+def test_bulk_kb_entries_page_with_one_query_each():
+    database = FakeDatabase()
+    client = database.client()
+    client.add_kb_entries([{'question': f'Question {i}?', 'answer': str(i)} for i in range(120)])
+
+    seen, cursor, pages = [], None, 0
+    reads = database.reads
+    while True:
+        entries, cursor = client.get_kb_page(limit=25, cursor=cursor)
+        seen.extend(key for key, _ in entries)
+        pages += 1
+        if not cursor:
+            break
+    assert len(seen) == len(set(seen)) == 120
+    assert database.reads - reads == pages == 5
+
+
+def test_rebuild_backfills_a_resolve_interrupted_after_its_claim():
+    database = FakeDatabase()
+    client = database.client()
+    request_id = client.create_help_request('Do you do perms?', '+15550001111', tenant='uptown')
+
+    def crash(values):
+        raise ConnectionError('worker died')
+
+    def reference(path='/'):
+        ref = database.reference(path)
+        if path == '/':
+            ref.update = crash
+        return ref
+
+    client.get_ref = reference
+    with pytest.raises(ConnectionError):
+        client.resolve_request(request_id, 'Yes, from $80.')
+    client.get_ref = database.reference
+    assert client.get_help_request(request_id)['status'] == 'resolved'
+    assert client.count_kb_entries('uptown') == 0
+
+    for _ in range(2):
+        stats = client.rebuild_stats()
+        assert stats['total_kb_entries'] == 1 and stats['resolved'] == 1 and stats['pending'] == 0
+    entries = client.get_all_knowledge_base('uptown')
+    assert list(entries) == [request_id] and entries[request_id]['answer'] == 'Yes, from $80.'
+    assert client.get_ref('pending_requests').get() is None
+    assert client.get_kb_version('uptown') >= 1
+
+
+def test_a_timeout_sweep_claims_its_requests_concurrently():
+    database = FakeDatabase()
+    client = database.client()
+    request_ids = [client.create_help_request(f'Question {i}?', '+15550001111') for i in range(12)]
+    client.resolve_request(request_ids[0], 'Yes.')
+
+    database.latency = 0.05
+    started = time.perf_counter()
+    expired = client.mark_requests_unresolved(request_ids)
+    elapsed = time.perf_counter() - started
+    assert expired == request_ids[1:]
+    # Sequential transactions alone would take 12 x 50ms
+    assert elapsed < 0.4
+    assert client.get_ref('pending_requests').get() is None
+    assert client.get_stats()['unresolved'] == 11
+
+
+def test_rebuild_keeps_writes_that_land_while_it_runs():
+    database = FakeDatabase()
+    client = database.client()
+    answered = client.create_help_request('Do you do perms?', '+15550001111')
+    created = []
+
+    # After the request scan: one request is answered and another one comes in
+    kb_keys_by_tenant = client._kb_keys_by_tenant
+
+    def writes_during_rebuild():
+        client.resolve_request(answered, 'Yes, from $80.')
+        created.append(client.create_help_request('Gift cards?', '+15550002222'))
+        return kb_keys_by_tenant()
+
+    client._kb_keys_by_tenant = writes_during_rebuild
+    client.rebuild_stats()
+    assert client.get_stats() == {'pending': 1, 'resolved': 1, 'unresolved': 0, 'total_kb_entries': 1}
+    # No ghost of the answered request, and the new one stays listed
+    assert list(client.get_ref('pending_requests').get()) == created
@@ -0,0 +1,26 @@
+"""
+Smoke test for the KB search benchmark (tiny corpus)
+"""
+from benchmarks.corpus import make_corpus, make_queries
+from benchmarks.kb_search import run
+
+
+def test_corpus_and_queries_are_deterministic():
+    entries = make_corpus(200, seed=3)
+    assert len(entries) == 200
+    assert len({e['question'] for e in entries.values()}) == 200
+    assert entries == make_corpus(200, seed=3)
+    queries = make_queries(entries, 50, seed=4)
+    assert queries == make_queries(entries, 50, seed=4)
+    assert {kind for kind, _ in queries} == {'exact', 'paraphrase', 'unknown'}
+
+
+def test_fuzzy_matchers_agree_with_the_linear_scorer():
+    report = run([150], 40, ['index', 'sqlite', 'firebase', 'manager', 'linear'], reference_limit=40)
+    results = report['sizes']['150']
+    assert list(results) == ['linear', 'index', 'sqlite', 'firebase', 'manager']
+    for name, result in results.items():
+        assert result['agreement'] == 1.0, (name, result.get('disagreements'))
+        assert result['p99_ms'] >= result['p50_ms']
+    assert results['index']['answered']['exact'] == 1.0
+    assert results['index']['answered']['unknown'] == 0.0
@@ -0,0 +1,60 @@
+"""
+Knowledge base index must answer exactly like the original linear scorer
+"""
+import random
+
+from utils.kb_index import KnowledgeBaseIndex, linear_search
+
+WORDS = [
+    'keratin', 'treatment', 'price', 'hours', 'open', 'sunday', 'walk', 'ins',
+    'color', 'highlights', 'perm', 'parking', 'booking', 'cost', 'long', 'take',
+    'kids', 'haircut', 'beard', 'trim', 'gift', 'cards', 'cancel', 'policy',
+]
+FILLER = ['do', 'you', 'what', 'is', 'the', 'how', 'much', 'a', 'your', 'our']
+
+
+def _question(rng):
+    words = rng.sample(WORDS, rng.randint(1, 4)) + rng.sample(FILLER, rng.randint(0, 3))
+    rng.shuffle(words)
+    text = ' '.join(words)
+    return text + rng.choice(['', '?', '!', ' ?'])
+
+
+def _corpus(rng, size):
+    return {f'-kb{i:05d}': {'question': _question(rng), 'answer': f'answer {i}'} for i in range(size)}
+
+
+def test_matches_linear_scorer_on_random_corpora():
+    rng = random.Random(7)
+    for _ in range(20):
+        entries = _corpus(rng, rng.randint(1, 60))
+        index = KnowledgeBaseIndex()
+        index.sync(entries)
+        for _ in range(40):
+            query = _question(rng)
+            assert index.search(query) == linear_search(entries, query), query
+
+
+def test_substring_and_empty_query_edge_cases():
+    entries = {
+        '-a': {'question': 'what are your hours', 'answer': 'hours answer'},
+        '-b': {'question': 'keratin treatment price', 'answer': 'keratin answer'},
+    }
+    index = KnowledgeBaseIndex()
+    index.sync(entries)
+    for query in ['', 'our', 'keratin', 'so what are your hours today', 'parking?', 'price']:
+        assert index.search(query) == linear_search(entries, query), query
+
+
+def test_sync_tracks_updates_and_removals():
+    index = KnowledgeBaseIndex()
+    index.sync({'-a': {'question': 'do you take walk ins', 'answer': 'yes'}})
+    assert index.search('walk ins welcome?') == 'yes'
+
+    index.sync({'-a': {'question': 'is there parking', 'answer': 'street parking'}})
+    assert index.search('walk ins welcome?') is None
+    assert index.search('parking') == 'street parking'
+
+    index.sync({})
+    assert len(index) == 0
+    assert index.search('parking') is None
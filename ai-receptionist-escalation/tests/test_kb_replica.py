@@ -0,0 +1,47 @@
+"""
+Live KB replica driven by an in-process event source
+"""
+from utils.change_events import LocalEventSource
+from utils.kb_replica import KnowledgeBaseReplica
+
+
+def _replica(initial=None):
+    source = LocalEventSource(initial)
+    replica = KnowledgeBaseReplica().start(source)
+    return source, replica
+
+
+def test_initial_snapshot_makes_replica_ready():
+    source, replica = _replica({
+        '-a': {'question': 'do you offer keratin treatments', 'answer': 'Yes, $150'},
+    })
+    assert replica.is_ready()
+    assert replica.search('Do you offer keratin treatments?') == 'Yes, $150'
+
+
+def test_child_added_changed_removed():
+    source, replica = _replica()
+    assert replica.search('walk ins') is None
+
+    source.put('/-b', {'question': 'do you take walk ins', 'answer': 'Yes'})
+    assert replica.search('walk ins') == 'Yes'
+    version = replica.version
+
+    source.put('/-b/answer', 'Only before 5pm')
+    assert replica.search('walk ins') == 'Only before 5pm'
+    assert replica.version > version
+
+    source.patch('/', {'-c': {'question': 'is there parking', 'answer': 'Street parking'}})
+    assert replica.search('parking') == 'Street parking'
+
+    source.put('/-b', None)
+    assert replica.search('walk ins') is None
+    assert len(replica) == 1
+
+
+def test_stop_unsubscribes():
+    source, replica = _replica()
+    replica.stop()
+    source.put('/-d', {'question': 'gift cards', 'answer': 'Yes'})
+    assert replica.search('gift cards') is None
+    assert not replica.is_ready()
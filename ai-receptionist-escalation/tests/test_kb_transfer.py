@@ -0,0 +1,90 @@
+"""
+KB JSONL import/export: batching, dedupe, resumable checkpoints
+"""
+import json
+
+import pytest
+
+from agent.knowledge_base import KnowledgeBaseManager
+from utils.kb_transfer import export_kb, import_kb
+from utils.sqlite_store import SQLiteStore
+
+
+def _write_jsonl(path, records):
+    path.write_text(''.join(json.dumps(r) + '\n' for r in records))
+
+
+def test_export_then_import_into_another_tenant(tmp_path):
+    store = SQLiteStore()
+    store.add_to_knowledge_base('Do you do perms?', 'Yes, from $80.')
+    store.add_to_knowledge_base('Is there parking?', 'Street parking out front.')
+
+    path = str(tmp_path / 'kb.jsonl.gz')
+    assert export_kb(store, path, page_size=1) == 2
+
+    uptown = KnowledgeBaseManager(storage=store, tenant='uptown', match_mode='fuzzy')
+    result = import_kb(uptown, path, batch_size=1)
+    assert result['imported'] == 2 and result['duplicates'] == 0
+    assert uptown.check_knowledge('do you do perms') == 'Yes, from $80.'
+    assert store.get_stats()['total_kb_entries'] == 4
+
+    # Everything is already there the second time
+    assert import_kb(uptown, path)['imported'] == 0
+    assert len(store.get_all_knowledge_base(tenant='uptown')) == 2
+
+
+def test_import_dedupes_and_skips_bad_lines(tmp_path):
+    store = SQLiteStore()
+    store.add_to_knowledge_base('Do you do perms?', 'Yes.')
+    path = tmp_path / 'faq.jsonl'
+    _write_jsonl(path, [
+        {'question': 'DO YOU DO PERMS', 'answer': 'Duplicate of the KB'},
+        {'question': 'Gift cards?', 'answer': 'At the front desk.'},
+        {'question': 'gift  cards', 'answer': 'Duplicate within the file'},
+        {'question': 'No answer'},
+    ])
+    with open(path, 'a') as f:
+        f.write('not json\n')
+
+    result = import_kb(KnowledgeBaseManager(storage=store, match_mode='fuzzy'), str(path), batch_size=10)
+    assert (result['read'], result['imported'], result['duplicates'], result['invalid']) == (5, 1, 2, 2)
+    assert store.search_knowledge_base('gift cards') == 'At the front desk.'
+
+
+def test_interrupted_import_resumes_from_checkpoint(tmp_path):
+    store = SQLiteStore()
+    kb = KnowledgeBaseManager(storage=store, match_mode='fuzzy')
+    path = tmp_path / 'faq.jsonl'
+    _write_jsonl(path, [{'question': f'question number {i}', 'answer': f'answer {i}'} for i in range(10)])
+
+    original = kb.add_learned_answers
+    calls = []
+
+    def flaky(entries):
+        calls.append(len(entries))
+        if len(calls) == 3:
+            raise ConnectionError('lost connection')
+        return original(entries)
+
+    kb.add_learned_answers = flaky
+    with pytest.raises(ConnectionError):
+        import_kb(kb, str(path), batch_size=3)
+    assert len(store.get_all_knowledge_base()) == 6
+    assert (tmp_path / 'faq.jsonl.checkpoint').exists()
+
+    kb.add_learned_answers = original
+    result = import_kb(kb, str(path), batch_size=3)
+    assert result['resumed_from'] == 6
+    assert result['imported'] == 10
+    assert len(store.get_all_knowledge_base()) == 10
+    assert not (tmp_path / 'faq.jsonl.checkpoint').exists()
+
+
+def test_bulk_add_extends_the_search_index_in_place():
+    store = SQLiteStore()
+    store.add_to_knowledge_base('Do you do perms?', 'Yes.')
+    assert store.search_knowledge_base('perms') == 'Yes.'
+
+    store.add_kb_entries([{'question': 'Gift cards?', 'answer': 'At the front desk.'}])
+    store.get_all_knowledge_base = lambda tenant=None: pytest.fail('index was rebuilt from a full read')
+    assert store.search_knowledge_base('gift cards') == 'At the front desk.'
@@ -0,0 +1,61 @@
+"""
+Semantic KB matching (skipped when NumPy is not installed)
+"""
+import pytest
+
+np = pytest.importorskip('numpy')
+
+from agent.knowledge_base import KnowledgeBaseManager
+from utils.change_events import LocalEventSource
+from utils.kb_vectors import HashedTfidfEncoder, VectorIndex
+from utils.sqlite_store import SQLiteStore
+
+ENTRIES = {
+    '-a': {'question': 'do you offer keratin treatments', 'answer': 'Yes, $150'},
+    '-b': {'question': 'what are your opening hours', 'answer': '9am-7pm'},
+    '-c': {'question': 'is there parking nearby', 'answer': 'Street parking'},
+}
+
+
+def _index(threshold=0.3):
+    return VectorIndex(HashedTfidfEncoder(dim=256), threshold=threshold)
+
+
+def test_paraphrase_matches_and_top_k_is_ordered():
+    index = _index()
+    index.build(ENTRIES)
+    assert index.search('what time do you open, what are the hours') == '9am-7pm'
+    top = index.search_top_k('keratin treatment cost', k=3)
+    assert top[0][1] == '-a'
+    assert [score for score, _, _ in top] == sorted((score for score, _, _ in top), reverse=True)
+    assert index.search('do you sell gift cards for birthdays') is None
+
+
+def test_add_remove_and_persisted_rows_are_reused(tmp_path):
+    path = str(tmp_path / 'kb.vectors.npz')
+    index = _index()
+    index.build(ENTRIES, path)
+    index.save(path)
+    with np.load(path, allow_pickle=False) as data:
+        assert data['keys'].dtype.kind == 'U' and sorted(data['keys']) == sorted(ENTRIES)
+
+    reloaded = _index()
+    encoded = []
+    original_encode = reloaded.encoder.encode
+    reloaded.encoder.encode = lambda texts: encoded.extend(texts) or original_encode(texts)
+    reloaded.build({**ENTRIES, '-d': {'question': 'do you take walk ins', 'answer': 'Yes'}}, path)
+    assert encoded == ['do you take walk ins']
+
+    reloaded.remove('-a')
+    assert len(reloaded) == 3
+    assert reloaded.search('keratin treatments') != 'Yes, $150'
+
+
+def test_manager_semantic_mode_follows_the_replica(tmp_path):
+    source = LocalEventSource(ENTRIES)
+    manager = KnowledgeBaseManager(storage=SQLiteStore(), match_mode='semantic')
+    manager.start_live_sync(source)
+    manager.start_semantic_index(str(tmp_path / 'kb.vectors.npz'))
+
+    source.put('/-e', {'question': 'can i buy a gift card', 'answer': 'Gift cards at the front desk'})
+    assert manager.check_knowledge('gift cards for sale?') == 'Gift cards at the front desk'
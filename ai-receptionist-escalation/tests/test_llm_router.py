@@ -0,0 +1,73 @@
+"""
+LLM router against local fake providers with scripted delays
+"""
+import asyncio
+
+import pytest
+
+from agent.llm_router import LLMRouter
+
+
+class FakeLLM:
+    def __init__(self, name, delays, fail=False):
+        self.name = name
+        self.delays = list(delays)  # time to first chunk, one per turn (the last one repeats)
+        self.fail = fail
+        self.started = 0
+        self.closed = 0
+
+    async def chunks(self):
+        delay = self.delays[min(self.started, len(self.delays) - 1)]
+        self.started += 1
+        try:
+            await asyncio.sleep(delay)
+            if self.fail:
+                raise ConnectionError(f'{self.name} is down')
+            yield f'{self.name}:'
+            yield 'hello'
+        finally:
+            self.closed += 1
+
+
+def _turn(router):
+    async def run():
+        return ''.join([chunk async for chunk in router.stream(lambda llm: llm.chunks())])
+    return asyncio.run(run())
+
+
+def test_routes_each_turn_to_the_fastest_measured_provider():
+    groq, openai = FakeLLM('groq', [0.001]), FakeLLM('openai', [0.001])
+    router = LLMRouter({'groq': groq, 'openai': openai}, hedge_after=0)
+    assert _turn(router) == 'groq:hello'
+    assert router.ranked() == ['groq', 'openai']
+
+    # Groq gets slow; a hedge measures OpenAI and later turns follow the p95
+    groq.delays = [0.2]
+    router.hedge_after = 0.02
+    assert _turn(router) == 'openai:hello'
+    assert router.hedges == 1 and router.hedge_wins == 1 and groq.closed == 2
+    assert router.ranked() == ['openai', 'groq']
+    assert _turn(router) == 'openai:hello'
+
+
+def test_fails_over_and_skips_an_erroring_provider_until_cooldown():
+    now = [0.0]
+    groq, openai = FakeLLM('groq', [0.001], fail=True), FakeLLM('openai', [0.001])
+    router = LLMRouter({'groq': groq, 'openai': openai}, hedge_after=0, max_error_rate=0.5,
+                       cooldown=30, clock=lambda: now[0])
+    assert _turn(router) == 'openai:hello'
+    assert router.failovers == 1 and not router.healthy('groq')
+    assert router.ranked() == ['openai', 'groq']
+
+    now[0] = 31
+    assert router.healthy('groq')
+    stats = router.stats()
+    assert stats['providers']['groq']['error_rate'] == 1.0
+    assert stats['providers']['openai']['healthy']
+
+
+def test_all_providers_failing_raises_the_last_error():
+    router = LLMRouter({'groq': FakeLLM('groq', [0], fail=True), 'openai': FakeLLM('openai', [0], fail=True)},
+                       hedge_after=0)
+    with pytest.raises(ConnectionError, match='openai is down'):
+        _turn(router)
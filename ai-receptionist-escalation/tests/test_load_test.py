@@ -0,0 +1,16 @@
+"""
+Smoke test for the tool-path load test (a handful of callers)
+"""
+import asyncio
+
+from benchmarks.load_test import run_load
+
+
+def test_load_test_reports_latency_and_loop_lag():
+    report = asyncio.run(run_load(sessions=8, turns=2, latency_ms=1, jitter_ms=0, think_ms=5, kb_size=100))
+    assert report['tool_calls'] >= 16
+    assert report['tools']['check_knowledge_base']['count'] == 16
+    assert report['tools']['check_knowledge_base']['p99_ms'] >= report['tools']['check_knowledge_base']['p50_ms']
+    assert report['storage_calls'] > 0
+    assert report['loop_lag']['count'] > 0
+    assert report['tool_timeouts'] == 0
@@ -0,0 +1,73 @@
+"""
+Outbound notification queue against the fake SMS sink
+"""
+from utils.notification import FakeSMSSink
+from utils.notification_queue import NotificationQueue, RateLimiter, get_rate_limiter
+
+
+def _queue(sink, **kwargs):
+    options = dict(workers=2, retry_base_seconds=0.001, rate_per_second=0, batch_window_seconds=0.05)
+    options.update(kwargs)
+    return NotificationQueue(sink, **options)
+
+
+def test_texts_are_delivered_in_background():
+    sink = FakeSMSSink()
+    notifications = _queue(sink)
+    notifications.text_customers([('+1555', 'hello'), ('+1556', 'hi')])
+    notifications.flush()
+    assert sorted(sink.texts) == [('+1555', 'hello'), ('+1556', 'hi')]
+
+
+def test_failed_sends_are_retried_then_given_up():
+    sink = FakeSMSSink(fail_times=2)
+    notifications = _queue(sink, max_retries=3)
+    notifications.text_customer('+1555', 'retry me')
+    notifications.flush()
+    assert sink.texts == [('+1555', 'retry me')]
+
+    sink.fail_times = 10
+    notifications.text_customer('+1555', 'give up')
+    notifications.flush()
+    assert len(notifications.failed) == 1
+
+
+def test_simultaneous_alerts_are_batched():
+    sink = FakeSMSSink()
+    notifications = _queue(sink, batch_window_seconds=0.2)
+    for i in range(5):
+        notifications.notify_supervisor(f'-r{i}', f'question {i}', '+1555')
+    notifications.flush()
+    assert len(sink.alerts) == 5
+    assert sink.alert_batches and len(sink.alert_batches[0]) > 1
+
+
+def test_rate_limiter_spaces_out_sends():
+    now = [0.0]
+    waits = []
+
+    def sleep(seconds):
+        waits.append(seconds)
+        now[0] += seconds
+
+    limiter = RateLimiter(2, burst=1, clock=lambda: now[0], sleep=sleep)
+    for _ in range(3):
+        limiter.acquire()
+    assert sum(waits) >= 1.0
+
+
+def test_stop_delivers_everything_already_queued():
+    sink = FakeSMSSink()
+    notifications = _queue(sink, workers=3, batch_window_seconds=0.01, max_batch=2)
+    for i in range(7):
+        notifications.notify_supervisor(f'-r{i}', f'question {i}', '+1555')
+        notifications.text_customer(f'+155{i}', 'hi')
+    notifications.stop(timeout=5)
+    assert len(sink.alerts) == 7 and len(sink.texts) == 7
+    assert not any(thread.is_alive() for thread in notifications._threads)
+
+
+def test_rate_limiters_are_shared_per_provider_and_rate():
+    assert get_rate_limiter('twilio-test', 5) is get_rate_limiter('twilio-test', 5.0)
+    slow = get_rate_limiter('twilio-test', 1)
+    assert slow.rate == 1 and slow is not get_rate_limiter('twilio-test', 5)
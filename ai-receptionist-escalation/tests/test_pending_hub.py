@@ -0,0 +1,103 @@
+"""
+Live pending queue fan-out
+"""
+import queue
+import threading
+
+from utils.change_events import LocalEventSource
+from utils.pending_hub import PendingQueueHub
+from utils.sqlite_store import SQLiteStore
+
+
+def _next(events, timeout=2):
+    return events.get(timeout=timeout)
+
+
+def test_sqlite_event_log_feeds_every_subscriber(monkeypatch):
+    monkeypatch.setenv('SQLITE_EVENT_POLL_SECONDS', '0.01')
+    store = SQLiteStore()
+    existing = store.create_help_request('Do you do perms?', '+1555')
+    hub = PendingQueueHub(store)
+
+    snapshot, first = hub.subscribe()
+    _, second = hub.subscribe()
+    assert [request_id for request_id, _ in snapshot] == [existing]
+
+    new_id = store.create_help_request('Gift cards?', '+1556')
+    for events in (first, second):
+        event = _next(events)
+        assert (event['type'], event['id'], event['request']['question']) == ('created', new_id, 'Gift cards?')
+
+    store.resolve_request(existing, 'Yes, from $90')
+    store.mark_requests_unresolved([new_id])
+    assert [(e['type'], e['id']) for e in (_next(first), _next(first))] == [('resolved', existing), ('unresolved', new_id)]
+    assert hub.snapshot() == []
+
+    hub.unsubscribe(first)
+    assert hub.subscriber_count() == 1
+    hub.stop()
+
+
+def test_change_stream_updates_and_slow_subscribers_are_reset():
+    class Store:
+        def __init__(self):
+            self.source = LocalEventSource({'-a': {'question': 'Perms?', 'status': 'pending', 'created_at': '1'}})
+            self.requests = {}
+
+        def pending_event_source(self):
+            return self.source
+
+        def get_help_request(self, request_id):
+            return self.requests.get(request_id)
+
+    store = Store()
+    hub = PendingQueueHub(store, max_queue=2)
+    snapshot, events = hub.subscribe()
+    assert snapshot[0][0] == '-a'
+
+    store.source.put('/-a/question', 'Do you do perms?')
+    assert _next(events)['type'] == 'updated'
+    store.requests['-a'] = {'status': 'resolved'}
+    store.source.put('/-a', None)
+    assert _next(events) == {'type': 'resolved', 'id': '-a'}
+
+    for i in range(3):
+        store.source.put(f'/-n{i}', {'question': f'Q{i}', 'status': 'pending', 'created_at': str(i)})
+    assert _next(events) == {'type': 'reset'}
+    try:
+        events.get_nowait()
+        leftover = True
+    except queue.Empty:
+        leftover = False
+    assert not leftover
+    assert [request_id for request_id, _ in hub.snapshot()] == ['-n2', '-n1', '-n0']
+
+
+def test_removals_are_looked_up_only_for_subscribers_and_outside_the_lock():
+    class Store:
+        def __init__(self):
+            self.source = LocalEventSource({'-a': {'question': 'Perms?', 'status': 'pending', 'created_at': '1'},
+                                            '-b': {'question': 'Parking?', 'status': 'pending', 'created_at': '2'}})
+            self.reads = []
+            self.questions_during_read = []
+
+        def pending_event_source(self):
+            return self.source
+
+        def get_help_request(self, request_id):
+            self.reads.append(request_id)
+            # Readers on other threads don't wait on this round trip
+            reader = threading.Thread(target=lambda: self.questions_during_read.append(hub.questions()))
+            reader.start()
+            reader.join(1)
+            return {'status': 'resolved'}
+
+    store = Store()
+    hub = PendingQueueHub(store).start()
+    store.source.put('/-a', None)
+    assert store.reads == [] and list(hub.questions()) == ['-b']
+
+    _, events = hub.subscribe()
+    store.source.put('/-b', None)
+    assert _next(events) == {'type': 'resolved', 'id': '-b'}
+    assert store.reads == ['-b'] and store.questions_during_read == [{}]
@@ -0,0 +1,27 @@
+"""
+Provider selection for the shared voice pipeline
+"""
+import pytest
+
+from agent.pipeline import select_providers, warm_pipeline
+
+
+def test_deepgram_voice_prefers_free_llms_first():
+    env = {'DEEPGRAM_API_KEY': 'dg', 'OPENAI_API_KEY': 'oa', 'GROQ_API_KEY': 'gq'}
+    assert select_providers(env, has_deepgram=True) == {'voice': 'deepgram', 'llm': ['groq', 'openai']}
+    assert select_providers({'DEEPGRAM_API_KEY': 'dg', 'ANTHROPIC_API_KEY': 'an'}, has_deepgram=True)['llm'] == ['anthropic']
+
+
+def test_openai_voice_and_missing_configuration():
+    assert select_providers({'DEEPGRAM_API_KEY': 'dg', 'OPENAI_API_KEY': 'oa'}, has_deepgram=False) == {
+        'voice': 'openai', 'llm': ['openai'],
+    }
+    with pytest.raises(RuntimeError, match='LLM required'):
+        select_providers({'DEEPGRAM_API_KEY': 'dg'}, has_deepgram=True)
+    with pytest.raises(RuntimeError, match='No voice provider'):
+        select_providers({}, has_deepgram=True)
+
+
+def test_warm_pipeline_reuses_the_process_copy():
+    cached = object()
+    assert warm_pipeline({'pipeline': cached}) is cached
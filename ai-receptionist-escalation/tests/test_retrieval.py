@@ -0,0 +1,105 @@
+"""
+Top-k KB retrieval and the per-turn prefetch context
+"""
+import asyncio
+
+from agent.knowledge_base import KnowledgeBaseManager
+from agent.retrieval import KBPrefetcher, SpeculativeLookup
+from agent.tools import ToolExecutor
+from utils.kb_index import KnowledgeBaseIndex
+from utils.sqlite_store import SQLiteStore
+
+
+def test_top_k_puts_the_search_answer_first():
+    index = KnowledgeBaseIndex()
+    index.add('a', 'how much is a womens haircut', '$45')
+    index.add('b', 'how much is a mens haircut', '$30')
+    index.add('c', 'do you sell gift cards', 'Yes')
+
+    top = index.search_top_k('how much is a womens haircut today', k=2)
+    assert [key for _, key, _ in top] == ['a', 'b']
+    assert top[0][2] == index.search('how much is a womens haircut today')
+    assert index.search_top_k('parking?') == []
+    assert index.get('c') == ('do you sell gift cards', 'Yes')
+
+
+def test_prefetch_context_and_stats():
+    store = SQLiteStore()
+    store.add_to_knowledge_base('Do you do balayage?', 'Yes, from $150.')
+    store.add_to_knowledge_base('Do you do perms?', 'Yes, from $80.')
+    prefetcher = KBPrefetcher(KnowledgeBaseManager(storage=store, match_mode='fuzzy'), ToolExecutor(2), k=1)
+
+    context = asyncio.run(prefetcher.context_for('Hi, do you do balayage?'))
+    assert 'A: Yes, from $150.' in context and 'perms' not in context
+    assert 'no entry matches' in asyncio.run(prefetcher.context_for('Can I bring my dog?'))
+    assert asyncio.run(prefetcher.context_for('  ')) is None
+    assert prefetcher.stats() == {'turns': 2, 'hits': 1, 'hit_rate': 0.5}
+
+
+class CountingLookup:
+    def __init__(self, delay=0.01):
+        self.delay = delay
+        self.calls = []
+
+    async def __call__(self, text):
+        self.calls.append(text)
+        await asyncio.sleep(self.delay)
+        return [('q', f'answer for {text}')]
+
+
+def test_speculative_lookup_is_reused_by_the_final_transcript():
+    async def scenario():
+        lookup = CountingLookup()
+        speculation = SpeculativeLookup(lookup, stable_seconds=0.02, min_words=2)
+        speculation.on_interim('do you')            # too short
+        speculation.on_interim('do you do perms')
+        speculation.on_interim('do you do perms')    # unchanged: still the same timer
+        await asyncio.sleep(0.05)
+        result = await speculation.result_for('Do you do perms?')
+        return lookup, speculation, result
+
+    lookup, speculation, result = asyncio.run(scenario())
+    assert lookup.calls == ['do you do perms']
+    assert result == [('q', 'answer for do you do perms')]
+    assert speculation.stats()['hits'] == 1 and speculation.stats()['wasted'] == 0
+
+
+def test_superseded_and_mismatched_speculation_counts_as_waste():
+    async def scenario():
+        lookup = CountingLookup(delay=0.05)
+        speculation = SpeculativeLookup(lookup, stable_seconds=0.01, min_words=2)
+        speculation.on_interim('do you do perms')
+        await asyncio.sleep(0.02)
+        speculation.on_interim('do you do perms on short hair')  # cancels the running lookup
+        await asyncio.sleep(0.1)
+        result = await speculation.result_for('Do you do perms on short hair for kids?')
+        return speculation, result
+
+    speculation, result = asyncio.run(scenario())
+    assert result == [('q', 'answer for Do you do perms on short hair for kids?')]
+    stats = speculation.stats()
+    assert (stats['speculated'], stats['hits'], stats['misses']) == (2, 0, 1)
+    assert stats['cancelled'] == 1 and stats['wasted'] == 2
+
+
+def test_cancelling_the_turn_cancels_the_speculative_lookup_too():
+    async def scenario():
+        lookup = CountingLookup(delay=0.2)
+        speculation = SpeculativeLookup(lookup, stable_seconds=0.01, min_words=2)
+        speculation.on_interim('do you do perms')
+        await asyncio.sleep(0.02)
+        _, speculative = speculation._current
+        turn = asyncio.ensure_future(speculation.result_for('Do you do perms?'))
+        await asyncio.sleep(0.01)
+        turn.cancel()
+        try:
+            await turn
+            interrupted = False
+        except asyncio.CancelledError:
+            interrupted = True
+        await asyncio.sleep(0)
+        return lookup, speculative, interrupted
+
+    lookup, speculative, interrupted = asyncio.run(scenario())
+    assert interrupted and speculative.cancelled()
+    assert lookup.calls == ['do you do perms']
@@ -49,7 +49,7 @@ def test_edge_case_1_duplicate_question():
     """
     Edge Case: Same question from two callers simultaneously
 
-    Expected: Two separate help requests created
+    Expected: One shared help request; both callers are texted the answer
     """
     pass
 
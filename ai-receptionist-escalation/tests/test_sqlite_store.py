@@ -0,0 +1,195 @@
+"""
+SQLite backend: schema, round trips and the help-request workflow offline
+"""
+import threading
+
+from agent.help_request import HelpRequestService
+from utils.notification import FakeSMSSink
+from utils.notification_queue import NotificationQueue
+from utils.sqlite_store import SQLiteStore
+
+
+def test_help_request_lifecycle():
+    store = SQLiteStore()
+    request_id = store.create_help_request('Do you offer keratin treatments?', '+1555')
+
+    pending = store.get_pending_requests()
+    assert list(pending) == [request_id]
+    assert pending[request_id]['status'] == 'pending'
+
+    store.update_request_with_answer(request_id, 'Yes, $150')
+    request = store.get_help_request(request_id)
+    assert request['status'] == 'resolved'
+    assert request['supervisor_answer'] == 'Yes, $150'
+    assert request['resolved_at']
+    assert store.get_pending_requests() == {}
+    assert store.get_help_request('missing') is None
+
+
+def test_knowledge_base_search_follows_writes():
+    store = SQLiteStore()
+    assert store.search_knowledge_base('keratin') is None
+    version = store.get_kb_version()
+
+    store.add_to_knowledge_base('Do you offer keratin treatments?', 'Yes, $150')
+    assert store.get_kb_version() == version + 1
+    assert store.search_knowledge_base('do you do keratin treatments') == 'Yes, $150'
+
+
+def test_file_database_uses_wal(tmp_path):
+    store = SQLiteStore(str(tmp_path / 'receptionist.db'))
+    assert store.conn.execute('PRAGMA journal_mode').fetchone()[0] == 'wal'
+    indexes = {row[1] for row in store.conn.execute("PRAGMA index_list('help_requests')")}
+    assert {'idx_help_requests_status_created', 'idx_help_requests_status_resolved',
+            'idx_help_requests_created'} <= indexes
+
+
+def test_respond_to_request_updates_kb():
+    store = SQLiteStore()
+    service = HelpRequestService(storage=store)
+    request_id = service.create_request('Is there parking?', '+1555')
+
+    service.respond_to_request(request_id, 'Street parking out front')
+    assert store.get_help_request(request_id)['status'] == 'resolved'
+    assert service.kb.check_knowledge('is there parking') == 'Street parking out front'
+
+    # Answering again is a no-op
+    service.respond_to_request(request_id, 'Different answer')
+    assert len(store.get_all_knowledge_base()) == 1
+
+
+def test_duplicate_questions_share_one_request():
+    store = SQLiteStore()
+    sink = FakeSMSSink()
+    notifications = NotificationQueue(sink, rate_per_second=0, batch_window_seconds=0.01)
+    service = HelpRequestService(storage=store, notification=notifications)
+
+    first = service.create_request('Do you do balayage?', '+1555')
+    assert service.create_request('do you do balayage', '+1556') == first
+    assert service.create_request('Do you do balayage??', '+1557') == first
+    other = service.create_request('Do you sell gift cards?', '+1558')
+    assert other != first
+    assert len(store.get_pending_requests()) == 2
+    assert store.get_help_request(first)['subscribers'] == ['+1556', '+1557']
+
+    service.respond_to_request(first, 'Yes, from $150.')
+    notifications.flush()
+    assert sorted(phone for phone, _ in sink.texts) == ['+1555', '+1556', '+1557']
+    assert len(sink.alerts) == 2
+
+    # A resolved request takes no more subscribers: the next caller gets a new one
+    assert not store.add_subscriber(first, '+1559')
+    assert service.create_request('Do you do balayage?', '+1559') != first
+
+
+def test_near_miss_questions_get_their_own_requests():
+    store = SQLiteStore()
+    service = HelpRequestService(storage=store, notification=NotificationQueue(FakeSMSSink(), rate_per_second=0))
+
+    mens = service.create_request('How much is a mens haircut?', '+1555')
+    assert service.create_request('how much for a mens haircut', '+1556') == mens
+    for caller, question in enumerate(['How much is a womens haircut?', 'How much is a kids haircut?',
+                                       'How much is a mens haircut and beard trim?']):
+        assert service.create_request(question, f'+1557{caller}') != mens
+    color = service.create_request('Do you do color?', '+1558')
+    assert service.create_request('Do you do color correction?', '+1559') != color
+    assert len(store.get_pending_requests()) == 6
+    assert store.get_help_request(mens)['subscribers'] == ['+1556']
+
+
+def test_simultaneous_duplicates_coalesce_without_querying_the_queue(monkeypatch):
+    store = SQLiteStore()
+    service = HelpRequestService(storage=store, notification=NotificationQueue(FakeSMSSink(), rate_per_second=0))
+    service.pending_hub.start()
+    queries = []
+    monkeypatch.setattr(store, 'get_pending_requests', lambda *a, **kw: queries.append(1) or {})
+
+    callers = [f'+1555000{i}' for i in range(6)]
+    ids = [None] * len(callers)
+    barrier = threading.Barrier(len(callers))
+
+    def call(i):
+        barrier.wait()
+        ids[i] = service.create_request('Do you do balayage?', callers[i])
+
+    threads = [threading.Thread(target=call, args=(i,)) for i in range(len(callers))]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert len(set(ids)) == 1 and queries == []
+    request = store.get_help_request(ids[0])
+    assert sorted([request['caller_phone']] + request['subscribers']) == callers
+
+
+def test_stats_counters_track_writes():
+    store = SQLiteStore()
+    first = store.create_help_request('Do you do perms?', '+1555')
+    second = store.create_help_request('Gift cards?', '+1556')
+    store.create_help_request('Beard trims?', '+1557')
+    store.update_request_with_answer(first, 'Yes')
+    store.mark_request_unresolved(second)
+    store.add_to_knowledge_base('Do you do perms?', 'Yes')
+
+    expected = {'pending': 1, 'resolved': 1, 'unresolved': 1, 'total_kb_entries': 1}
+    assert store.get_stats() == expected
+
+    store.conn.execute("UPDATE request_stats SET count = 99")
+    assert store.rebuild_stats() == expected
+
+
+def test_history_pages_are_ordered_and_filtered():
+    store = SQLiteStore()
+    ids = [store.create_help_request(f'question {i}', '+1555') for i in range(5)]
+    for i, request_id in enumerate(ids):
+        store.conn.execute(
+            "UPDATE help_requests SET status = 'resolved', resolved_at = ? WHERE id = ?",
+            (f'2024-05-0{i + 1}T12:00:00', request_id),
+        )
+
+    first, cursor = store.get_requests_page('resolved', limit=2)
+    assert [k for k, _ in first] == [ids[4], ids[3]]
+    second, cursor = store.get_requests_page('resolved', limit=2, cursor=cursor)
+    assert [k for k, _ in second] == [ids[2], ids[1]]
+    last, cursor = store.get_requests_page('resolved', limit=2, cursor=cursor)
+    assert [k for k, _ in last] == [ids[0]] and cursor is None
+
+    in_range, _ = store.get_requests_page('resolved', start='2024-05-02', end='2024-05-04')
+    assert [k for k, _ in in_range] == [ids[2], ids[1]]
+    assert store.get_requests_page('unresolved') == ([], None)
+
+
+def test_kb_pages_newest_first():
+    store = SQLiteStore()
+    keys = [store.add_to_knowledge_base(f'question {i}', f'answer {i}') for i in range(3)]
+    page, cursor = store.get_kb_page(limit=2)
+    assert [k for k, _ in page] == [keys[2], keys[1]]
+    page, cursor = store.get_kb_page(limit=2, cursor=cursor)
+    assert [k for k, _ in page] == [keys[0]] and cursor is None
+
+
+def test_concurrent_answers_resolve_once(tmp_path):
+    store = SQLiteStore(str(tmp_path / 'receptionist.db'))
+    request_id = store.create_help_request('Do you sell gift cards?', '+1555')
+    barrier = threading.Barrier(4)
+    winners = []
+
+    def answer(text):
+        barrier.wait()
+        before = store.resolve_request(request_id, text)
+        if before['status'] == 'pending':
+            winners.append(text)
+
+    threads = [threading.Thread(target=answer, args=(f'answer {i}',)) for i in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert len(winners) == 1
+    kb = store.get_all_knowledge_base()
+    assert list(kb) == [request_id]
+    assert kb[request_id]['answer'] == winners[0]
+    assert store.get_help_request(request_id)['supervisor_answer'] == winners[0]
+    assert store.get_stats() == {'pending': 0, 'resolved': 1, 'unresolved': 0, 'total_kb_entries': 1}
@@ -0,0 +1,99 @@
+"""
+Tenant resolution, per-tenant KB partitions and the warm-KB LRU
+"""
+import json
+from datetime import datetime, timedelta
+
+from agent.tenants import TenantKnowledgeBases, TenantProfile, TenantRegistry
+from utils.sqlite_store import SQLiteStore
+from utils.timeout_scheduler import RequestTimeoutScheduler
+
+
+def _registry():
+    return TenantRegistry([TenantProfile('uptown', name='Uptown Cuts', hours='10am-8pm', timeout_hours=2),
+                           TenantProfile('acme', name='Acme'), TenantProfile('acme_west', name='Acme West')])
+
+
+def test_resolve_from_metadata_then_room_name():
+    registry = _registry()
+    assert registry.resolve('call_caller_1555', json.dumps({'tenant': 'uptown'})).name == 'Uptown Cuts'
+    assert registry.resolve('tenant_uptown_caller_1555').tenant_id == 'uptown'
+    assert registry.resolve('tenant_unknown_caller_1555').tenant_id == 'default'
+    assert registry.resolve('tenant_acme_west_caller_1555').tenant_id == 'acme_west'
+    assert registry.resolve('tenant_acme_west').tenant_id == 'acme_west'
+    assert registry.resolve('tenant_acme_caller_1555').tenant_id == 'acme'
+    assert registry.resolve('call_caller_1555', 'not json').tenant_id == 'default'
+    assert '10am-8pm' in registry.get('uptown').prompt
+    assert 'Glamour Cuts' in registry.get('default').prompt
+
+
+def test_load_tenants_file(tmp_path):
+    path = tmp_path / 'tenants.json'
+    path.write_text(json.dumps({'tenants': {'uptown': {'name': 'Uptown Cuts', 'voice': 'aura-luna-en'}}}))
+    registry = TenantRegistry.load(str(path))
+    assert set(registry.profiles) == {'default', 'uptown'}
+    assert registry.get('uptown').voice == 'aura-luna-en'
+
+
+def test_kb_partitions_are_isolated():
+    store = SQLiteStore()
+    store.add_to_knowledge_base('Do you do perms?', 'Yes, from $80.')
+    uptown_request = store.create_help_request('Do you do perms?', '+1555', tenant='uptown')
+
+    assert store.search_knowledge_base('Do you do perms?', tenant='uptown') is None
+    default_version = store.get_kb_version()
+
+    store.resolve_request(uptown_request, 'Uptown does not do perms.')
+    assert store.search_knowledge_base('Do you do perms?', tenant='uptown') == 'Uptown does not do perms.'
+    assert store.search_knowledge_base('Do you do perms?') == 'Yes, from $80.'
+    assert store.get_kb_version() == default_version
+    assert len(store.get_all_knowledge_base(tenant='uptown')) == 1
+    assert store.count_kb_entries('uptown') == 1 and store.count_kb_entries() == 1
+    assert store.get_stats()['total_kb_entries'] == 2 == store.rebuild_stats()['total_kb_entries']
+
+
+def test_per_tenant_timeouts():
+    store = SQLiteStore()
+    start = datetime(2024, 5, 1, 9, 0)
+    scheduler = RequestTimeoutScheduler(store, timeout_hours=4, clock=lambda: start,
+                                        tenant_timeouts=_registry().timeouts())
+    scheduler.track('a', start.isoformat())
+    scheduler.track('b', start.isoformat(), 'uptown')
+    assert scheduler.next_deadline() == start + timedelta(hours=2)
+
+
+class FakeManager:
+    def __init__(self, tenant, entries):
+        self.tenant = tenant
+        self.replica = dict.fromkeys(range(entries))
+        self.closed = False
+
+    def save_vectors(self):
+        pass
+
+    def stop_live_sync(self):
+        self.closed = True
+
+
+def test_lru_evicts_least_recently_used_tenant():
+    built = {}
+
+    def factory(tenant):
+        built[tenant] = FakeManager(tenant, 10)
+        return built[tenant]
+
+    kbs = TenantKnowledgeBases(max_warm=2, max_entries=1000, factory=factory)
+    kbs.get('a')
+    kbs.get('b')
+    kbs.get('a')
+    kbs.get('c')
+    assert kbs.warm_tenants() == ['a', 'c']
+    assert built['b'].closed and not built['a'].closed
+
+
+def test_lru_evicts_on_entry_budget():
+    kbs = TenantKnowledgeBases(max_warm=10, max_entries=25, factory=lambda t: FakeManager(t, 10))
+    for tenant in ('a', 'b', 'c'):
+        kbs.get(tenant)
+    assert kbs.warm_tenants() == ['b', 'c']
+    assert kbs.evictions == 1
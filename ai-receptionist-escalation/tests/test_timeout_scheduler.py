@@ -0,0 +1,125 @@
+"""
+Timeout scheduler with an injected clock
+"""
+import threading
+import time
+from datetime import datetime, timedelta
+
+from utils.sqlite_store import SQLiteStore
+from utils.timeout_scheduler import RequestTimeoutScheduler
+
+
+class FakeClock:
+    def __init__(self, now):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+
+def _backdate(store, request_id, created_at):
+    store.conn.execute("UPDATE help_requests SET created_at = ? WHERE id = ?", (created_at.isoformat(), request_id))
+
+
+def test_requests_expire_at_their_own_deadline():
+    store = SQLiteStore()
+    start = datetime(2024, 5, 1, 9, 0)
+    clock = FakeClock(start)
+    early = store.create_help_request('Do you do perms?', '+1555')
+    late = store.create_help_request('Gift cards?', '+1556')
+    _backdate(store, early, start)
+    _backdate(store, late, start + timedelta(minutes=30))
+
+    scheduler = RequestTimeoutScheduler(store, timeout_hours=1, clock=clock)
+    scheduler.refresh()
+    assert len(scheduler) == 2
+    assert scheduler.next_deadline() == start + timedelta(hours=1)
+
+    clock.now = start + timedelta(minutes=59)
+    assert scheduler.run_due() == []
+
+    clock.now = start + timedelta(hours=1, minutes=1)
+    assert scheduler.run_due() == [early]
+    assert store.get_help_request(early)['status'] == 'unresolved'
+    assert store.get_help_request(late)['status'] == 'pending'
+
+    clock.now = start + timedelta(hours=2)
+    assert scheduler.run_due() == [late]
+    assert store.get_stats()['unresolved'] == 2
+
+
+def test_refresh_picks_up_new_requests_and_skips_answered_ones():
+    store = SQLiteStore()
+    start = datetime(2024, 5, 1, 9, 0)
+    clock = FakeClock(start)
+    scheduler = RequestTimeoutScheduler(store, timeout_hours=1, clock=clock)
+    scheduler.refresh()
+    assert len(scheduler) == 0
+
+    answered = store.create_help_request('Is there parking?', '+1555')
+    discarded = store.create_help_request('Beard trims?', '+1556')
+    _backdate(store, answered, start)
+    _backdate(store, discarded, start)
+    scheduler.refresh()
+    assert len(scheduler) == 2
+
+    store.update_request_with_answer(answered, 'Street parking')
+    scheduler.discard(discarded)
+    clock.now = start + timedelta(hours=2)
+    assert scheduler.run_due() == []
+    assert store.get_help_request(answered)['status'] == 'resolved'
+    assert store.get_help_request(discarded)['status'] == 'pending'
+
+
+def test_late_writes_are_caught_by_the_overlap_window_and_the_full_resync():
+    store = SQLiteStore()
+    start = datetime(2024, 5, 1, 9, 0)
+    clock = FakeClock(start)
+    scheduler = RequestTimeoutScheduler(store, timeout_hours=1, clock=clock, overlap_seconds=300,
+                                        full_resync_seconds=3600)
+    newest = store.create_help_request('Do you do perms?', '+1555')
+    _backdate(store, newest, start)
+    scheduler.refresh()
+
+    # Written after that refresh, but stamped earlier (another process's clock)
+    skewed = store.create_help_request('Gift cards?', '+1556')
+    stale = store.create_help_request('Beard trims?', '+1557')
+    _backdate(store, skewed, start - timedelta(minutes=2))
+    _backdate(store, stale, start - timedelta(minutes=20))
+    clock.now = start + timedelta(minutes=1)
+    scheduler.refresh()
+    assert len(scheduler) == 2
+
+    # Answered elsewhere: the full resync forgets it and tracks the stale one
+    store.update_request_with_answer(newest, 'Yes')
+    clock.now = start + timedelta(hours=1)
+    scheduler.refresh()
+    assert len(scheduler) == 2
+
+    clock.now = start + timedelta(hours=2)
+    assert sorted(scheduler.run_due()) == sorted([skewed, stale])
+
+
+def test_concurrent_refreshes_run_one_full_resync():
+    store = SQLiteStore()
+    start = datetime(2024, 5, 1, 9, 0)
+    request_id = store.create_help_request('Do you do perms?', '+1555')
+    _backdate(store, request_id, start)
+    scheduler = RequestTimeoutScheduler(store, timeout_hours=1, clock=FakeClock(start))
+
+    full_reads = []
+    original = store.get_pending_requests
+
+    def slow_pending():
+        full_reads.append(1)
+        time.sleep(0.05)
+        return original()
+
+    store.get_pending_requests = slow_pending
+    # The scheduler thread and the manual /api/timeout-old-requests trigger
+    threads = [threading.Thread(target=scheduler.refresh) for _ in range(2)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert full_reads == [1] and len(scheduler) == 1
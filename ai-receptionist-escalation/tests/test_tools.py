@@ -0,0 +1,63 @@
+"""
+Tool handlers must not block the event loop and must fall back on timeouts
+"""
+import asyncio
+import threading
+import time
+
+from agent.tools import HELP_FALLBACK_REPLY, ToolExecutor, make_tool_handlers
+
+
+class SlowKB:
+    def __init__(self, delay):
+        self.delay = delay
+
+    def check_knowledge(self, question):
+        time.sleep(self.delay)
+        return f"answer to {question}"
+
+
+class SlowHelpService:
+    def __init__(self, delay):
+        self.delay = delay
+        self.created = threading.Event()
+
+    def create_request(self, question, caller_phone, tenant=None):
+        time.sleep(self.delay)
+        self.created.set()
+        return "-req1"
+
+
+def test_lookup_runs_off_the_event_loop():
+    async def scenario():
+        check_kb, _ = make_tool_handlers(SlowKB(0.2), None, '+1555', ToolExecutor(2))
+        ticks = 0
+
+        async def ticker():
+            nonlocal ticks
+            while True:
+                await asyncio.sleep(0.01)
+                ticks += 1
+
+        tick_task = asyncio.create_task(ticker())
+        answer = await check_kb('hours')
+        tick_task.cancel()
+        return answer, ticks
+
+    answer, ticks = asyncio.run(scenario())
+    assert answer == 'answer to hours'
+    assert ticks >= 10
+
+
+def test_kb_timeout_reads_as_not_found(monkeypatch):
+    monkeypatch.setenv('KB_LOOKUP_TIMEOUT_SECONDS', '0.05')
+    check_kb, _ = make_tool_handlers(SlowKB(0.5), None, '+1555', ToolExecutor(1))
+    assert asyncio.run(check_kb('hours')) == ""
+
+
+def test_help_request_timeout_still_persists(monkeypatch):
+    monkeypatch.setenv('HELP_REQUEST_TIMEOUT_SECONDS', '0.05')
+    help_svc = SlowHelpService(0.2)
+    _, request_help = make_tool_handlers(None, help_svc, '+1555', ToolExecutor(1))
+    assert asyncio.run(request_help('parking?')) == HELP_FALLBACK_REPLY
+    assert help_svc.created.wait(2)
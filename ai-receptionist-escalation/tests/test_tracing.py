@@ -0,0 +1,61 @@
+"""
+Spans, histograms and JSON trace logs
+"""
+import asyncio
+import json
+
+from agent.tools import ToolExecutor
+from utils import tracing
+from utils.tracing import Histogram, record_pipeline_metrics, span, start_call
+
+
+def test_histogram_renders_cumulative_buckets():
+    histogram = Histogram('demo_seconds', 'Demo', buckets=(0.1, 1.0))
+    for value in (0.05, 0.5, 0.5, 3.0):
+        histogram.observe(value, span='kb.search')
+    lines = histogram.render()
+    assert 'demo_seconds_bucket{span="kb.search",le="0.1"} 1' in lines
+    assert 'demo_seconds_bucket{span="kb.search",le="1"} 3' in lines
+    assert 'demo_seconds_bucket{span="kb.search",le="+Inf"} 4' in lines
+    assert 'demo_seconds_count{span="kb.search"} 4' in lines
+
+
+def test_spans_in_tool_threads_carry_the_call_tags(tmp_path, monkeypatch):
+    log_path = tmp_path / 'trace.jsonl'
+    monkeypatch.setenv('TRACE_LOG_PATH', str(log_path))
+    monkeypatch.setattr(tracing, '_log_file', None)
+
+    def lookup(question):
+        with span('kb.search', question=question):
+            return 'Yes'
+
+    async def call():
+        start_call(room='caller_15551234', caller='+15551234').next_turn()
+        executor = ToolExecutor(max_workers=1)
+        return await executor.run(lookup, 'perms?', timeout=1, span_name='tool.check_knowledge_base')
+
+    assert asyncio.run(call()) == 'Yes'
+    tracing._log_file.close()
+    records = [json.loads(line) for line in log_path.read_text().splitlines()]
+    assert [r['span'] for r in records] == ['kb.search', 'tool.check_knowledge_base']
+    assert {(r['room'], r['caller'], r['turn']) for r in records} == {('caller_15551234', '+15551234', 1)}
+    assert records[0]['question'] == 'perms?'
+    assert 'receptionist_span_seconds_count{span="tool.check_knowledge_base",status="ok"}' in tracing.render_prometheus()
+
+
+def test_timeouts_and_livekit_metrics_are_recorded():
+    async def slow():
+        executor = ToolExecutor(max_workers=1)
+        return await executor.run(__import__('time').sleep, 0.2, timeout=0.01, fallback='', span_name='tool.slow')
+
+    assert asyncio.run(slow()) == ''
+
+    class LLMMetrics:
+        ttft = 0.42
+        duration = 1.3
+        speech_id = 'sp_1'
+
+    record_pipeline_metrics(LLMMetrics())
+    text = tracing.render_prometheus()
+    assert 'receptionist_span_seconds_count{span="tool.slow",status="timeout"} 1' in text
+    assert 'receptionist_pipeline_seconds_count{stage="llm_ttft"}' in text
@@ -0,0 +1,100 @@
+"""
+On-disk TTS audio cache: LRU size cap, KB invalidation, warm-up selection, reply matching
+"""
+import asyncio
+import threading
+
+from agent.tts_cache import AudioCache, cached_tts_node, could_match, warm_items
+
+PCM = b'\x00\x01' * 500  # 1000 bytes
+
+
+def test_content_addressed_lru_within_the_size_cap(tmp_path):
+    path = str(tmp_path / 'tts.db')
+    cache = AudioCache(path, max_bytes=2500)
+    cache.put('deepgram', 'aura-asteria-en', 'Thank you for calling!', PCM, 24000, 1)
+    cache.put('deepgram', 'aura-asteria-en', 'We open at 9am.', PCM, 24000, 1)
+    assert cache.get('deepgram', 'aura-luna-en', 'Thank you for calling!') is None
+    assert cache.get('deepgram', 'aura-asteria-en', ' Thank you  for calling! ') == (PCM, 24000, 1)
+
+    # The greeting was just played, so the hours clip is the one evicted
+    cache.put('deepgram', 'aura-asteria-en', 'Street parking out front.', PCM, 24000, 1)
+    assert cache.evictions == 1
+    assert not cache.contains('deepgram', 'aura-asteria-en', 'We open at 9am.')
+    assert not cache.put('deepgram', 'aura-asteria-en', 'Too long', PCM * 3, 24000, 1)
+
+    # Shared on disk with other worker processes
+    again = AudioCache(path, max_bytes=2500)
+    assert sorted(again.texts('deepgram', 'aura-asteria-en')) == ['Street parking out front.', 'Thank you for calling!']
+
+
+def test_kb_answer_changes_drop_their_audio():
+    cache = AudioCache(':memory:')
+    cache.put('openai', 'alloy', 'Perms start at $80.', PCM, 24000, 1, tenant='default', kb_key='k1')
+    cache.put('openai', 'alloy', 'Gift cards at the front desk.', PCM, 24000, 1, tenant='default', kb_key='k2')
+    cache.put('openai', 'alloy', 'Hello!', PCM, 24000, 1)
+
+    cache.on_kb_change('k1', {'answer': 'Perms start at $80.'})  # same answer: kept
+    cache.on_kb_change('k1', {'answer': 'Perms start at $95.'})
+    assert not cache.contains('openai', 'alloy', 'Perms start at $80.')
+
+    cache.record_demand('default', {'Gift cards at the front desk.': 3, 'Old answer': 1})
+    cache.sync_kb('default', {})  # k2 removed while no worker was listening
+    assert cache.texts('openai', 'alloy') == ['Hello!']
+    assert cache.demand() == {} and cache.invalidations == 2
+
+
+def test_warm_items_ranks_kb_answers_by_demand():
+    kb = {
+        'k1': {'question': 'perms?', 'answer': 'Perms start at $80.'},
+        'k2': {'question': 'parking?', 'answer': 'Street  parking out front.'},
+        'k3': {'question': 'gift cards?', 'answer': 'At the front desk.'},
+    }
+    demand = {'Street parking out front.': 5, 'Perms start at $80.': 2, 'No longer in the KB': 9}
+    assert warm_items('Hi!', kb, demand, limit=1) == [('Hi!', None), ('Street parking out front.', 'k2')]
+    assert [text for text, _ in warm_items('Hi!', kb, demand, limit=5)] == [
+        'Hi!', 'Street parking out front.', 'Perms start at $80.',
+    ]
+
+
+def test_replies_that_diverge_from_cached_text_go_to_the_tts():
+    cache = AudioCache(':memory:')
+    cache.put('openai', 'alloy', 'We open at 9am.', PCM, 24000, 1)
+    assert could_match('We open', ['We open at 9am.'])
+    assert not could_match('We close', ['We open at 9am.'])
+
+    async def llm_reply():
+        for chunk in ['We ', 'open ', 'at ', '10am ', 'on ', 'Sundays.']:
+            yield chunk
+
+    async def fake_tts(stream):
+        yield ''.join([chunk async for chunk in stream])
+
+    async def run():
+        return [frame async for frame in cached_tts_node(llm_reply(), fake_tts, cache, 'openai', 'alloy')]
+
+    assert asyncio.run(run()) == ['We open at 10am on Sundays.']
+    assert cache.stats()['hits'] == 0
+
+
+def test_cache_reads_run_off_the_event_loop():
+    cache = AudioCache(':memory:')
+    cache.put('openai', 'alloy', 'We open at 9am.', PCM, 24000, 1)
+    threads = []
+    for name in ('texts', 'get'):
+        original = getattr(cache, name)
+        setattr(cache, name, lambda *args, _original=original: threads.append(threading.get_ident()) or _original(*args))
+
+    async def llm_reply():
+        yield 'We open'  # a prefix of a cached text: both texts() and get() run
+
+    async def fake_tts(stream):
+        yield ''.join([chunk async for chunk in stream])
+
+    async def run():
+        loop_thread = threading.get_ident()
+        frames = [frame async for frame in cached_tts_node(llm_reply(), fake_tts, cache, 'openai', 'alloy')]
+        return loop_thread, frames
+
+    loop_thread, frames = asyncio.run(run())
+    assert frames == ['We open'] and len(threads) == 2 and loop_thread not in threads
@@ -0,0 +1,87 @@
+"""
+LRU/TTL cache of KB lookups keyed by the normalized caller question.
+
+Misses are cached too, so a question the KB can't answer doesn't trigger a
+fresh scan every time it is repeated. Every lookup carries the current KB
+version; when it differs from the version the cache was filled under, the
+whole cache is dropped.
+"""
+
+import os
+import threading
+import time
+from collections import OrderedDict
+
+from utils.kb_index import normalize
+
+
+class AnswerCache:
+    def __init__(self, max_entries: int = None, ttl_seconds: float = None, clock=time.monotonic):
+        self.max_entries = max_entries if max_entries is not None else int(os.getenv('ANSWER_CACHE_SIZE', 512))
+        self.ttl = ttl_seconds if ttl_seconds is not None else float(os.getenv('ANSWER_CACHE_TTL_SECONDS', 300))
+        self.clock = clock
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+        self._version = None
+        self._entries: OrderedDict[str, tuple[float, str | None]] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, question: str, version=None) -> tuple[bool, str | None]:
+        """(hit, answer); a hit with answer None is a cached miss"""
+        key = normalize(question).strip()
+        with self._lock:
+            self._check_version(version)
+            cached = self._entries.get(key)
+            if cached is not None and cached[0] > self.clock():
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return True, cached[1]
+            if cached is not None:
+                del self._entries[key]
+            self.misses += 1
+            return False, None
+
+    def put(self, question: str, answer: str | None, version=None):
+        if self.max_entries <= 0:
+            return
+        key = normalize(question).strip()
+        with self._lock:
+            if version is not None and self._version is not None and version != self._version:
+                # The KB changed while this answer was being computed
+                return
+            self._check_version(version)
+            self._entries[key] = (self.clock() + self.ttl, answer)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            if self._entries:
+                self.invalidations += 1
+            self._entries.clear()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': round(self.hits / lookups, 3) if lookups else 0.0,
+            'size': len(self._entries),
+            'max_entries': self.max_entries,
+            'evictions': self.evictions,
+            'invalidations': self.invalidations,
+        }
+
+    def _check_version(self, version):
+        if version is not None and version != self._version:
+            if self._entries:
+                self.invalidations += 1
+                self._entries.clear()
+            self._version = version
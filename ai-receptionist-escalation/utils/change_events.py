@@ -0,0 +1,99 @@
+"""
+Change-event plumbing shared by local replicas.
+
+Mirrors the firebase-admin listener contract: a source exposes
+``listen(callback)`` returning a registration with ``close()``, and the
+callback receives events with ``event_type`` ('put' or 'patch'), ``path``
+and ``data``. ``db.Reference`` satisfies this directly; LocalEventSource is
+an in-process stand-in for tests and local backends.
+"""
+
+import copy
+import threading
+from collections import namedtuple
+
+ChangeEvent = namedtuple('ChangeEvent', ['event_type', 'path', 'data'])
+
+
+def split_path(path: str) -> list[str]:
+    return [part for part in (path or '').split('/') if part]
+
+
+class _Registration:
+    def __init__(self, source, callback):
+        self._source = source
+        self._callback = callback
+
+    def close(self):
+        self._source._remove_listener(self._callback)
+
+
+class LocalEventSource:
+    """In-memory node that notifies listeners like a Firebase reference.
+
+    Listeners first get a 'put' of the whole node at '/', then every change.
+    """
+
+    def __init__(self, initial: dict = None):
+        self._lock = threading.Lock()
+        self._data = copy.deepcopy(initial) if initial else {}
+        self._listeners = []
+
+    def listen(self, callback):
+        with self._lock:
+            self._listeners.append(callback)
+            snapshot = copy.deepcopy(self._data)
+        callback(ChangeEvent('put', '/', snapshot))
+        return _Registration(self, callback)
+
+    def get(self):
+        with self._lock:
+            return copy.deepcopy(self._data)
+
+    def put(self, path: str, data):
+        """Set (or delete, with None) the value at path and notify listeners"""
+        with self._lock:
+            parts = split_path(path)
+            if not parts:
+                self._data = copy.deepcopy(data) if data else {}
+            else:
+                _set_nested(self._data, parts, copy.deepcopy(data))
+        self._emit(ChangeEvent('put', '/' + '/'.join(split_path(path)), data))
+
+    def patch(self, path: str, data: dict):
+        """Update several children under path in one event"""
+        with self._lock:
+            base = split_path(path)
+            for key, value in data.items():
+                _set_nested(self._data, base + split_path(key), copy.deepcopy(value))
+        self._emit(ChangeEvent('patch', '/' + '/'.join(split_path(path)), data))
+
+    def _emit(self, event):
+        with self._lock:
+            listeners = list(self._listeners)
+        for callback in listeners:
+            callback(event)
+
+    def _remove_listener(self, callback):
+        with self._lock:
+            if callback in self._listeners:
+                self._listeners.remove(callback)
+
+
+def _set_nested(tree: dict, parts: list[str], value):
+    """Set value at parts inside tree, pruning emptied parents on delete"""
+    node = tree
+    for part in parts[:-1]:
+        child = node.get(part)
+        if not isinstance(child, dict):
+            if value is None:
+                return
+            child = {}
+            node[part] = child
+        node = child
+    if value is None:
+        node.pop(parts[-1], None)
+    else:
+        node[parts[-1]] = value
+    if value is None and len(parts) > 1 and not node:
+        _set_nested(tree, parts[:-1], None)
@@ -1,12 +1,17 @@
-import firebase_admin
-from firebase_admin import credentials, db
+import copy
 import os
+from concurrent.futures import ThreadPoolExecutor
 from dotenv import load_dotenv
 from datetime import datetime, timedelta
+from utils.push_id import generate_push_id
+from utils.storage import StorageBackend, DEFAULT_TENANT, REQUEST_STATUSES, STAT_KEYS, decode_cursor, order_field, paginate, tenant_key
 
 load_dotenv('.env.local')
 
-class FirebaseClient:
+# Timeout transactions in flight at once during a sweep
+EXPIRE_CONCURRENCY = int(os.getenv('FIREBASE_EXPIRE_CONCURRENCY', 16))
+
+class FirebaseClient(StorageBackend):
     _instance = None
 
     def __new__(cls):
@@ -18,6 +23,9 @@ class FirebaseClient:
     @classmethod
     def _initialize(cls):
         """Initialize Firebase Admin SDK with error handling"""
+        import firebase_admin
+        from firebase_admin import credentials
+
         try:
             cred_path = os.getenv('FIREBASE_CREDENTIALS_PATH')
             db_url = os.getenv('FIREBASE_DATABASE_URL')
@@ -51,20 +59,33 @@ class FirebaseClient:
 
     def get_ref(self, path):
         """Get database reference"""
+        from firebase_admin import db
+
         return db.reference(path)
 
-    def create_help_request(self, question, caller_phone):
-        """Create a new help request"""
-        requests_ref = self.get_ref('help_requests')
-        new_request = requests_ref.push({
-            'question': question,
-            'caller_phone': caller_phone,
-            'status': 'pending',
-            'created_at': datetime.utcnow().isoformat(),
-            'resolved_at': None,
-            'supervisor_answer': None
+    def create_help_request(self, question, caller_phone, tenant=None):
+        """Create a new help request (and its pending_requests/ mirror entry)"""
+        request_id = generate_push_id()
+        created_at = datetime.utcnow().isoformat()
+        self.get_ref('/').update({
+            f'help_requests/{request_id}': {
+                'question': question,
+                'caller_phone': caller_phone,
+                'status': 'pending',
+                'created_at': created_at,
+                'resolved_at': None,
+                'supervisor_answer': None,
+                'status_ts': f'pending|{created_at}',
+                'tenant_id': tenant_key(tenant),
+            },
+            f'pending_requests/{request_id}': _pending_summary(question, caller_phone, created_at, tenant_key(tenant)),
         })
-        return new_request.key
+        self._bump_stats(pending=1)
+        return request_id
+
+    def get_help_request(self, request_id):
+        """Get one help request, or None"""
+        return self.get_ref(f'help_requests/{request_id}').get()
 
     def get_pending_requests(self):
         """Get all pending help requests"""
@@ -77,115 +98,384 @@ class FirebaseClient:
         requests_ref = self.get_ref('help_requests')
         return requests_ref.get() or {}
 
+    def get_requests_page(self, status, limit=50, cursor=None, start=None, end=None):
+        """Ordered query on the composite status_ts child ("<status>|<timestamp>")"""
+        field = order_field(status)
+        return self._query_page(
+            self.get_ref('help_requests').order_by_child('status_ts'),
+            lambda data: (data.get('status_ts') or '').partition('|')[2],
+            f'{status}|', field, limit, cursor, start, end,
+        )
+
+    def _query_page(self, query, timestamp_of, prefix, field, limit, cursor, start, end):
+        """Run a start_at/end_at/limit_to_last page query, newest first.
+
+        end_at is inclusive, so rows at or after the cursor (or end) are
+        dropped here; the fetch widens in the rare case ties eat the page.
+        """
+        position = decode_cursor(cursor)
+        upper = end
+        if position and (upper is None or position[0] < upper):
+            upper = position[0]
+        query = query.start_at(prefix + (start or ''))
+        query = query.end_at(prefix + upper if upper else prefix + '\uf8ff')
+
+        def wanted(record_id, data):
+            timestamp = timestamp_of(data)
+            if end and timestamp >= end:
+                return False
+            if position and (timestamp, record_id) >= position:
+                return False
+            return True
+
+        # One extra row to tell whether there is a next page, one more for the cursor row itself
+        fetch = limit + 1 + (1 if position else 0)
+        while True:
+            result = query.limit_to_last(fetch).get() or {}
+            rows = [(k, v) for k, v in result.items() if wanted(k, v)]
+            if len(rows) > limit or len(result) < fetch:
+                break
+            fetch *= 2
+
+        rows.sort(key=lambda row: (timestamp_of(row[1]), row[0]), reverse=True)
+        return paginate(rows, limit, field)
+
     def update_request_with_answer(self, request_id, answer):
         """Mark request as resolved with supervisor answer"""
-        request_ref = self.get_ref(f'help_requests/{request_id}')
-        request_ref.update({
-            'status': 'resolved',
-            'supervisor_answer': answer,
-            'resolved_at': datetime.utcnow().isoformat()
+        resolved_at = datetime.utcnow().isoformat()
+        self.get_ref('/').update({
+            f'help_requests/{request_id}/status': 'resolved',
+            f'help_requests/{request_id}/supervisor_answer': answer,
+            f'help_requests/{request_id}/resolved_at': resolved_at,
+            f'help_requests/{request_id}/status_ts': f'resolved|{resolved_at}',
+            f'pending_requests/{request_id}': None,
         })
+        self._bump_stats(pending=-1, resolved=1)
+
+    def resolve_request(self, request_id, answer):
+        """Claim the request with a transaction, then write its KB entry.
+
+        The transaction flips pending -> resolved only if the request is
+        still pending, so of two supervisors answering at once exactly one
+        wins; the other gets the request back as already resolved and
+        nobody is texted twice. The transaction also serializes with
+        add_subscriber, so the claimed snapshot has the final subscriber
+        list. The KB entry is keyed by the request ID; if the process dies
+        between the claim and its write, rebuild_stats backfills it.
+        """
+        resolved_at = datetime.utcnow().isoformat()
+        claim = {}
+
+        def apply(current):
+            claim.clear()
+            claim['before'] = copy.deepcopy(current)
+            if not current or current.get('status') != 'pending':
+                return current
+            current.update({
+                'status': 'resolved',
+                'supervisor_answer': answer,
+                'resolved_at': resolved_at,
+                'status_ts': f'resolved|{resolved_at}',
+            })
+            claim['won'] = True
+            return current
+
+        self.get_ref(f'help_requests/{request_id}').transaction(apply)
+        request_data = claim.get('before')
+        if not claim.get('won'):
+            return request_data
+
+        tenant = request_data.get('tenant_id')
+        self.get_ref('/').update({
+            f'pending_requests/{request_id}': None,
+            f'{_kb_path(tenant)}/{request_id}': {
+                'question': request_data['question'].lower().strip(),
+                'answer': answer,
+                'learned_from_request_id': request_id,
+                'created_at': resolved_at,
+            },
+        })
+        self._bump_stats(pending=-1, resolved=1, total_kb_entries=1,
+                         **{_version_key(tenant): 1, _entries_key(tenant): 1})
+        return request_data
+
+    def add_subscriber(self, request_id, caller_phone):
+        """Transaction on the request node, so it can't race a resolve"""
+        attached = []
+
+        def apply(current):
+            attached.clear()
+            if not current or current.get('status') != 'pending':
+                return current
+            current.setdefault('subscribers', {})[caller_phone] = True
+            attached.append(True)
+            return current
+
+        try:
+            self.get_ref(f'help_requests/{request_id}').transaction(apply)
+        except Exception as e:
+            print(f"⚠️ Could not attach caller to request {request_id}: {e}")
+            return False
+        return bool(attached)
 
     def mark_request_unresolved(self, request_id):
-        """Mark request as unresolved due to timeout"""
-        request_ref = self.get_ref(f'help_requests/{request_id}')
-        request_ref.update({
-            'status': 'unresolved',
-            'resolved_at': datetime.utcnow().isoformat()
-        })
+        """Mark request as unresolved due to timeout (if it is still pending)"""
+        self.mark_requests_unresolved([request_id])
+
+    def get_requests_created_since(self, created_at):
+        """Ordered created_at range query (only new requests come back)"""
+        requests_ref = self.get_ref('help_requests')
+        return requests_ref.order_by_child('created_at').start_at(created_at).get() or {}
+
+    def mark_requests_unresolved(self, request_ids):
+        """Time out a batch: claim every request with a transaction, then one mirror cleanup.
 
-    def add_to_knowledge_base(self, question, answer, request_id=None):
-        """Add learned Q&A to knowledge base"""
-        kb_ref = self.get_ref('knowledge_base')
-        kb_ref.push({
+        A transaction only flips a request that is still pending, so one
+        answered in the meantime is never turned back to unresolved. The
+        transactions run concurrently (EXPIRE_CONCURRENCY at a time), so a
+        sweep costs about one round trip rather than one per request.
+        """
+        request_ids = list(request_ids)
+        if not request_ids:
+            return []
+        resolved_at = datetime.utcnow().isoformat()
+
+        def claim(request_id):
+            won = []
+
+            def expire(current):
+                # May run more than once if the request changes under us
+                won.clear()
+                if not current or current.get('status') != 'pending':
+                    return current
+                current.update({'status': 'unresolved', 'resolved_at': resolved_at,
+                                'status_ts': f'unresolved|{resolved_at}'})
+                won.append(True)
+                return current
+
+            self.get_ref(f'help_requests/{request_id}').transaction(expire)
+            return bool(won)
+
+        workers = min(EXPIRE_CONCURRENCY, len(request_ids))
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix='expire') as pool:
+            claimed = list(pool.map(claim, request_ids))
+        expired = [request_id for request_id, won in zip(request_ids, claimed) if won]
+        if not expired:
+            return []
+
+        self.get_ref('/').update({f'pending_requests/{request_id}': None for request_id in expired})
+        self._bump_stats(pending=-len(expired), unresolved=len(expired))
+        return expired
+
+    def add_to_knowledge_base(self, question, answer, request_id=None, tenant=None):
+        """Add learned Q&A to the tenant's knowledge base"""
+        kb_ref = self.get_ref(_kb_path(tenant))
+        new_entry = kb_ref.push({
             'question': question.lower().strip(),
             'answer': answer,
             'learned_from_request_id': request_id,
             'created_at': datetime.utcnow().isoformat()
         })
+        self._bump_stats(total_kb_entries=1, **{_version_key(tenant): 1, _entries_key(tenant): 1})
+        return new_entry.key
 
-    def search_knowledge_base(self, question):
-        """Search KB for similar question using simple fuzzy matching.
+    def add_kb_entries(self, entries, tenant=None):
+        """One multi-path update for the whole batch (push IDs generated locally).
 
-        Strategy:
-        - Normalize text (lowercase, strip, collapse spaces)
-        - Exact/substring match
-        - Token overlap score (Jaccard) with stopword removal
-        - Fallback to difflib ratio
-        Returns the best answer above threshold, else None.
+        Entries without created_at get now plus one microsecond per entry:
+        distinct, increasing timestamps keep _query_page from widening its
+        fetch over one big tie group.
         """
-        import re
-        from difflib import SequenceMatcher
-
-        kb_ref = self.get_ref('knowledge_base')
-        all_kb = kb_ref.get() or {}
-
-        def normalize(text: str) -> str:
-            text = (text or '').lower().strip()
-            text = re.sub(r"[^a-z0-9\s]", " ", text)
-            text = re.sub(r"\s+", " ", text)
-            return text
-
-        STOPWORDS = {
-            'the','a','an','do','does','is','are','what','which','and','or','to','for','of',
-            'you','your','we','our','on','in','at','about','including','with','vs','list'
-        }
-
-        def tokens(text: str) -> set[str]:
-            return {t for t in normalize(text).split() if t and t not in STOPWORDS}
-
-        query_raw = question or ''
-        query_norm = normalize(query_raw)
-        query_tokens = tokens(query_raw)
-
-        best = (0.0, None)  # (score, answer)
-
-        for _, kb_entry in all_kb.items():
-            kb_q_raw = kb_entry.get('question', '')
-            kb_a = kb_entry.get('answer')
-            kb_q_norm = normalize(kb_q_raw)
+        now = datetime.utcnow()
+        updates = {}
+        for offset, entry in enumerate(entries):
+            updates[generate_push_id()] = {
+                'question': entry['question'].lower().strip(),
+                'answer': entry.get('answer'),
+                'learned_from_request_id': entry.get('learned_from_request_id'),
+                'created_at': entry.get('created_at') or (now + timedelta(microseconds=offset)).isoformat(),
+            }
+        if updates:
+            self.get_ref(_kb_path(tenant)).update(updates)
+            self._bump_stats(total_kb_entries=len(updates),
+                             **{_version_key(tenant): 1, _entries_key(tenant): len(updates)})
+        return list(updates)
+
+    def get_all_knowledge_base(self, tenant=None):
+        """Get all KB entries"""
+        kb_ref = self.get_ref(_kb_path(tenant))
+        return kb_ref.get() or {}
 
-            # Exact/substring
-            if query_norm == kb_q_norm or query_norm in kb_q_norm or kb_q_norm in query_norm:
-                return kb_a
+    def get_kb_page(self, limit=50, cursor=None, start=None, end=None, tenant=None):
+        """Ordered query on created_at"""
+        return self._query_page(
+            self.get_ref(_kb_path(tenant)).order_by_child('created_at'),
+            lambda data: data.get('created_at') or '',
+            '', 'created_at', limit, cursor, start, end,
+        )
+
+    def count_kb_entries(self, tenant=None):
+        """stats/kb_entries:<tenant>, kept alongside total_kb_entries (one tiny read)"""
+        count = self.get_ref(f'stats/{_entries_key(tenant)}').get()
+        if count is None:
+            # Written before per-tenant counters: count keys only
+            count = len(self.get_ref(_kb_path(tenant)).get(shallow=True) or {})
+        return count
+
+    def _count_kb_entries_by_tenant(self):
+        return {tenant: len(keys) for tenant, keys in self._kb_keys_by_tenant().items()}
+
+    def _kb_keys_by_tenant(self):
+        """Shallow reads (keys only) of the default KB and every tenants/<t>/knowledge_base"""
+        tenants = [DEFAULT_TENANT] + [t for t in self.get_ref('tenants').get(shallow=True) or {} if t != DEFAULT_TENANT]
+        return {tenant: set(self.get_ref(_kb_path(tenant)).get(shallow=True) or {}) for tenant in tenants}
+
+    def _backfill_learned_answers(self, all_requests, kb_keys):
+        """Write the KB entry of every resolved request that has none (idempotent: keyed by request ID)"""
+        missing = {}
+        for req_id, req_data in all_requests.items():
+            if req_data.get('status') != 'resolved' or not req_data.get('supervisor_answer'):
+                continue
+            tenant = tenant_key(req_data.get('tenant_id'))
+            if req_id not in kb_keys.setdefault(tenant, set()):
+                missing.setdefault(tenant, {})[req_id] = req_data
+
+        updates = {}
+        for tenant, requests in missing.items():
+            # Entries learned before KB keys were request IDs point back with learned_from_request_id
+            learned = {entry.get('learned_from_request_id') for entry in self.get_all_knowledge_base(tenant).values()}
+            for req_id, req_data in requests.items():
+                if req_id in learned:
+                    continue
+                updates[f'{_kb_path(tenant)}/{req_id}'] = {
+                    'question': (req_data.get('question') or '').lower().strip(),
+                    'answer': req_data['supervisor_answer'],
+                    'learned_from_request_id': req_id,
+                    'created_at': req_data.get('resolved_at') or datetime.utcnow().isoformat(),
+                }
+                kb_keys[tenant].add(req_id)
+        if updates:
+            self.get_ref('/').update(updates)
+            print(f"🧮 Backfilled {len(updates)} KB entries of resolved requests")
+
+    def get_kb_version(self, tenant=None):
+        """stats/kb_version[:<tenant>], bumped alongside total_kb_entries (one tiny read)"""
+        return self.get_ref(f'stats/{_version_key(tenant)}').get() or 0
+
+    def kb_event_source(self, tenant=None):
+        """The tenant's KB reference itself streams put/patch events"""
+        return self.get_ref(_kb_path(tenant))
+
+    def pending_event_source(self):
+        """pending_requests/ mirrors exactly the open requests, so listening stays small"""
+        return self.get_ref('pending_requests')
+
+    def get_stats(self):
+        """Read the counters kept under stats/ (one small read)"""
+        stats = self.get_ref('stats').get()
+        if not stats:
+            stats = self.rebuild_stats()
+        return {key: stats.get(key, 0) for key in STAT_KEYS}
+
+    def rebuild_stats(self):
+        """Recount requests and KB entries and reconcile stats/.
+
+        Writers keep bumping the counters while the scans run, so the
+        recount isn't written over them: a transaction sets each counter to
+        its recount plus whatever it moved since that scan was read. Also
+        backfills status_ts on requests written before it existed and the
+        KB entries of resolved requests that are missing one, and brings
+        the pending_requests/ mirror in line with the requests.
+        """
+        all_requests = self.get_all_requests()
+        request_baseline = self.get_ref('stats').get() or {}
+        kb_keys = self._kb_keys_by_tenant()
+        kb_baseline = self.get_ref('stats').get() or {}
+        self._backfill_learned_answers(all_requests, kb_keys)
+        kb_counts = {tenant: len(keys) for tenant, keys in kb_keys.items()}
+        counts = self._count_stats(all_requests, kb_counts)
+        counts.update({_entries_key(tenant): count for tenant, count in kb_counts.items()})
+        versions = {_version_key(tenant) for tenant in kb_counts}
+
+        def apply(current):
+            current = current or {}
+            for key, count in counts.items():
+                baseline = request_baseline if key in REQUEST_STATUSES else kb_baseline
+                current[key] = max(count + (current.get(key) or 0) - (baseline.get(key) or 0), 0)
+            # Keep every tenant's kb_version moving forward so caches keyed on it are invalidated
+            for key in versions | {key for key in current if key.startswith('kb_version')}:
+                current[key] = (current.get(key) or 0) + 1
+            return current
+
+        stats = self.get_ref('stats').transaction(apply)
+
+        missing = {}
+        for req_id, req_data in all_requests.items():
+            status = req_data.get('status')
+            timestamp = req_data.get(order_field(status)) or ''
+            if status and req_data.get('status_ts') != f'{status}|{timestamp}':
+                missing[f'{req_id}/status_ts'] = f'{status}|{timestamp}'
+        if missing:
+            self.get_ref('help_requests').update(missing)
+            print(f"🧮 Backfilled status_ts on {len(missing)} requests")
+
+        self._sync_pending_mirror(all_requests)
+        return stats
+
+    def _sync_pending_mirror(self, all_requests):
+        """Add missing pending requests to pending_requests/ and drop the rest, by multi-path update.
+
+        The request snapshot is older than the mirror, so a request is only
+        added after re-reading that it is still pending, and a mirror entry
+        the snapshot doesn't know (created since) is only dropped if the
+        request is gone or no longer pending.
+        """
+        mirrored = set(self.get_ref('pending_requests').get(shallow=True) or {})
+        pending = {req_id for req_id, req_data in all_requests.items() if req_data.get('status') == 'pending'}
+
+        updates = {}
+        for req_id in pending - mirrored:
+            req_data = self.get_help_request(req_id) or {}
+            if req_data.get('status') == 'pending':
+                updates[req_id] = _pending_summary(req_data.get('question'), req_data.get('caller_phone'),
+                                                   req_data.get('created_at'), req_data.get('tenant_id', DEFAULT_TENANT))
+        for req_id in mirrored - pending:
+            if req_id in all_requests or self.get_ref(f'help_requests/{req_id}/status').get() != 'pending':
+                updates[req_id] = None
+        if updates:
+            self.get_ref('pending_requests').update(updates)
+            print(f"🧮 Pending mirror: {sum(v is not None for v in updates.values())} added, "
+                  f"{sum(v is None for v in updates.values())} removed")
+
+    def _bump_stats(self, **deltas):
+        """Apply counter deltas atomically; failures are fixed by rebuild_stats"""
+        def apply(current):
+            current = current or {}
+            for key, delta in deltas.items():
+                current[key] = max((current.get(key) or 0) + delta, 0)
+            return current
 
-            # Token Jaccard
-            qtok = query_tokens
-            ktok = tokens(kb_q_raw)
-            if qtok and ktok:
-                inter = len(qtok & ktok)
-                union = len(qtok | ktok)
-                jacc = inter / union if union else 0.0
-            else:
-                jacc = 0.0
+        try:
+            self.get_ref('stats').transaction(apply)
+        except Exception as e:
+            print(f"⚠️ Could not update stats counters: {e}")
 
-            # difflib ratio on normalized strings
-            ratio = SequenceMatcher(None, query_norm, kb_q_norm).ratio()
 
-            # Combined score (weighted)
-            score = 0.7 * jacc + 0.3 * ratio
+def _pending_summary(question, caller_phone, created_at, tenant=DEFAULT_TENANT):
+    return {'question': question, 'caller_phone': caller_phone, 'status': 'pending', 'created_at': created_at,
+            'tenant_id': tenant}
 
-            if score > best[0]:
-                best = (score, kb_a)
 
-        # Threshold to accept fuzzy match
-        return best[1] if best[0] >= 0.35 else None
+def _kb_path(tenant=None):
+    """The default tenant keeps the original top-level knowledge_base node"""
+    tenant = tenant_key(tenant)
+    return 'knowledge_base' if tenant == DEFAULT_TENANT else f'tenants/{tenant}/knowledge_base'
 
-    def get_all_knowledge_base(self):
-        """Get all KB entries"""
-        kb_ref = self.get_ref('knowledge_base')
-        return kb_ref.get() or {}
 
-    def check_and_timeout_old_requests(self):
-        """Auto-timeout requests older than threshold"""
-        timeout_hours = int(os.getenv('REQUEST_TIMEOUT_HOURS', 4))
-        requests_ref = self.get_ref('help_requests')
-        pending = requests_ref.order_by_child('status').equal_to('pending').get() or {}
+def _entries_key(tenant=None):
+    return f'kb_entries:{tenant_key(tenant)}'
 
-        timeout_threshold = datetime.utcnow() - timedelta(hours=timeout_hours)
 
-        for req_id, req_data in pending.items():
-            created_at = datetime.fromisoformat(req_data['created_at'])
-            if created_at < timeout_threshold:
-                self.mark_request_unresolved(req_id)
-                print(f"⏰ Request {req_id} auto-timed out after {timeout_hours} hours")
\ No newline at end of file
+def _version_key(tenant=None):
+    tenant = tenant_key(tenant)
+    return 'kb_version' if tenant == DEFAULT_TENANT else f'kb_version:{tenant}'
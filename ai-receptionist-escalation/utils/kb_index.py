@@ -0,0 +1,293 @@
+"""
+In-memory inverted index for knowledge base lookups.
+
+Keeps normalized questions and token sets precomputed so a caller question
+only scores the KB entries it shares a token with. Answers are identical to
+the original linear scorer (exact/substring match first, then
+0.7 * Jaccard + 0.3 * difflib ratio with a 0.35 threshold).
+"""
+
+import re
+import threading
+from bisect import bisect_right
+from difflib import SequenceMatcher
+
+MATCH_THRESHOLD = 0.35
+JACCARD_WEIGHT = 0.7
+RATIO_WEIGHT = 0.3
+
+STOPWORDS = {
+    'the','a','an','do','does','is','are','what','which','and','or','to','for','of',
+    'you','your','we','our','on','in','at','about','including','with','vs','list'
+}
+
+_NON_ALNUM = re.compile(r"[^a-z0-9\s]")
+_WHITESPACE = re.compile(r"\s+")
+
+
+def normalize(text: str) -> str:
+    """Lowercase, drop punctuation and collapse whitespace"""
+    text = (text or '').lower().strip()
+    text = _NON_ALNUM.sub(" ", text)
+    text = _WHITESPACE.sub(" ", text)
+    return text
+
+
+def tokens(text: str) -> set[str]:
+    """Content tokens of a question (stopwords removed)"""
+    return {t for t in normalize(text).split() if t and t not in STOPWORDS}
+
+
+def _score(query_norm: str, query_tokens: set[str], kb_norm: str, kb_tokens: set[str]) -> float:
+    if query_tokens and kb_tokens:
+        inter = len(query_tokens & kb_tokens)
+        union = len(query_tokens | kb_tokens)
+        jacc = inter / union if union else 0.0
+    else:
+        jacc = 0.0
+    ratio = SequenceMatcher(None, query_norm, kb_norm).ratio()
+    return JACCARD_WEIGHT * jacc + RATIO_WEIGHT * ratio
+
+
+def linear_search(entries: dict, question: str):
+    """Reference scorer: scan every entry in order (the original algorithm).
+
+    Kept for benchmarks and equivalence tests; production lookups go through
+    KnowledgeBaseIndex.
+    """
+    query_norm = normalize(question or '')
+    query_tokens = tokens(question or '')
+
+    best = (0.0, None)  # (score, answer)
+
+    for _, kb_entry in entries.items():
+        kb_q_raw = kb_entry.get('question', '')
+        kb_a = kb_entry.get('answer')
+        kb_q_norm = normalize(kb_q_raw)
+
+        # Exact/substring
+        if query_norm == kb_q_norm or query_norm in kb_q_norm or kb_q_norm in query_norm:
+            return kb_a
+
+        score = _score(query_norm, query_tokens, kb_q_norm, tokens(kb_q_raw))
+        if score > best[0]:
+            best = (score, kb_a)
+
+    return best[1] if best[0] >= MATCH_THRESHOLD else None
+
+
+class _Entry:
+    __slots__ = ('seq', 'question', 'answer', 'norm', 'tokens')
+
+    def __init__(self, seq, question, answer):
+        self.seq = seq
+        self.question = question
+        self.answer = answer
+        self.norm = normalize(question)
+        self.tokens = tokens(question)
+
+
+class KnowledgeBaseIndex:
+    """Token -> entry inverted index over KB questions.
+
+    Entries keep their insertion order so ties resolve exactly like the
+    linear scan over the Firebase snapshot did. Safe to share between threads.
+    """
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._entries: dict[str, _Entry] = {}
+        self._postings: dict[str, set[str]] = {}
+        self._by_norm: dict[str, set[str]] = {}
+        self._norm_lengths: dict[int, int] = {}
+        self._next_seq = 0
+        # Lazily rebuilt "\n"-joined haystack for the query-in-question check
+        self._haystack = None
+        self._starts: list[int] = []
+        self._haystack_keys: list[str] = []
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __contains__(self, key):
+        return key in self._entries
+
+    def add(self, key: str, question: str, answer):
+        """Insert or update one KB entry (updates keep their position)"""
+        with self._lock:
+            old = self._entries.get(key)
+            if old is not None:
+                if old.question == question:
+                    old.answer = answer
+                    return
+                self._unlink(key, old)
+                seq = old.seq
+            else:
+                seq = self._next_seq
+                self._next_seq += 1
+
+            entry = _Entry(seq, question or '', answer)
+            self._entries[key] = entry
+            for tok in entry.tokens:
+                self._postings.setdefault(tok, set()).add(key)
+            norm_keys = self._by_norm.setdefault(entry.norm, set())
+            if not norm_keys:
+                length = len(entry.norm)
+                self._norm_lengths[length] = self._norm_lengths.get(length, 0) + 1
+            norm_keys.add(key)
+            self._haystack = None
+
+    def remove(self, key: str):
+        """Drop an entry if present"""
+        with self._lock:
+            entry = self._entries.pop(key, None)
+            if entry is not None:
+                self._unlink(key, entry)
+                self._haystack = None
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._postings.clear()
+            self._by_norm.clear()
+            self._norm_lengths.clear()
+            self._haystack = None
+
+    def sync(self, entries: dict):
+        """Bring the index in line with a full KB snapshot.
+
+        Only new or changed questions are re-normalized; removed keys are dropped.
+        """
+        with self._lock:
+            for key in [k for k in self._entries if k not in entries]:
+                self.remove(key)
+            for key, data in entries.items():
+                data = data or {}
+                self.add(key, data.get('question', ''), data.get('answer'))
+
+    def search(self, question: str, threshold: float = MATCH_THRESHOLD):
+        """Best answer for a caller question, or None below the threshold"""
+        query_norm = normalize(question or '')
+        query_tokens = tokens(question or '')
+
+        with self._lock:
+            if not self._entries:
+                return None
+
+            substring_key = self._first_substring_match(query_norm)
+            if substring_key is not None:
+                return self._entries[substring_key].answer
+
+            candidates = set()
+            for tok in query_tokens:
+                candidates.update(self._postings.get(tok, ()))
+
+            # Entries sharing no token score at most 0.3 * ratio < threshold,
+            # so skipping them can never change the answer.
+            best_score, best_answer = 0.0, None
+            for key in sorted(candidates, key=lambda k: self._entries[k].seq):
+                entry = self._entries[key]
+                inter = len(query_tokens & entry.tokens)
+                jacc = inter / len(query_tokens | entry.tokens)
+                upper = JACCARD_WEIGHT * jacc + RATIO_WEIGHT
+                if upper <= best_score or upper < threshold:
+                    continue
+                score = _score(query_norm, query_tokens, entry.norm, entry.tokens)
+                if score > best_score:
+                    best_score, best_answer = score, entry.answer
+
+            return best_answer if best_score >= threshold else None
+
+    def _unlink(self, key, entry):
+        for tok in entry.tokens:
+            keys = self._postings.get(tok)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._postings[tok]
+        keys = self._by_norm.get(entry.norm)
+        if keys is not None:
+            keys.discard(key)
+            if not keys:
+                del self._by_norm[entry.norm]
+                length = len(entry.norm)
+                self._norm_lengths[length] -= 1
+                if not self._norm_lengths[length]:
+                    del self._norm_lengths[length]
+
+    def search_top_k(self, question: str, k: int = 3, threshold: float = MATCH_THRESHOLD,
+                     substring: bool = True) -> list[tuple[float, str, object]]:
+        """(score, key, answer) for up to k entries at or above the threshold, best first.
+
+        The substring match search() would return comes first with score
+        1.0, unless `substring` is False (then every entry is scored).
+        """
+        query_norm = normalize(question or '')
+        query_tokens = tokens(question or '')
+
+        with self._lock:
+            if not self._entries:
+                return []
+            scored = {}
+            substring_key = self._first_substring_match(query_norm) if substring else None
+            if substring_key is not None:
+                scored[substring_key] = 1.0
+
+            candidates = set()
+            for tok in query_tokens:
+                candidates.update(self._postings.get(tok, ()))
+            for key in candidates:
+                if key in scored:
+                    continue
+                entry = self._entries[key]
+                score = _score(query_norm, query_tokens, entry.norm, entry.tokens)
+                if score >= threshold:
+                    scored[key] = score
+
+            best = sorted(scored, key=lambda key: (-scored[key], self._entries[key].seq))[:k]
+            return [(scored[key], key, self._entries[key].answer) for key in best]
+
+    def get(self, key: str):
+        """(question, answer) of an entry, or None"""
+        with self._lock:
+            entry = self._entries.get(key)
+            return (entry.question, entry.answer) if entry else None
+
+    def _first_substring_match(self, query_norm: str):
+        """Earliest entry whose question contains, or is contained in, the query"""
+        best_key = None
+
+        # query in question: one C-level find over all questions joined by "\n"
+        # (normalized text never contains "\n", so a hit can't span entries)
+        if self._haystack is None:
+            self._rebuild_haystack()
+        pos = self._haystack.find(query_norm)
+        if pos != -1:
+            best_key = self._haystack_keys[bisect_right(self._starts, pos) - 1]
+
+        # question in query: look up every query window whose length is a
+        # stored question length
+        for length in self._norm_lengths:
+            if length > len(query_norm):
+                continue
+            for start in range(len(query_norm) - length + 1):
+                keys = self._by_norm.get(query_norm[start:start + length])
+                if not keys:
+                    continue
+                for key in keys:
+                    if best_key is None or self._entries[key].seq < self._entries[best_key].seq:
+                        best_key = key
+
+        return best_key
+
+    def _rebuild_haystack(self):
+        starts, keys, parts = [], [], []
+        offset = 0
+        for key, entry in self._entries.items():
+            starts.append(offset)
+            keys.append(key)
+            parts.append(entry.norm)
+            offset += len(entry.norm) + 1
+        self._haystack = "\n".join(parts)
+        self._starts = starts
+        self._haystack_keys = keys
@@ -0,0 +1,138 @@
+"""
+Live-synced local replica of the knowledge_base node.
+
+Subscribes once to the node's change stream and keeps a KnowledgeBaseIndex
+current, so lookups never leave the process.
+"""
+
+import copy
+import threading
+
+from utils.change_events import split_path
+from utils.kb_index import KnowledgeBaseIndex
+
+
+class KnowledgeBaseReplica:
+    def __init__(self, index: KnowledgeBaseIndex = None):
+        self.index = index or KnowledgeBaseIndex()
+        self.version = 0
+        self._lock = threading.RLock()
+        self._entries: dict[str, dict] = {}
+        self._ready = threading.Event()
+        self._registration = None
+        # Extra subscribers called as listener(key, data) on every change (data is None on removal)
+        self.listeners = []
+
+    def start(self, source):
+        """Subscribe to a change source (a firebase-admin Reference or LocalEventSource)"""
+        self._registration = source.listen(self._on_event)
+        return self
+
+    def stop(self):
+        if self._registration is not None:
+            self._registration.close()
+            self._registration = None
+        self._ready.clear()
+
+    def is_ready(self) -> bool:
+        return self._ready.is_set()
+
+    def wait_ready(self, timeout: float = None) -> bool:
+        return self._ready.wait(timeout)
+
+    def search(self, question: str):
+        return self.index.search(question)
+
+    def entries(self) -> dict:
+        with self._lock:
+            return copy.deepcopy(self._entries)
+
+    def __len__(self):
+        return len(self._entries)
+
+    # Child-level events
+
+    def child_added(self, key: str, data: dict):
+        with self._lock:
+            self._entries[key] = data
+            self.index.add(key, data.get('question', ''), data.get('answer'))
+            self.version += 1
+            self._notify(key, data)
+
+    child_changed = child_added
+
+    def child_removed(self, key: str):
+        with self._lock:
+            if self._entries.pop(key, None) is not None:
+                self.index.remove(key)
+                self.version += 1
+                self._notify(key, None)
+
+    def subscribe(self, listener, bootstrap=None):
+        """Add a change listener.
+
+        `bootstrap(entries)` runs under the replica lock first, so the
+        listener sees every change after the snapshot it was built from.
+        """
+        with self._lock:
+            if bootstrap is not None:
+                bootstrap(copy.deepcopy(self._entries))
+            self.listeners.append(listener)
+
+    def _notify(self, key, data):
+        for listener in self.listeners:
+            try:
+                listener(key, data)
+            except Exception as e:
+                print(f"⚠️ KB replica listener failed for {key}: {e}")
+
+    # Firebase listener stream -> child events
+
+    def _on_event(self, event):
+        try:
+            self.apply_event(event.event_type, event.path, event.data)
+        except Exception as e:
+            print(f"⚠️ KB replica failed to apply {event.event_type} {event.path}: {e}")
+
+    def apply_event(self, event_type: str, path: str, data):
+        parts = split_path(path)
+        with self._lock:
+            if event_type == 'patch':
+                for child_path, value in (data or {}).items():
+                    self._apply_put(parts + split_path(child_path), value)
+            else:
+                self._apply_put(parts, data)
+
+    def _apply_put(self, parts: list[str], data):
+        if not parts:
+            # Full snapshot (the first event after subscribing)
+            snapshot = data or {}
+            for key in [k for k in self._entries if k not in snapshot]:
+                self.child_removed(key)
+            for key, value in snapshot.items():
+                if isinstance(value, dict):
+                    self.child_added(key, value)
+            self._ready.set()
+            return
+
+        key = parts[0]
+        if len(parts) == 1:
+            if data is None:
+                self.child_removed(key)
+            elif isinstance(data, dict):
+                self.child_added(key, data)
+            return
+
+        # Field-level update inside one entry
+        entry = copy.deepcopy(self._entries.get(key, {}))
+        node = entry
+        for part in parts[1:-1]:
+            node = node.setdefault(part, {})
+        if data is None:
+            node.pop(parts[-1], None)
+        else:
+            node[parts[-1]] = data
+        if entry:
+            self.child_changed(key, entry)
+        else:
+            self.child_removed(key)
@@ -0,0 +1,156 @@
+"""
+Bulk knowledge base import/export as JSON Lines.
+
+One compact JSON object per line ({"question", "answer", "created_at",
+"learned_from_request_id"}); a .gz suffix gzips the file. Both directions
+stream, so neither side holds the whole file or the whole KB in memory.
+
+Imports write in batches (one storage round trip each), skip questions
+already in the KB or earlier in the file (compared normalized), and record
+progress in a checkpoint file after every batch, so an interrupted import
+picks up where it stopped when run again.
+
+    python -m utils.kb_transfer export kb.jsonl.gz
+    python -m utils.kb_transfer import faq.jsonl --tenant uptown --batch-size 500
+"""
+
+import argparse
+import gzip
+import json
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils.kb_index import normalize
+
+EXPORT_FIELDS = ('question', 'answer', 'created_at', 'learned_from_request_id')
+
+
+def _open(path: str, mode: str):
+    if path.endswith('.gz'):
+        return gzip.open(path, mode + 't', encoding='utf-8')
+    return open(path, mode, encoding='utf-8')
+
+
+def question_key(question: str) -> str:
+    """What two questions must share to count as duplicates"""
+    return normalize(question).strip()
+
+
+def export_kb(storage, path: str, tenant: str = None, page_size: int = 500) -> int:
+    """Write the tenant's KB to a JSONL file; returns the number of entries"""
+    count = 0
+    with _open(path, 'w') as f:
+        for _, data in storage.iter_knowledge_base(tenant, page_size):
+            record = {field: data.get(field) for field in EXPORT_FIELDS if data.get(field) is not None}
+            f.write(json.dumps(record, ensure_ascii=False, separators=(',', ':')) + '\n')
+            count += 1
+    print(f"📤 Exported {count} KB entries to {path}")
+    return count
+
+
+class Checkpoint:
+    """Lines of the source file already imported, saved atomically after each batch"""
+
+    def __init__(self, path: str, source: str, tenant: str):
+        self.path = path
+        self.state = {'source': os.path.abspath(source), 'tenant': tenant, 'line': 0,
+                      'imported': 0, 'duplicates': 0, 'invalid': 0}
+        if os.path.exists(path):
+            with open(path) as f:
+                saved = json.load(f)
+            if saved.get('source') != self.state['source'] or saved.get('tenant') != tenant:
+                raise ValueError(f"Checkpoint {path} belongs to another import ({saved.get('source')})")
+            self.state.update(saved)
+
+    def save(self):
+        tmp = f'{self.path}.tmp'
+        with open(tmp, 'w') as f:
+            json.dump(self.state, f)
+        os.replace(tmp, self.path)
+
+    def remove(self):
+        if os.path.exists(self.path):
+            os.remove(self.path)
+
+
+def import_kb(kb, path: str, batch_size: int = 500, checkpoint_path: str = None) -> dict:
+    """Stream a JSONL file into a KnowledgeBaseManager's KB partition.
+
+    Returns the counters: lines read, imported, duplicates, invalid, and
+    resumed_from (the line an earlier run had reached).
+    """
+    checkpoint = Checkpoint(checkpoint_path or f'{path}.checkpoint', path, kb.tenant)
+    resumed_from = checkpoint.state['line']
+    if resumed_from:
+        print(f"↩️ Resuming import of {path} after line {resumed_from}")
+
+    # Entries written before a crash are in the KB already, so this also
+    # covers a batch that landed without its checkpoint
+    seen = {question_key(data.get('question', '')) for _, data in kb.storage.iter_knowledge_base(kb.tenant)}
+    batch = []
+
+    def flush(line_number):
+        if batch:
+            kb.add_learned_answers(batch)
+            checkpoint.state['imported'] += len(batch)
+            batch.clear()
+        checkpoint.state['line'] = line_number
+        checkpoint.save()
+
+    line_number = 0
+    with _open(path, 'r') as f:
+        for line_number, line in enumerate(f, 1):
+            if line_number <= resumed_from:
+                continue
+            try:
+                record = json.loads(line) if line.strip() else None
+            except ValueError:
+                record = None
+            if not isinstance(record, dict) or not record.get('question') or not record.get('answer'):
+                if line.strip():
+                    checkpoint.state['invalid'] += 1
+                continue
+            key = question_key(record['question'])
+            if key in seen:
+                checkpoint.state['duplicates'] += 1
+                continue
+            seen.add(key)
+            batch.append({field: record[field] for field in EXPORT_FIELDS if record.get(field) is not None})
+            if len(batch) >= batch_size:
+                flush(line_number)
+    flush(max(line_number, resumed_from))
+
+    result = dict(checkpoint.state, read=checkpoint.state['line'], resumed_from=resumed_from)
+    del result['line']
+    checkpoint.remove()
+    print(f"📥 Imported {result['imported']} KB entries from {path} "
+          f"({result['duplicates']} duplicates, {result['invalid']} invalid lines skipped)")
+    return result
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('command', choices=('import', 'export'))
+    parser.add_argument('path', help='JSON Lines file (.gz for gzip)')
+    parser.add_argument('--tenant', help='KB partition (default tenant when omitted)')
+    parser.add_argument('--batch-size', type=int, default=500)
+    parser.add_argument('--checkpoint', help='import checkpoint file (default <path>.checkpoint)')
+    args = parser.parse_args(argv)
+
+    from dotenv import load_dotenv
+    load_dotenv('.env.local')
+
+    from utils.storage import get_storage
+    storage = get_storage()
+    if args.command == 'export':
+        return export_kb(storage, args.path, args.tenant, args.batch_size)
+
+    from agent.knowledge_base import KnowledgeBaseManager
+    kb = KnowledgeBaseManager(storage=storage, tenant=args.tenant, match_mode='fuzzy')
+    return import_kb(kb, args.path, args.batch_size, args.checkpoint)
+
+
+if __name__ == '__main__':
+    main()
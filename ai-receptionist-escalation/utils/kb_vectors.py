@@ -0,0 +1,280 @@
+"""
+Semantic KB matching with fixed-size question vectors.
+
+Every KB question is stored as one row of a matrix; a caller question is
+answered with a single matrix-vector product plus top-k selection. The
+default encoder is hashed character/word n-gram TF-IDF (no extra
+dependencies beyond NumPy); set KB_ENCODER=sentence-transformers:<model>
+to use a local sentence-transformers model instead.
+
+NumPy is optional: it is only imported when semantic mode is enabled.
+"""
+
+import hashlib
+import math
+import os
+import threading
+import zlib
+from collections import Counter
+
+from utils.kb_index import STOPWORDS, normalize
+
+try:
+    import numpy as np
+except ImportError:  # Semantic mode is optional
+    np = None
+
+
+# Function words that carry no meaning for matching, on top of the fuzzy scorer's list
+ENCODER_STOPWORDS = STOPWORDS | {
+    'i', 'me', 'my', 'can', 'could', 'would', 'will', 'how', 'when', 'where', 'there',
+    'here', 'it', 'this', 'that', 'be', 'have', 'has', 'get', 'much', 'any', 'if', 'so',
+}
+
+
+def require_numpy():
+    if np is None:
+        raise RuntimeError("Semantic KB matching needs NumPy: pip install numpy")
+
+
+def fingerprint(question: str) -> str:
+    return hashlib.sha1(normalize(question).encode('utf-8')).hexdigest()[:16]
+
+
+class HashedTfidfEncoder:
+    """Character 3-5 grams and content words hashed into `dim` TF-IDF buckets"""
+
+    def __init__(self, dim: int = 512, ngram_range=(3, 5)):
+        self.dim = dim
+        self.ngram_range = ngram_range
+        self.name = f'hashed-tfidf-{dim}'
+        self.idf = None
+
+    def _buckets(self, text: str) -> Counter:
+        words = [w for w in normalize(text).split() if w not in ENCODER_STOPWORDS]
+        counts = Counter()
+        low, high = self.ngram_range
+        for word in words:
+            # Per-word n-grams so function words and word boundaries add no noise
+            padded = f' {word} '
+            for n in range(low, high + 1):
+                for i in range(len(padded) - n + 1):
+                    counts[zlib.crc32(padded[i:i + n].encode('utf-8')) % self.dim] += 1
+            counts[zlib.crc32(f'w:{word}'.encode('utf-8')) % self.dim] += 2
+        return counts
+
+    def fit(self, texts):
+        """Learn IDF weights from the KB questions"""
+        require_numpy()
+        df = np.zeros(self.dim, dtype=np.float32)
+        for text in texts:
+            for bucket in self._buckets(text):
+                df[bucket] += 1
+        self.idf = np.log((1 + len(texts)) / (1 + df)).astype(np.float32) + 1.0
+
+    def encode(self, texts):
+        require_numpy()
+        matrix = np.zeros((len(texts), self.dim), dtype=np.float32)
+        for row, text in enumerate(texts):
+            for bucket, count in self._buckets(text).items():
+                matrix[row, bucket] = 1.0 + math.log(count)
+        if self.idf is not None:
+            matrix *= self.idf
+        norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+        norms[norms == 0] = 1.0
+        return matrix / norms
+
+    def state(self) -> dict:
+        return {'idf': self.idf} if self.idf is not None else {}
+
+    def load_state(self, state: dict):
+        if 'idf' in state:
+            self.idf = state['idf'].astype(np.float32)
+
+
+class SentenceTransformerEncoder:
+    """Local sentence-transformers model (downloaded once, then runs offline)"""
+
+    def __init__(self, model_name: str):
+        from sentence_transformers import SentenceTransformer
+        self.model = SentenceTransformer(model_name)
+        self.dim = self.model.get_sentence_embedding_dimension()
+        self.name = f'st-{model_name}'
+
+    def fit(self, texts):
+        pass
+
+    def encode(self, texts):
+        return np.asarray(self.model.encode(list(texts), normalize_embeddings=True), dtype=np.float32)
+
+    def state(self) -> dict:
+        return {}
+
+    def load_state(self, state: dict):
+        pass
+
+
+def make_encoder(spec: str = None):
+    spec = spec or os.getenv('KB_ENCODER', 'hashed-tfidf')
+    if spec.startswith('sentence-transformers:'):
+        return SentenceTransformerEncoder(spec.split(':', 1)[1])
+    return HashedTfidfEncoder(dim=int(os.getenv('KB_VECTOR_DIM', 512)))
+
+
+class VectorIndex:
+    """Matrix of unit-length question vectors with cosine top-k search"""
+
+    def __init__(self, encoder=None, threshold: float = None):
+        require_numpy()
+        self.encoder = encoder or make_encoder()
+        self.threshold = threshold if threshold is not None else float(os.getenv('KB_SEMANTIC_THRESHOLD', 0.3))
+        self._lock = threading.RLock()
+        self._matrix = np.zeros((0, self.encoder.dim), dtype=np.float32)
+        self._size = 0
+        self._keys: list[str] = []
+        self._rows: dict[str, int] = {}
+        self._fingerprints: list[str] = []
+        self._answers: list = []
+        self.dirty = False
+
+    def __len__(self):
+        return self._size
+
+    def build(self, entries: dict, path: str = None):
+        """Load every entry, reusing rows persisted at `path` for unchanged questions"""
+        cached = self._read(path) if path else {}
+        if cached.get('encoder') == self.encoder.name:
+            self.encoder.load_state(cached.get('state', {}))
+        else:
+            cached = {}
+            self.encoder.fit([(data or {}).get('question', '') for data in entries.values()])
+
+        reused = 0
+        with self._lock:
+            self._reset()
+            pending = []
+            for key, data in entries.items():
+                data = data or {}
+                question = data.get('question', '')
+                row = cached.get('rows', {}).get(key)
+                if row is not None and row[0] == fingerprint(question):
+                    self._append(key, question, data.get('answer'), row[1])
+                    reused += 1
+                else:
+                    pending.append((key, question, data.get('answer')))
+            if pending:
+                vectors = self.encoder.encode([q for _, q, _ in pending])
+                for (key, question, answer), vector in zip(pending, vectors):
+                    self._append(key, question, answer, vector)
+            self.dirty = bool(pending) or not cached
+        print(f"🧭 KB vectors ready: {self._size} entries ({reused} reused from disk)")
+
+    def add(self, key: str, question: str, answer):
+        with self._lock:
+            row = self._rows.get(key)
+            if row is not None and self._fingerprints[row] == fingerprint(question):
+                self._answers[row] = answer
+                return
+            vector = self.encoder.encode([question])[0]
+            if row is not None:
+                self._matrix[row] = vector
+                self._fingerprints[row] = fingerprint(question)
+                self._answers[row] = answer
+            else:
+                self._append(key, question, answer, vector)
+            self.dirty = True
+
+    def remove(self, key: str):
+        with self._lock:
+            row = self._rows.pop(key, None)
+            if row is None:
+                return
+            last = self._size - 1
+            if row != last:
+                # Move the last row into the hole
+                self._matrix[row] = self._matrix[last]
+                for items in (self._keys, self._fingerprints, self._answers):
+                    items[row] = items[last]
+                self._rows[self._keys[row]] = row
+            for items in (self._keys, self._fingerprints, self._answers):
+                items.pop()
+            self._size -= 1
+            self.dirty = True
+
+    def sync(self, entries: dict):
+        """Apply a full KB snapshot incrementally (only new/changed questions are encoded)"""
+        with self._lock:
+            for key in [k for k in self._rows if k not in entries]:
+                self.remove(key)
+            for key, data in entries.items():
+                data = data or {}
+                self.add(key, data.get('question', ''), data.get('answer'))
+
+    def search_top_k(self, question: str, k: int = 3) -> list[tuple[float, str, object]]:
+        """(score, key, answer) for the k most similar questions, best first"""
+        query = self.encoder.encode([question])[0]
+        with self._lock:
+            if not self._size:
+                return []
+            scores = self._matrix[:self._size] @ query
+            k = min(k, self._size)
+            top = np.argpartition(-scores, k - 1)[:k]
+            top = top[np.argsort(-scores[top])]
+            return [(float(scores[i]), self._keys[i], self._answers[i]) for i in top]
+
+    def search(self, question: str):
+        """Best answer at or above the similarity threshold, else None"""
+        best = self.search_top_k(question, 1)
+        if best and best[0][0] >= self.threshold:
+            return best[0][2]
+        return None
+
+    def save(self, path: str):
+        """Persist vectors so the next start only encodes new questions"""
+        with self._lock:
+            payload = {
+                'encoder': np.array(self.encoder.name),
+                # Fixed-width unicode, so loading never needs pickle
+                'keys': np.array(self._keys, dtype=str),
+                'fingerprints': np.array(self._fingerprints, dtype=str),
+                'matrix': self._matrix[:self._size],
+            }
+            for name, value in self.encoder.state().items():
+                payload[f'state_{name}'] = value
+            tmp_path = f'{path}.tmp.npz'
+            np.savez(tmp_path, **payload)
+            os.replace(tmp_path, path)
+            self.dirty = False
+
+    def _read(self, path):
+        if not os.path.exists(path):
+            return {}
+        try:
+            with np.load(path, allow_pickle=False) as data:
+                rows = {
+                    str(key): (str(fp), vector)
+                    for key, fp, vector in zip(data['keys'], data['fingerprints'], data['matrix'])
+                }
+                state = {name[6:]: data[name] for name in data.files if name.startswith('state_')}
+                return {'encoder': str(data['encoder']), 'rows': rows, 'state': state}
+        except Exception as e:
+            print(f"⚠️ Ignoring unreadable KB vector file {path}: {e}")
+            return {}
+
+    def _reset(self):
+        self._matrix = np.zeros((0, self.encoder.dim), dtype=np.float32)
+        self._size = 0
+        self._keys, self._fingerprints, self._answers = [], [], []
+        self._rows = {}
+
+    def _append(self, key, question, answer, vector):
+        if self._size == len(self._matrix):
+            grown = np.zeros((max(16, 2 * len(self._matrix)), self.encoder.dim), dtype=np.float32)
+            grown[:self._size] = self._matrix[:self._size]
+            self._matrix = grown
+        self._matrix[self._size] = vector
+        self._rows[key] = self._size
+        self._keys.append(key)
+        self._fingerprints.append(fingerprint(question))
+        self._answers.append(answer)
+        self._size += 1
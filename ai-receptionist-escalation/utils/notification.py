@@ -1,6 +1,8 @@
 from datetime import datetime
 
 class NotificationService:
+    name = 'console'
+
     def notify_supervisor(self, request_id: str, question: str, caller_phone: str):
         """Notify supervisor of new help request (console for now)"""
         print("\n" + "="*60)
@@ -13,6 +15,17 @@ class NotificationService:
         print(f"Action: Visit http://localhost:5000/pending to respond")
         print("="*60 + "\n")
 
+    def notify_supervisor_batch(self, alerts: list[tuple[str, str, str]]):
+        """One combined alert for several (request_id, question, caller_phone) requests"""
+        print("\n" + "="*60)
+        print(f"🔔 {len(alerts)} NEW HELP REQUESTS")
+        print("="*60)
+        for request_id, question, caller_phone in alerts:
+            print(f"- [{request_id}] {question} (caller {caller_phone})")
+        print(f"Time: {datetime.utcnow().isoformat()}")
+        print(f"Action: Visit http://localhost:5000/pending to respond")
+        print("="*60 + "\n")
+
     def text_customer(self, phone: str, message: str):
         """Simulate text message to customer (console for now)"""
         print("\n" + "-"*60)
@@ -30,4 +43,41 @@ class NotificationService:
         #     body=message,
         #     from_='+1234567890',
         #     to=phone
-        # )
\ No newline at end of file
+        # )
+
+    def text_customers(self, messages: list[tuple[str, str]]):
+        """Send several (phone, message) texts"""
+        for phone, message in messages:
+            self.text_customer(phone, message)
+
+
+class FakeSMSSink:
+    """Local notification sink that records instead of sending (tests, load runs).
+
+    `fail_times` makes the first N deliveries raise, to exercise retries.
+    """
+    name = 'fake-sms'
+
+    def __init__(self, fail_times: int = 0):
+        self.fail_times = fail_times
+        self.alerts = []
+        self.alert_batches = []
+        self.texts = []
+
+    def _maybe_fail(self):
+        if self.fail_times > 0:
+            self.fail_times -= 1
+            raise ConnectionError("simulated provider failure")
+
+    def notify_supervisor(self, request_id: str, question: str, caller_phone: str):
+        self._maybe_fail()
+        self.alerts.append((request_id, question, caller_phone))
+
+    def notify_supervisor_batch(self, alerts: list[tuple[str, str, str]]):
+        self._maybe_fail()
+        self.alert_batches.append(list(alerts))
+        self.alerts.extend(alerts)
+
+    def text_customer(self, phone: str, message: str):
+        self._maybe_fail()
+        self.texts.append((phone, message))
@@ -0,0 +1,182 @@
+"""
+Background dispatch queue for outbound notifications.
+
+NotificationQueue has the same interface as NotificationService but only
+enqueues, so creating or resolving a help request never waits on a
+provider. Worker threads deliver through the wrapped provider with
+exponential-backoff retries and a per-provider rate limit, and supervisor
+alerts that arrive together are sent as one batched alert.
+"""
+
+import os
+import queue
+import random
+import threading
+import time
+
+from utils.notification import NotificationService
+
+# How often idle workers check whether stop() was called
+STOP_POLL_SECONDS = 0.2
+
+
+class RateLimiter:
+    """Token bucket: `rate` sends per second with bursts up to `burst`"""
+
+    def __init__(self, rate: float, burst: int = None, clock=time.monotonic, sleep=time.sleep):
+        self.rate = rate
+        self.capacity = burst or max(int(rate), 1)
+        self.tokens = float(self.capacity)
+        self.clock = clock
+        self.sleep = sleep
+        self._updated = clock()
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        if self.rate <= 0:
+            return
+        while True:
+            with self._lock:
+                now = self.clock()
+                self.tokens = min(self.capacity, self.tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                wait = (1 - self.tokens) / self.rate
+            self.sleep(wait)
+
+
+_rate_limiters = {}
+_rate_limiters_lock = threading.Lock()
+
+
+def get_rate_limiter(provider_name: str, rate: float) -> RateLimiter:
+    """One bucket per provider and rate, shared by every queue in the process"""
+    key = (provider_name, float(rate))
+    with _rate_limiters_lock:
+        if key not in _rate_limiters:
+            _rate_limiters[key] = RateLimiter(rate)
+        return _rate_limiters[key]
+
+
+class NotificationQueue:
+    def __init__(self, provider=None, workers: int = None, max_retries: int = None,
+                 retry_base_seconds: float = None, rate_per_second: float = None,
+                 batch_window_seconds: float = None, max_batch: int = None, sleep=time.sleep):
+        self.provider = provider or NotificationService()
+        self.max_retries = max_retries if max_retries is not None else int(os.getenv('NOTIFY_MAX_RETRIES', 5))
+        self.retry_base = retry_base_seconds if retry_base_seconds is not None else float(os.getenv('NOTIFY_RETRY_BASE_SECONDS', 0.5))
+        self.batch_window = batch_window_seconds if batch_window_seconds is not None else float(os.getenv('NOTIFY_BATCH_WINDOW_SECONDS', 2))
+        self.max_batch = max_batch or int(os.getenv('NOTIFY_MAX_BATCH', 20))
+        self.sleep = sleep
+
+        rate = rate_per_second if rate_per_second is not None else float(os.getenv('NOTIFY_RATE_PER_SECOND', 5))
+        self.rate_limiter = get_rate_limiter(getattr(self.provider, 'name', type(self.provider).__name__), rate)
+
+        self.failed = []
+        self._stopping = threading.Event()
+        self._alerts = queue.Queue()
+        self._texts = queue.Queue()
+        self._threads = [threading.Thread(target=self._alert_worker, name='notify-alerts', daemon=True)]
+        for i in range(workers or int(os.getenv('NOTIFY_WORKERS', 2))):
+            self._threads.append(threading.Thread(target=self._text_worker, name=f'notify-texts-{i}', daemon=True))
+        for thread in self._threads:
+            thread.start()
+
+    # NotificationService interface (non-blocking)
+
+    def notify_supervisor(self, request_id: str, question: str, caller_phone: str):
+        self._alerts.put((request_id, question, caller_phone))
+
+    def text_customer(self, phone: str, message: str):
+        self._texts.put((phone, message))
+
+    def text_customers(self, messages: list[tuple[str, str]]):
+        """Queue several (phone, message) texts at once"""
+        for phone, message in messages:
+            self._texts.put((phone, message))
+
+    def flush(self):
+        """Block until everything queued so far has been delivered or given up on"""
+        self._alerts.join()
+        self._texts.join()
+
+    def stop(self, timeout: float = None):
+        """Deliver everything already queued, then end the workers (waits up to `timeout`)"""
+        self._stopping.set()
+        for thread in self._threads:
+            thread.join(timeout)
+
+    # Workers
+
+    def _next(self, items: queue.Queue, timeout: float = None):
+        """Next queued item; None once stop() was called and the queue is drained
+        (or, with a timeout, when nothing arrives in time)"""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            wait = STOP_POLL_SECONDS if deadline is None else min(deadline - time.monotonic(), STOP_POLL_SECONDS)
+            if wait <= 0:
+                return None
+            try:
+                return items.get(timeout=wait)
+            except queue.Empty:
+                if self._stopping.is_set():
+                    return None
+
+    def _alert_worker(self):
+        while True:
+            first = self._next(self._alerts)
+            if first is None:
+                return
+            batch = [first]
+            deadline = time.monotonic() + self.batch_window
+            while len(batch) < self.max_batch:
+                alert = self._next(self._alerts, deadline - time.monotonic())
+                if alert is None:
+                    break
+                batch.append(alert)
+
+            if len(batch) == 1 or not hasattr(self.provider, 'notify_supervisor_batch'):
+                for alert in batch:
+                    self._deliver(self.provider.notify_supervisor, *alert)
+            else:
+                self._deliver(self.provider.notify_supervisor_batch, batch)
+            for _ in batch:
+                self._alerts.task_done()
+
+    def _text_worker(self):
+        while True:
+            item = self._next(self._texts)
+            if item is None:
+                return
+            try:
+                self._deliver(self.provider.text_customer, *item)
+            finally:
+                self._texts.task_done()
+
+    def _deliver(self, send, *args):
+        for attempt in range(self.max_retries + 1):
+            self.rate_limiter.acquire()
+            try:
+                send(*args)
+                return True
+            except Exception as e:
+                if attempt == self.max_retries:
+                    print(f"❌ Notification failed after {attempt + 1} attempts: {e}")
+                    self.failed.append((send.__name__, args, str(e)))
+                    return False
+                delay = self.retry_base * (2 ** attempt) * (1 + random.random() * 0.25)
+                print(f"⚠️ Notification attempt {attempt + 1} failed ({e}), retrying in {delay:.1f}s")
+                self.sleep(delay)
+
+
+_notification_queue = None
+
+
+def get_notification_queue() -> NotificationQueue:
+    """Process-wide queue in front of the console NotificationService"""
+    global _notification_queue
+    if _notification_queue is None:
+        _notification_queue = NotificationQueue()
+    return _notification_queue
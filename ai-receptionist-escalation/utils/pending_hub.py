@@ -0,0 +1,201 @@
+"""
+Shared live view of the pending help-request queue.
+
+One PendingQueueHub per supervisor process holds a single subscription to
+the storage backend's pending change stream (or, for backends without one,
+a single poller) and fans every change out to the open dashboards. Each
+browser tab gets its own bounded queue; the database sees one listener no
+matter how many tabs are open.
+"""
+
+import copy
+import os
+import queue
+import threading
+
+from utils.change_events import split_path
+from utils.storage import DEFAULT_TENANT, tenant_key
+
+
+class PendingQueueHub:
+    def __init__(self, storage, max_queue: int = 200, poll_seconds: float = None):
+        self.storage = storage
+        self.max_queue = max_queue
+        self.poll_seconds = poll_seconds if poll_seconds is not None else float(os.getenv('PENDING_POLL_SECONDS', 5))
+        self._lock = threading.RLock()
+        self._pending: dict[str, dict] = {}
+        self._subscribers: list[queue.Queue] = []
+        self._registration = None
+        self._ready = threading.Event()
+        # Removals to look up once apply_event releases the lock
+        self._unexplained: list[str] = []
+
+    # Lifecycle
+
+    def start(self, timeout: float = 10.0):
+        with self._lock:
+            if self._registration is not None:
+                return self
+            source = self.storage.pending_event_source()
+            if source is None:
+                self._registration = _Poller(self)
+                print("ℹ️ Storage has no pending change stream, polling the pending queue")
+            else:
+                self._registration = source.listen(self._on_event)
+        self._ready.wait(timeout)
+        return self
+
+    def stop(self):
+        with self._lock:
+            if self._registration is not None:
+                self._registration.close()
+                self._registration = None
+            self._ready.clear()
+
+    # Readers
+
+    def snapshot(self) -> list[tuple[str, dict]]:
+        """Pending requests, newest first"""
+        self.start()
+        with self._lock:
+            return _sorted(self._pending)
+
+    def subscribe(self) -> tuple[list, queue.Queue]:
+        """Current snapshot plus a queue of every later change (no gap between them)"""
+        self.start()
+        events = queue.Queue(self.max_queue)
+        with self._lock:
+            self._subscribers.append(events)
+            return _sorted(self._pending), events
+
+    def unsubscribe(self, events: queue.Queue):
+        with self._lock:
+            if events in self._subscribers:
+                self._subscribers.remove(events)
+
+    def questions(self, tenant: str = None) -> dict[str, str]:
+        """{request_id: question} of one tenant's pending requests, from memory"""
+        self.start()
+        tenant = tenant_key(tenant)
+        with self._lock:
+            return {
+                request_id: request.get('question') or ''
+                for request_id, request in self._pending.items()
+                if (request.get('tenant_id') or DEFAULT_TENANT) == tenant
+            }
+
+    def subscriber_count(self) -> int:
+        return len(self._subscribers)
+
+    # Change stream
+
+    def _on_event(self, event):
+        try:
+            self.apply_event(event.event_type, event.path, event.data)
+        except Exception as e:
+            print(f"⚠️ Pending hub failed to apply {event.event_type} {event.path}: {e}")
+
+    def apply_event(self, event_type: str, path: str, data):
+        parts = split_path(path)
+        with self._lock:
+            self._unexplained = []
+            if event_type == 'patch':
+                for child_path, value in (data or {}).items():
+                    self._apply_put(parts + split_path(child_path), value)
+            else:
+                self._apply_put(parts, data)
+            unexplained, self._unexplained = self._unexplained, []
+
+        # The stream only says these left the queue; one read each says why
+        # (outside the lock, so readers like questions() never wait on it)
+        for request_id in unexplained:
+            request = self.storage.get_help_request(request_id) or {}
+            with self._lock:
+                self._publish({'type': request.get('status', 'removed'), 'id': request_id})
+
+    def _apply_put(self, parts: list[str], data):
+        if not parts:
+            snapshot = data or {}
+            for request_id in [k for k in self._pending if k not in snapshot]:
+                self._removed(request_id)
+            for request_id, request in snapshot.items():
+                if isinstance(request, dict):
+                    self._upsert(request_id, request)
+            self._ready.set()
+            return
+
+        request_id = parts[0]
+        if len(parts) == 1:
+            if data is None:
+                self._removed(request_id)
+            elif isinstance(data, dict):
+                self._upsert(request_id, data)
+            return
+
+        request = copy.deepcopy(self._pending.get(request_id, {}))
+        request[parts[1]] = data
+        self._upsert(request_id, request)
+
+    def _upsert(self, request_id: str, request: dict):
+        if request.get('status', 'pending') != 'pending':
+            self._removed(request_id, request.get('status'))
+            return
+        known = request_id in self._pending
+        if known and self._pending[request_id] == request:
+            return
+        self._pending[request_id] = request
+        self._publish({'type': 'updated' if known else 'created', 'id': request_id, 'request': request})
+
+    def _removed(self, request_id: str, status: str = None):
+        if self._pending.pop(request_id, None) is None:
+            return
+        if status is None:
+            # Only open dashboards care why; apply_event looks it up after the lock
+            if self._subscribers:
+                self._unexplained.append(request_id)
+            return
+        self._publish({'type': status, 'id': request_id})
+
+    def _publish(self, event: dict):
+        for events in list(self._subscribers):
+            try:
+                events.put_nowait(event)
+            except queue.Full:
+                # A stalled tab: drop its backlog and have it reload the snapshot
+                while not events.empty():
+                    try:
+                        events.get_nowait()
+                    except queue.Empty:
+                        break
+                events.put_nowait({'type': 'reset'})
+
+
+class _Poller:
+    """Fallback feed: diff get_pending_requests() on one shared thread"""
+
+    def __init__(self, hub: PendingQueueHub):
+        self.hub = hub
+        self._stop = threading.Event()
+        self.poll()
+        threading.Thread(target=self._run, name='pending-poller', daemon=True).start()
+
+    def poll(self):
+        self.hub.apply_event('put', '/', self.hub.storage.get_pending_requests())
+
+    def _run(self):
+        while not self._stop.wait(self.hub.poll_seconds):
+            try:
+                self.poll()
+            except Exception as e:
+                print(f"⚠️ Error polling pending requests: {e}")
+
+    def close(self):
+        self._stop.set()
+
+
+def _sorted(pending: dict) -> list[tuple[str, dict]]:
+    return sorted(
+        ((k, copy.deepcopy(v)) for k, v in pending.items()),
+        key=lambda item: item[1].get('created_at') or '',
+        reverse=True,
+    )
@@ -0,0 +1,47 @@
+"""
+Firebase-style push IDs generated locally.
+
+Same layout as the keys `Reference.push()` returns (8 timestamp chars + 12
+random chars), so locally generated keys sort chronologically alongside
+server-pushed ones and can be used in multi-path updates.
+"""
+
+import random
+import threading
+import time
+
+PUSH_CHARS = '-0123456789ABCDEFGHIJKLMNOPQRSTUVWXYZ_abcdefghijklmnopqrstuvwxyz'
+
+_lock = threading.Lock()
+_last_time = 0
+_last_rand = [0] * 12
+_rng = random.SystemRandom()
+
+
+def generate_push_id(now_ms: int = None) -> str:
+    global _last_time
+    now = int(time.time() * 1000) if now_ms is None else now_ms
+
+    with _lock:
+        duplicate = now == _last_time
+        _last_time = now
+
+        time_chars = []
+        for _ in range(8):
+            time_chars.append(PUSH_CHARS[now % 64])
+            now //= 64
+        key = ''.join(reversed(time_chars))
+
+        if not duplicate:
+            for i in range(12):
+                _last_rand[i] = _rng.randrange(64)
+        else:
+            # Same millisecond: increment the random part to keep ordering
+            i = 11
+            while i >= 0 and _last_rand[i] == 63:
+                _last_rand[i] = 0
+                i -= 1
+            if i >= 0:
+                _last_rand[i] += 1
+
+        return key + ''.join(PUSH_CHARS[n] for n in _last_rand)
@@ -0,0 +1,462 @@
+"""
+SQLite storage backend.
+
+Local, network-free alternative to Firebase for small sites, load tests
+and offline development. Runs in WAL mode so the supervisor UI and the
+agent worker can share one database file.
+"""
+
+import itertools
+import os
+import sqlite3
+import threading
+from datetime import datetime
+from pathlib import Path
+
+from utils.change_events import ChangeEvent
+from utils.push_id import generate_push_id
+from utils.storage import StorageBackend, STAT_KEYS, decode_cursor, order_field, paginate, tenant_key
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS help_requests (
+    id TEXT PRIMARY KEY,
+    question TEXT NOT NULL,
+    caller_phone TEXT,
+    status TEXT NOT NULL,
+    created_at TEXT NOT NULL,
+    resolved_at TEXT,
+    supervisor_answer TEXT,
+    tenant_id TEXT NOT NULL DEFAULT 'default'
+);
+CREATE INDEX IF NOT EXISTS idx_help_requests_status_created ON help_requests (status, created_at);
+CREATE INDEX IF NOT EXISTS idx_help_requests_status_resolved ON help_requests (status, resolved_at);
+CREATE INDEX IF NOT EXISTS idx_help_requests_created ON help_requests (created_at);
+
+CREATE TABLE IF NOT EXISTS knowledge_base (
+    id TEXT PRIMARY KEY,
+    question TEXT NOT NULL,
+    answer TEXT,
+    learned_from_request_id TEXT,
+    created_at TEXT NOT NULL,
+    tenant_id TEXT NOT NULL DEFAULT 'default'
+);
+CREATE INDEX IF NOT EXISTS idx_knowledge_base_created ON knowledge_base (created_at);
+
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value INTEGER NOT NULL
+);
+INSERT OR IGNORE INTO meta (key, value) VALUES ('kb_version', 0);
+
+CREATE TRIGGER IF NOT EXISTS kb_version_insert AFTER INSERT ON knowledge_base
+BEGIN UPDATE meta SET value = value + 1 WHERE key = 'kb_version'; END;
+CREATE TRIGGER IF NOT EXISTS kb_version_update AFTER UPDATE ON knowledge_base
+BEGIN UPDATE meta SET value = value + 1 WHERE key = 'kb_version'; END;
+CREATE TRIGGER IF NOT EXISTS kb_version_delete AFTER DELETE ON knowledge_base
+BEGIN UPDATE meta SET value = value + 1 WHERE key = 'kb_version'; END;
+
+-- Dashboard counters, maintained in the same transaction as each write
+CREATE TABLE IF NOT EXISTS request_stats (
+    status TEXT PRIMARY KEY,
+    count INTEGER NOT NULL
+);
+CREATE TRIGGER IF NOT EXISTS request_stats_insert AFTER INSERT ON help_requests
+BEGIN
+    INSERT INTO request_stats (status, count) VALUES (NEW.status, 1)
+    ON CONFLICT (status) DO UPDATE SET count = count + 1;
+END;
+CREATE TRIGGER IF NOT EXISTS request_stats_update AFTER UPDATE OF status ON help_requests
+WHEN OLD.status IS NOT NEW.status
+BEGIN
+    UPDATE request_stats SET count = count - 1 WHERE status = OLD.status;
+    INSERT INTO request_stats (status, count) VALUES (NEW.status, 1)
+    ON CONFLICT (status) DO UPDATE SET count = count + 1;
+END;
+CREATE TRIGGER IF NOT EXISTS request_stats_delete AFTER DELETE ON help_requests
+BEGIN UPDATE request_stats SET count = count - 1 WHERE status = OLD.status; END;
+
+CREATE TRIGGER IF NOT EXISTS kb_entries_insert AFTER INSERT ON knowledge_base
+BEGIN UPDATE meta SET value = value + 1 WHERE key = 'kb_entries'; END;
+CREATE TRIGGER IF NOT EXISTS kb_entries_delete AFTER DELETE ON knowledge_base
+BEGIN UPDATE meta SET value = value - 1 WHERE key = 'kb_entries'; END;
+
+-- Extra callers attached to a pending request with the same question
+CREATE TABLE IF NOT EXISTS request_subscribers (
+    request_id TEXT NOT NULL,
+    caller_phone TEXT NOT NULL,
+    PRIMARY KEY (request_id, caller_phone)
+);
+
+-- Append-only log of request status changes, tailed by the live pending queue
+CREATE TABLE IF NOT EXISTS request_events (
+    seq INTEGER PRIMARY KEY AUTOINCREMENT,
+    request_id TEXT NOT NULL,
+    status TEXT NOT NULL
+);
+CREATE TRIGGER IF NOT EXISTS request_events_insert AFTER INSERT ON help_requests
+BEGIN INSERT INTO request_events (request_id, status) VALUES (NEW.id, NEW.status); END;
+CREATE TRIGGER IF NOT EXISTS request_events_update AFTER UPDATE OF status ON help_requests
+WHEN OLD.status IS NOT NEW.status
+BEGIN INSERT INTO request_events (request_id, status) VALUES (NEW.id, NEW.status); END;
+"""
+
+# Needs the tenant_id columns, so it runs after _migrate() on older files
+TENANT_SCHEMA = """
+CREATE INDEX IF NOT EXISTS idx_knowledge_base_tenant_created ON knowledge_base (tenant_id, created_at);
+
+-- One KB version per tenant, so a write only invalidates that tenant's caches
+CREATE TRIGGER IF NOT EXISTS kb_tenant_version_insert AFTER INSERT ON knowledge_base
+BEGIN
+    INSERT INTO meta (key, value) VALUES ('kb_version:' || NEW.tenant_id, 1)
+    ON CONFLICT (key) DO UPDATE SET value = value + 1;
+END;
+CREATE TRIGGER IF NOT EXISTS kb_tenant_version_update AFTER UPDATE ON knowledge_base
+BEGIN
+    INSERT INTO meta (key, value) VALUES ('kb_version:' || NEW.tenant_id, 1)
+    ON CONFLICT (key) DO UPDATE SET value = value + 1;
+END;
+CREATE TRIGGER IF NOT EXISTS kb_tenant_version_delete AFTER DELETE ON knowledge_base
+BEGIN
+    INSERT INTO meta (key, value) VALUES ('kb_version:' || OLD.tenant_id, 1)
+    ON CONFLICT (key) DO UPDATE SET value = value + 1;
+END;
+"""
+
+REQUEST_FIELDS = ('question', 'caller_phone', 'status', 'created_at', 'resolved_at', 'supervisor_answer', 'tenant_id')
+KB_FIELDS = ('question', 'answer', 'learned_from_request_id', 'created_at')
+
+_memory_ids = itertools.count()
+
+
+def _rows_to_dict(rows, fields):
+    return {row[0]: dict(zip(fields, row[1:])) for row in rows}
+
+
+class SQLiteStore(StorageBackend):
+    def __init__(self, db_path: str = ':memory:'):
+        if db_path == ':memory:':
+            # Shared-cache URI so every thread's connection sees the same database
+            self._uri = f"file:receptionist_mem_{next(_memory_ids)}?mode=memory&cache=shared"
+        else:
+            self._uri = Path(db_path).resolve().as_uri()
+        self.db_path = db_path
+        self._local = threading.local()
+        self._kb_synced_versions = {}
+
+        # Also keeps an in-memory database alive for the life of the store
+        self._anchor = self._connect()
+        if db_path != ':memory:':
+            self._anchor.execute("PRAGMA journal_mode=WAL")
+        self._anchor.executescript(SCHEMA)
+        self._migrate()
+        self._anchor.executescript(TENANT_SCHEMA)
+        if not self._query("SELECT 1 FROM meta WHERE key = 'kb_entries'"):
+            # Counters are new to this database file: seed them once
+            self.rebuild_stats()
+        print(f"✅ SQLite storage ready at {db_path}")
+
+    def _migrate(self):
+        """Add columns introduced after a database file was first created"""
+        for table in ('help_requests', 'knowledge_base'):
+            columns = {row[1] for row in self._anchor.execute(f"PRAGMA table_info({table})")}
+            if 'tenant_id' not in columns:
+                self._anchor.execute(f"ALTER TABLE {table} ADD COLUMN tenant_id TEXT NOT NULL DEFAULT 'default'")
+
+    def _connect(self):
+        conn = sqlite3.connect(self._uri, uri=True, timeout=30, check_same_thread=False, isolation_level=None)
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.execute("PRAGMA busy_timeout=30000")
+        return conn
+
+    @property
+    def conn(self) -> sqlite3.Connection:
+        """Per-thread connection (Flask and the tool pool call in from many threads)"""
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = self._local.conn = self._connect()
+        return conn
+
+    def _query(self, sql, params=()):
+        return self.conn.execute(sql, params).fetchall()
+
+    def _requests_where(self, where='', params=()):
+        rows = self._query(
+            f"SELECT id, {', '.join(REQUEST_FIELDS)} FROM help_requests {where}", params
+        )
+        return _rows_to_dict(rows, REQUEST_FIELDS)
+
+    # Help requests
+
+    def create_help_request(self, question, caller_phone, tenant=None):
+        request_id = generate_push_id()
+        self.conn.execute(
+            "INSERT INTO help_requests (id, question, caller_phone, status, created_at, tenant_id) "
+            "VALUES (?, ?, ?, 'pending', ?, ?)",
+            (request_id, question, caller_phone, datetime.utcnow().isoformat(), tenant_key(tenant)),
+        )
+        return request_id
+
+    def get_help_request(self, request_id):
+        request = self._requests_where("WHERE id = ?", (request_id,)).get(request_id)
+        if request is not None:
+            request['subscribers'] = self._subscribers(request_id)
+        return request
+
+    def _subscribers(self, request_id):
+        rows = self._query("SELECT caller_phone FROM request_subscribers WHERE request_id = ? ORDER BY rowid", (request_id,))
+        return [row[0] for row in rows]
+
+    def get_pending_requests(self):
+        return self._requests_where("WHERE status = 'pending' ORDER BY created_at")
+
+    def get_all_requests(self):
+        return self._requests_where("ORDER BY id")
+
+    def get_requests_page(self, status, limit=50, cursor=None, start=None, end=None):
+        field = order_field(status)
+        where, params = self._range_clause(field, cursor, start, end)
+        rows = self._query(
+            f"SELECT id, {', '.join(REQUEST_FIELDS)} FROM help_requests WHERE status = ? {where} "
+            f"ORDER BY {field} DESC, id DESC LIMIT ?",
+            (status, *params, limit + 1),
+        )
+        return paginate(list(_rows_to_dict(rows, REQUEST_FIELDS).items()), limit, field)
+
+    @staticmethod
+    def _range_clause(field, cursor, start, end):
+        clauses, params = [], []
+        if start:
+            clauses.append(f"{field} >= ?")
+            params.append(start)
+        if end:
+            clauses.append(f"{field} < ?")
+            params.append(end)
+        position = decode_cursor(cursor)
+        if position:
+            clauses.append(f"({field} < ? OR ({field} = ? AND id < ?))")
+            params.extend([position[0], position[0], position[1]])
+        return ''.join(f" AND {clause}" for clause in clauses), params
+
+    def get_requests_created_since(self, created_at):
+        return self._requests_where("WHERE created_at >= ? ORDER BY created_at", (created_at,))
+
+    def update_request_with_answer(self, request_id, answer):
+        self.conn.execute(
+            "UPDATE help_requests SET status = 'resolved', supervisor_answer = ?, resolved_at = ? WHERE id = ?",
+            (answer, datetime.utcnow().isoformat(), request_id),
+        )
+
+    def resolve_request(self, request_id, answer):
+        conn = self.conn
+        now = datetime.utcnow().isoformat()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            request = self.get_help_request(request_id)
+            if request and request['status'] == 'pending':
+                conn.execute(
+                    "UPDATE help_requests SET status = 'resolved', supervisor_answer = ?, resolved_at = ? WHERE id = ?",
+                    (answer, now, request_id),
+                )
+                conn.execute(
+                    "INSERT INTO knowledge_base (id, question, answer, learned_from_request_id, created_at, tenant_id) "
+                    "VALUES (?, ?, ?, ?, ?, ?)",
+                    (request_id, request['question'].lower().strip(), answer, request_id, now, request['tenant_id']),
+                )
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        return request
+
+    def add_subscriber(self, request_id, caller_phone):
+        conn = self.conn
+        # Same write lock as resolve_request, so an answer can't slip in between
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            pending = self._query("SELECT 1 FROM help_requests WHERE id = ? AND status = 'pending'", (request_id,))
+            if pending:
+                conn.execute(
+                    "INSERT OR IGNORE INTO request_subscribers (request_id, caller_phone) VALUES (?, ?)",
+                    (request_id, caller_phone),
+                )
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        return bool(pending)
+
+    def mark_request_unresolved(self, request_id):
+        self.conn.execute(
+            "UPDATE help_requests SET status = 'unresolved', resolved_at = ? WHERE id = ?",
+            (datetime.utcnow().isoformat(), request_id),
+        )
+
+    def mark_requests_unresolved(self, request_ids):
+        if not request_ids:
+            return []
+        placeholders = ', '.join('?' for _ in request_ids)
+        rows = self._query(
+            f"UPDATE help_requests SET status = 'unresolved', resolved_at = ? "
+            f"WHERE id IN ({placeholders}) AND status = 'pending' RETURNING id",
+            (datetime.utcnow().isoformat(), *request_ids),
+        )
+        return [row[0] for row in rows]
+
+    # Knowledge base
+
+    def add_to_knowledge_base(self, question, answer, request_id=None, tenant=None):
+        entry_id = generate_push_id()
+        self.conn.execute(
+            "INSERT INTO knowledge_base (id, question, answer, learned_from_request_id, created_at, tenant_id) "
+            "VALUES (?, ?, ?, ?, ?, ?)",
+            (entry_id, question.lower().strip(), answer, request_id, datetime.utcnow().isoformat(), tenant_key(tenant)),
+        )
+        return entry_id
+
+    def add_kb_entries(self, entries, tenant=None):
+        tenant = tenant_key(tenant)
+        now = datetime.utcnow().isoformat()
+        rows = [
+            (generate_push_id(), entry['question'].lower().strip(), entry.get('answer'),
+             entry.get('learned_from_request_id'), entry.get('created_at') or now, tenant)
+            for entry in entries
+        ]
+        conn = self.conn
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            before = self.get_kb_version(tenant)
+            conn.executemany(
+                "INSERT INTO knowledge_base (id, question, answer, learned_from_request_id, created_at, tenant_id) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                rows,
+            )
+            after = self.get_kb_version(tenant)
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+
+        # If the search index was current before this batch, extend it instead of re-reading the table
+        if rows and self._kb_synced_versions.get(tenant) == before:
+            index = self._get_kb_index(tenant)
+            for entry_id, question, answer, *_ in rows:
+                index.add(entry_id, question, answer)
+            self._kb_synced_versions[tenant] = after
+        return [row[0] for row in rows]
+
+    def count_kb_entries(self, tenant=None):
+        return self._query("SELECT COUNT(*) FROM knowledge_base WHERE tenant_id = ?", (tenant_key(tenant),))[0][0]
+
+    def get_all_knowledge_base(self, tenant=None):
+        rows = self._query(
+            f"SELECT id, {', '.join(KB_FIELDS)} FROM knowledge_base WHERE tenant_id = ? ORDER BY id",
+            (tenant_key(tenant),),
+        )
+        return _rows_to_dict(rows, KB_FIELDS)
+
+    def get_kb_page(self, limit=50, cursor=None, start=None, end=None, tenant=None):
+        where, params = self._range_clause('created_at', cursor, start, end)
+        rows = self._query(
+            f"SELECT id, {', '.join(KB_FIELDS)} FROM knowledge_base WHERE tenant_id = ? {where} "
+            f"ORDER BY created_at DESC, id DESC LIMIT ?",
+            (tenant_key(tenant), *params, limit + 1),
+        )
+        return paginate(list(_rows_to_dict(rows, KB_FIELDS).items()), limit, 'created_at')
+
+    def get_kb_version(self, tenant=None) -> int:
+        """Bumped by triggers on every write to the tenant's KB, from any process"""
+        rows = self._query("SELECT value FROM meta WHERE key = ?", (f'kb_version:{tenant_key(tenant)}',))
+        return rows[0][0] if rows else 0
+
+    def synced_kb_index(self, tenant=None):
+        # Skip the table read entirely when nothing changed since the last sync
+        tenant = tenant_key(tenant)
+        version = self.get_kb_version(tenant)
+        index = self._get_kb_index(tenant)
+        if version != self._kb_synced_versions.get(tenant):
+            index.sync(self.get_all_knowledge_base(tenant))
+            self._kb_synced_versions[tenant] = version
+        return index
+
+    # Live pending queue
+
+    def pending_event_source(self):
+        return RequestEventLog(self)
+
+    # Dashboard counters
+
+    def get_stats(self):
+        stats = {status: 0 for status in STAT_KEYS}
+        stats.update(self._query("SELECT status, count FROM request_stats"))
+        stats['total_kb_entries'] = self._query("SELECT value FROM meta WHERE key = 'kb_entries'")[0][0]
+        return stats
+
+    def rebuild_stats(self):
+        conn = self.conn
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            conn.execute("DELETE FROM request_stats")
+            conn.execute(
+                "INSERT INTO request_stats (status, count) SELECT status, COUNT(*) FROM help_requests GROUP BY status"
+            )
+            conn.execute(
+                "INSERT INTO meta (key, value) SELECT 'kb_entries', COUNT(*) FROM knowledge_base "
+                "WHERE true ON CONFLICT (key) DO UPDATE SET value = excluded.value"
+            )
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        return self.get_stats()
+
+
+class RequestEventLog:
+    """Replays the request_events table as put events on a virtual pending node.
+
+    One poller thread per listener reads only rows newer than the last one
+    it saw, which is an index range scan on the primary key, and the log is
+    trimmed to the newest `keep` rows as it goes.
+    """
+
+    def __init__(self, store: SQLiteStore, poll_seconds: float = None, keep: int = 10000):
+        self.store = store
+        self.poll_seconds = poll_seconds if poll_seconds is not None else float(os.getenv('SQLITE_EVENT_POLL_SECONDS', 1))
+        self.keep = keep
+
+    def listen(self, callback):
+        stop = threading.Event()
+        last_seq = self.store._query("SELECT COALESCE(MAX(seq), 0) FROM request_events")[0][0]
+        callback(ChangeEvent('put', '/', self.store.get_pending_requests()))
+        thread = threading.Thread(
+            target=self._poll, args=(callback, last_seq, stop), name='sqlite-request-events', daemon=True,
+        )
+        thread.start()
+        return _PollRegistration(stop)
+
+    def _poll(self, callback, last_seq, stop):
+        while not stop.wait(self.poll_seconds):
+            try:
+                last_seq = self.poll_once(callback, last_seq)
+            except Exception as e:
+                print(f"⚠️ Error reading request events: {e}")
+
+    def poll_once(self, callback, last_seq: int) -> int:
+        """Deliver events after last_seq; returns the new high-water mark"""
+        rows = self.store._query(
+            "SELECT seq, request_id, status FROM request_events WHERE seq > ? ORDER BY seq", (last_seq,)
+        )
+        for seq, request_id, status in rows:
+            data = self.store.get_help_request(request_id) if status == 'pending' else None
+            callback(ChangeEvent('put', f'/{request_id}', data))
+            last_seq = seq
+        if rows and last_seq % 1000 < len(rows):
+            self.store.conn.execute("DELETE FROM request_events WHERE seq <= ?", (last_seq - self.keep,))
+        return last_seq
+
+
+class _PollRegistration:
+    def __init__(self, stop: threading.Event):
+        self._stop = stop
+
+    def close(self):
+        self._stop.set()
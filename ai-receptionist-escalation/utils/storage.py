@@ -0,0 +1,300 @@
+"""
+Storage backends for help requests and the knowledge base.
+
+STORAGE_BACKEND selects the implementation:
+- firebase (default): Firebase Realtime Database via firebase-admin
+- sqlite: local SQLite file (SQLITE_DB_PATH), no network required
+
+Knowledge base methods take an optional `tenant`: every business profile
+(see agent/tenants.py) has its own KB partition, and None means the
+default tenant, which keeps the original single-salon layout.
+"""
+
+import os
+import re
+from datetime import datetime, timedelta
+
+from utils.kb_index import KnowledgeBaseIndex
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+REQUEST_STATUSES = ('pending', 'resolved', 'unresolved')
+STAT_KEYS = REQUEST_STATUSES + ('total_kb_entries',)
+
+DEFAULT_TENANT = 'default'
+_TENANT_ID = re.compile(r'^[A-Za-z0-9_-]{1,64}$')
+
+
+def tenant_key(tenant: str = None) -> str:
+    """Validated tenant ID (safe inside database paths), DEFAULT_TENANT for None"""
+    tenant = tenant or DEFAULT_TENANT
+    if not _TENANT_ID.match(tenant):
+        raise ValueError(f"Invalid tenant ID '{tenant}'")
+    return tenant
+
+
+def subscribers_of(request: dict) -> list[str]:
+    """Every caller waiting on a request: the original caller, then the ones attached later"""
+    phones = [request.get('caller_phone')]
+    # Firebase keeps {phone: true}, SQLite returns a list
+    for phone in request.get('subscribers') or []:
+        if phone not in phones:
+            phones.append(phone)
+    return [phone for phone in phones if phone]
+
+
+class StorageBackend:
+    """Data access shared by the agent and the supervisor UI.
+
+    Records are returned the way Firebase returns them: dicts keyed by ID.
+    """
+
+    # Help requests
+
+    def create_help_request(self, question, caller_phone, tenant=None):
+        """Create a new help request and return its ID"""
+        raise NotImplementedError
+
+    def get_help_request(self, request_id):
+        """Get one help request, or None"""
+        raise NotImplementedError
+
+    def get_pending_requests(self):
+        """Get all pending help requests"""
+        raise NotImplementedError
+
+    def get_all_requests(self):
+        """Get all help requests with history"""
+        raise NotImplementedError
+
+    def get_requests_created_since(self, created_at):
+        """Requests (any status) with created_at >= the given ISO timestamp"""
+        raise NotImplementedError
+
+    def update_request_with_answer(self, request_id, answer):
+        """Mark request as resolved with supervisor answer"""
+        raise NotImplementedError
+
+    def resolve_request(self, request_id, answer):
+        """Resolve a pending request and store its answer in the KB.
+
+        Only one caller can move a request out of pending. SQLite also
+        writes the KB entry in that transaction; Firebase writes it right
+        after the claim, and rebuild_stats backfills any entry a crash in
+        between left out. The answer goes to the KB partition of the
+        request's tenant. The KB entry is keyed by the request ID, so
+        answering twice (or backfilling) can never create a second entry. Returns the request as it was before the call
+        (its status tells whether this call resolved it), or None if missing.
+        """
+        raise NotImplementedError
+
+    def mark_request_unresolved(self, request_id):
+        """Mark request as unresolved due to timeout"""
+        raise NotImplementedError
+
+    def add_subscriber(self, request_id, caller_phone):
+        """Attach another caller to a pending request so they get its answer too.
+
+        Returns False if the request is no longer pending (or the backend
+        can't coalesce), in which case the caller needs a request of their own.
+        """
+        return False
+
+    def get_requests_page(self, status, limit=50, cursor=None, start=None, end=None):
+        """One page of requests with `status`, newest first.
+
+        Pending requests are ordered by created_at, closed ones by
+        resolved_at. `start`/`end` bound that timestamp as ISO strings
+        (start inclusive, end exclusive) and `cursor` is the next_cursor of
+        the previous page. Returns (items, next_cursor) with items a list of
+        (request_id, data); next_cursor is None on the last page.
+        """
+        raise NotImplementedError
+
+    def mark_requests_unresolved(self, request_ids):
+        """Time out a batch of requests; returns the IDs that were still pending"""
+        expired = []
+        for request_id in request_ids:
+            request = self.get_help_request(request_id)
+            if request and request.get('status') == 'pending':
+                self.mark_request_unresolved(request_id)
+                expired.append(request_id)
+        return expired
+
+    # Knowledge base
+
+    def add_to_knowledge_base(self, question, answer, request_id=None, tenant=None):
+        """Add learned Q&A to knowledge base and return the entry ID"""
+        raise NotImplementedError
+
+    def add_kb_entries(self, entries, tenant=None):
+        """Bulk add [{'question', 'answer', optional 'created_at' / 'learned_from_request_id'}].
+
+        Backends write the whole list in one round trip; returns the new IDs
+        in order.
+        """
+        ids = []
+        for entry in entries:
+            ids.append(self.add_to_knowledge_base(
+                entry['question'], entry.get('answer'), entry.get('learned_from_request_id'), tenant=tenant,
+            ))
+        return ids
+
+    def get_all_knowledge_base(self, tenant=None):
+        """Get all KB entries"""
+        raise NotImplementedError
+
+    def iter_knowledge_base(self, tenant=None, page_size=500):
+        """Stream (entry_id, data) pairs page by page, newest first, without loading the whole KB"""
+        cursor = None
+        while True:
+            items, cursor = self.get_kb_page(limit=page_size, cursor=cursor, tenant=tenant)
+            yield from items
+            if not cursor:
+                return
+
+    def get_kb_page(self, limit=50, cursor=None, start=None, end=None, tenant=None):
+        """One page of KB entries, newest created_at first (see get_requests_page)"""
+        raise NotImplementedError
+
+    def get_kb_version(self, tenant=None):
+        """Counter bumped on every write to the tenant's KB, or None if the backend doesn't keep one"""
+        return None
+
+    # Dashboard counters
+
+    def get_stats(self):
+        """Precomputed counters: one per request status plus total_kb_entries"""
+        raise NotImplementedError
+
+    def rebuild_stats(self):
+        """Recount everything and overwrite the counters (reconciliation job)"""
+        raise NotImplementedError
+
+    def count_kb_entries(self, tenant=None):
+        """Number of KB entries of one tenant"""
+        return len(self.get_all_knowledge_base(tenant))
+
+    def _count_kb_entries_by_tenant(self):
+        """Full-scan KB entry counts for every tenant partition"""
+        return {DEFAULT_TENANT: len(self.get_all_knowledge_base())}
+
+    def _count_stats(self, all_requests=None, kb_counts=None):
+        """Full-scan counts used to rebuild the counters (KB entries of all tenants)"""
+        if all_requests is None:
+            all_requests = self.get_all_requests()
+        if kb_counts is None:
+            kb_counts = self._count_kb_entries_by_tenant()
+        stats = {status: 0 for status in REQUEST_STATUSES}
+        for request in all_requests.values():
+            stats[request['status']] = stats.get(request['status'], 0) + 1
+        stats['total_kb_entries'] = sum(kb_counts.values())
+        return stats
+
+    def kb_event_source(self, tenant=None):
+        """Change stream for the tenant's KB (see utils.change_events), or None if unsupported"""
+        return None
+
+    def pending_event_source(self):
+        """Change stream of pending requests keyed by request ID, or None if unsupported"""
+        return None
+
+    def search_knowledge_base(self, question, tenant=None):
+        """Search KB for similar question using simple fuzzy matching.
+
+        Strategy:
+        - Normalize text (lowercase, strip, collapse spaces)
+        - Exact/substring match
+        - Token overlap score (Jaccard) with stopword removal
+        - Fallback to difflib ratio
+        Returns the best answer above threshold, else None.
+
+        Matching runs against an in-memory inverted index; only entries that
+        are new or changed since the last lookup get re-normalized.
+        """
+        return self.synced_kb_index(tenant).search(question)
+
+    def synced_kb_index(self, tenant=None) -> KnowledgeBaseIndex:
+        """The tenant's search index, brought up to date with the stored KB"""
+        index = self._get_kb_index(tenant)
+        index.sync(self.get_all_knowledge_base(tenant))
+        return index
+
+    def check_and_timeout_old_requests(self):
+        """Auto-timeout requests older than threshold"""
+        timeout_hours = float(os.getenv('REQUEST_TIMEOUT_HOURS', 4))
+        pending = self.get_pending_requests()
+
+        timeout_threshold = datetime.utcnow() - timedelta(hours=timeout_hours)
+
+        expired = [
+            req_id for req_id, req_data in pending.items()
+            if datetime.fromisoformat(req_data['created_at']) < timeout_threshold
+        ]
+        for req_id in self.mark_requests_unresolved(expired) if expired else []:
+            print(f"⏰ Request {req_id} auto-timed out after {timeout_hours} hours")
+
+    def _get_kb_index(self, tenant=None) -> KnowledgeBaseIndex:
+        indexes = self.__dict__.setdefault('_kb_indexes', {})
+        tenant = tenant_key(tenant)
+        if tenant not in indexes:
+            indexes[tenant] = KnowledgeBaseIndex()
+        return indexes[tenant]
+
+
+def order_field(status):
+    """Timestamp a request list with this status is ordered by"""
+    return 'created_at' if status == 'pending' else 'resolved_at'
+
+
+def encode_cursor(timestamp, record_id):
+    return f"{timestamp}|{record_id}"
+
+
+def decode_cursor(cursor):
+    """Split a page cursor into (timestamp, record_id); None for a missing or malformed cursor"""
+    if not cursor or '|' not in cursor:
+        return None
+    timestamp, record_id = cursor.rsplit('|', 1)
+    return timestamp, record_id
+
+
+def paginate(rows, limit, field):
+    """Trim rows fetched with limit + 1 and build the cursor for the next page"""
+    if len(rows) <= limit:
+        return rows, None
+    rows = rows[:limit]
+    last_id, last_data = rows[-1]
+    return rows, encode_cursor(last_data.get(field) or '', last_id)
+
+
+_stores = {}
+
+
+def _load_env():
+    try:
+        from dotenv import load_dotenv
+    except ImportError:
+        return
+    load_dotenv('.env.local')
+
+
+def get_storage(backend: str = None) -> StorageBackend:
+    """Process-wide storage backend chosen by STORAGE_BACKEND"""
+    _load_env()
+    backend = (backend or os.getenv('STORAGE_BACKEND', 'firebase')).lower()
+
+    if backend not in _stores:
+        if backend == 'firebase':
+            from utils.firebase_client import FirebaseClient
+            _stores[backend] = FirebaseClient()
+        elif backend == 'sqlite':
+            from utils.sqlite_store import SQLiteStore
+            db_path = os.getenv('SQLITE_DB_PATH', 'receptionist.db')
+            if db_path != ':memory:' and not os.path.isabs(db_path):
+                db_path = os.path.join(PROJECT_ROOT, db_path)
+            _stores[backend] = SQLiteStore(db_path)
+        else:
+            raise ValueError(f"Unknown STORAGE_BACKEND '{backend}' (expected 'firebase' or 'sqlite')")
+
+    return _stores[backend]
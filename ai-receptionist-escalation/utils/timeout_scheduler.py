@@ -0,0 +1,168 @@
+"""
+Deadline-ordered scheduler that times out pending help requests.
+
+Pending requests sit in a heap keyed by created_at + REQUEST_TIMEOUT_HOURS,
+so each one expires close to its own deadline instead of on an hourly
+sweep. Tenants can override the timeout (tenant_timeouts, hours by tenant
+ID). Requests created elsewhere (the agent worker) are picked up with an
+incremental created_at range query that re-reads a trailing overlap
+window (for late writes and clock skew between processes), backed by a
+periodic full resync of the pending queue that catches anything older.
+Every batch of due requests is expired with one storage call.
+"""
+
+import heapq
+import os
+import threading
+from datetime import datetime, timedelta
+
+
+class RequestTimeoutScheduler:
+    def __init__(self, storage, timeout_hours: float = None, clock=None, resync_seconds: float = None,
+                 tenant_timeouts: dict = None, overlap_seconds: float = None, full_resync_seconds: float = None):
+        if timeout_hours is None:
+            timeout_hours = float(os.getenv('REQUEST_TIMEOUT_HOURS', 4))
+        if resync_seconds is None:
+            resync_seconds = float(os.getenv('TIMEOUT_RESYNC_SECONDS', 30))
+        if overlap_seconds is None:
+            overlap_seconds = float(os.getenv('TIMEOUT_RESYNC_OVERLAP_SECONDS', 300))
+        if full_resync_seconds is None:
+            full_resync_seconds = float(os.getenv('TIMEOUT_FULL_RESYNC_SECONDS', 3600))
+        self.storage = storage
+        self.timeout = timedelta(hours=timeout_hours)
+        self.tenant_timeouts = {t: timedelta(hours=h) for t, h in (tenant_timeouts or {}).items()}
+        self.resync_interval = timedelta(seconds=resync_seconds)
+        self.overlap = timedelta(seconds=overlap_seconds)
+        self.full_resync_interval = timedelta(seconds=full_resync_seconds)
+        self.clock = clock or datetime.utcnow
+
+        self._lock = threading.Lock()
+        # Serializes refresh() between the scheduler thread and manual triggers
+        self._refresh_lock = threading.Lock()
+        self._wakeup = threading.Condition(self._lock)
+        self._heap: list[tuple[datetime, str]] = []
+        self._deadlines: dict[str, datetime] = {}
+        self._synced_until = None
+        self._next_resync = None
+        self._next_full_resync = None
+        self._thread = None
+        self._stopping = False
+
+    def timeout_for(self, tenant: str = None) -> timedelta:
+        return self.tenant_timeouts.get(tenant, self.timeout)
+
+    def track(self, request_id: str, created_at: str, tenant: str = None):
+        """Schedule a pending request for timeout"""
+        deadline = datetime.fromisoformat(created_at) + self.timeout_for(tenant)
+        with self._wakeup:
+            if request_id in self._deadlines:
+                return
+            self._deadlines[request_id] = deadline
+            heapq.heappush(self._heap, (deadline, request_id))
+            self._wakeup.notify()
+
+    def discard(self, request_id: str):
+        """Forget a request that was answered"""
+        with self._lock:
+            # The heap entry is skipped lazily when it comes due
+            self._deadlines.pop(request_id, None)
+
+    def __len__(self):
+        return len(self._deadlines)
+
+    def refresh(self, full: bool = None):
+        """Load pending requests: all of them on the first call and every
+        full_resync_interval, otherwise those created since the last refresh
+        (minus the overlap window)"""
+        with self._refresh_lock:
+            self._refresh(full)
+
+    def _refresh(self, full: bool = None):
+        now = self.clock()
+        if full is None:
+            full = self._synced_until is None or now >= self._next_full_resync
+        if full:
+            requests = self.storage.get_pending_requests()
+        else:
+            since = datetime.fromisoformat(self._synced_until) - self.overlap
+            requests = self.storage.get_requests_created_since(since.isoformat())
+
+        for req_id, req_data in requests.items():
+            created_at = req_data.get('created_at')
+            if not created_at:
+                continue
+            if self._synced_until is None or created_at > self._synced_until:
+                self._synced_until = created_at
+            if req_data.get('status', 'pending') == 'pending':
+                self.track(req_id, created_at, req_data.get('tenant_id'))
+        if full:
+            # Forget requests that were answered or timed out elsewhere
+            with self._lock:
+                for req_id in [r for r in self._deadlines if r not in requests]:
+                    del self._deadlines[req_id]
+            self._next_full_resync = now + self.full_resync_interval
+        if self._synced_until is None:
+            self._synced_until = now.isoformat()
+        self._next_resync = now + self.resync_interval
+
+    def next_deadline(self):
+        with self._lock:
+            self._drop_stale()
+            return self._heap[0][0] if self._heap else None
+
+    def run_due(self) -> list[str]:
+        """Expire every request whose deadline has passed; returns the expired IDs"""
+        now = self.clock()
+        due = []
+        with self._lock:
+            self._drop_stale()
+            while self._heap and self._heap[0][0] <= now:
+                _, request_id = heapq.heappop(self._heap)
+                if self._deadlines.pop(request_id, None) is not None:
+                    due.append(request_id)
+                self._drop_stale()
+
+        if not due:
+            return []
+        expired = self.storage.mark_requests_unresolved(due)
+        for request_id in expired:
+            print(f"⏰ Request {request_id} auto-timed out")
+        return expired
+
+    def _drop_stale(self):
+        while self._heap and self._deadlines.get(self._heap[0][1]) != self._heap[0][0]:
+            heapq.heappop(self._heap)
+
+    # Background thread
+
+    def start(self):
+        if self._thread is None:
+            self._stopping = False
+            self._thread = threading.Thread(target=self._run, name='request-timeouts', daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self):
+        with self._wakeup:
+            self._stopping = True
+            self._wakeup.notify()
+
+    def _run(self):
+        while True:
+            try:
+                if self._next_resync is None or self.clock() >= self._next_resync:
+                    self.refresh()
+                self.run_due()
+            except Exception as e:
+                print(f"⚠️ Error in timeout scheduler: {e}")
+
+            wake_at = self._next_resync or self.clock() + self.resync_interval
+            deadline = self.next_deadline()
+            if deadline is not None and deadline < wake_at:
+                wake_at = deadline
+            with self._wakeup:
+                if self._stopping:
+                    return
+                self._wakeup.wait(max((wake_at - self.clock()).total_seconds(), 0.05))
+                if self._stopping:
+                    return
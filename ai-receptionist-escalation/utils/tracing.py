@@ -0,0 +1,231 @@
+"""
+Lightweight per-call tracing and Prometheus-style latency histograms.
+
+Wrap work in `span('kb.lookup')`; the duration lands in the
+receptionist_span_seconds histogram (labelled by span name and status) and,
+when TRACE_LOG_PATH is set, as one JSON line tagged with the room, caller,
+trace ID and turn number of the current call. A span costs two
+perf_counter() calls and one bucket increment, so it is safe to leave on.
+
+The call context lives in a contextvar, so spans opened in tool handlers
+(and the thread-pool calls they make, see agent.tools) are attributed to
+the right call without passing anything around.
+"""
+
+import contextvars
+import json
+import os
+import threading
+import time
+import uuid
+from bisect import bisect_left
+from contextlib import contextmanager
+
+# Seconds; covers ~5ms in-process lookups up to multi-second LLM replies
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+class Histogram:
+    """Cumulative-bucket histogram rendered in the Prometheus text format"""
+
+    def __init__(self, name: str, help_text: str, buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.help = help_text
+        self.buckets = tuple(buckets)
+        self._series: dict[tuple, list] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, **labels):
+        key = tuple(sorted(labels.items()))
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                # Per-bucket counts, then sum and count
+                series = self._series[key] = [0] * (len(self.buckets) + 1) + [0.0, 0]
+            series[index] += 1
+            series[-2] += value
+            series[-1] += 1
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return {key: list(series) for key, series in self._series.items()}
+
+    def render(self) -> list[str]:
+        lines = [f'# HELP {self.name} {self.help}', f'# TYPE {self.name} histogram']
+        for key, series in sorted(self.snapshot().items()):
+            labels = ','.join(f'{name}="{value}"' for name, value in key)
+            prefix = f'{labels},' if labels else ''
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float('inf'),), series):
+                cumulative += count
+                le = '+Inf' if bound == float('inf') else f'{bound:g}'
+                lines.append(f'{self.name}_bucket{{{prefix}le="{le}"}} {cumulative}')
+            suffix = f'{{{labels}}}' if labels else ''
+            lines.append(f'{self.name}_sum{suffix} {series[-2]:.6f}')
+            lines.append(f'{self.name}_count{suffix} {series[-1]}')
+        return lines
+
+
+SPAN_SECONDS = Histogram('receptionist_span_seconds', 'Duration of traced agent and storage operations')
+PIPELINE_SECONDS = Histogram('receptionist_pipeline_seconds', 'STT/LLM/TTS/end-of-utterance latencies reported by LiveKit')
+HISTOGRAMS = [SPAN_SECONDS, PIPELINE_SECONDS]
+
+
+def render_prometheus() -> str:
+    lines = []
+    for histogram in HISTOGRAMS:
+        lines.extend(histogram.render())
+    return '\n'.join(lines) + '\n'
+
+
+# Call context
+
+class CallTrace:
+    """Tags shared by every span of one call; `turn` advances per user turn"""
+
+    def __init__(self, room: str = None, caller: str = None):
+        self.trace_id = uuid.uuid4().hex[:16]
+        self.room = room
+        self.caller = caller
+        self.turn = 0
+
+    def next_turn(self) -> int:
+        self.turn += 1
+        return self.turn
+
+
+_current_call: contextvars.ContextVar = contextvars.ContextVar('current_call', default=None)
+
+
+def start_call(room: str = None, caller: str = None) -> CallTrace:
+    """Attach a new CallTrace to the current context (tasks created later inherit it)"""
+    call = CallTrace(room, caller)
+    _current_call.set(call)
+    return call
+
+
+def current_call() -> CallTrace | None:
+    return _current_call.get()
+
+
+# JSON trace log
+
+_log_lock = threading.Lock()
+_log_file = None
+
+
+def _trace_log():
+    global _log_file
+    path = os.getenv('TRACE_LOG_PATH')
+    if not path:
+        return None
+    if _log_file is None:
+        with _log_lock:
+            if _log_file is None:
+                _log_file = open(path, 'a', buffering=1)
+    return _log_file
+
+
+def _log_span(name: str, started: float, duration: float, status: str, tags: dict):
+    log = _trace_log()
+    if log is None:
+        return
+    call = current_call()
+    record = {
+        'ts': started,
+        'span': name,
+        'duration_ms': round(duration * 1000, 3),
+        'status': status,
+        'trace_id': call.trace_id if call else None,
+        'room': call.room if call else None,
+        'caller': call.caller if call else None,
+        'turn': call.turn if call else None,
+    }
+    record.update(tags)
+    line = json.dumps(record, default=str)
+    with _log_lock:
+        log.write(line + '\n')
+
+
+@contextmanager
+def span(name: str, **tags):
+    """Time a block; yields a dict the block can add tags (or 'status') to"""
+    started_wall = time.time()
+    started = time.perf_counter()
+    extra = dict(tags)
+    status = 'ok'
+    try:
+        yield extra
+    except BaseException:
+        status = 'error'
+        raise
+    finally:
+        duration = time.perf_counter() - started
+        status = extra.pop('status', status)
+        SPAN_SECONDS.observe(duration, span=name, status=status)
+        _log_span(name, started_wall, duration, status, extra)
+
+
+def record(name: str, seconds: float, histogram: Histogram = PIPELINE_SECONDS, **tags):
+    """Record a duration measured elsewhere (e.g. by LiveKit)"""
+    if seconds is None or seconds < 0:
+        return
+    histogram.observe(seconds, stage=name)
+    _log_span(name, time.time() - seconds, seconds, 'ok', tags)
+
+
+# LiveKit metrics_collected events -> (stage, attribute) pairs
+_PIPELINE_FIELDS = {
+    'STTMetrics': [('stt_duration', 'duration')],
+    'LLMMetrics': [('llm_ttft', 'ttft'), ('llm_duration', 'duration')],
+    'TTSMetrics': [('tts_ttfb', 'ttfb'), ('tts_duration', 'duration')],
+    'EOUMetrics': [('eou_delay', 'end_of_utterance_delay'), ('transcription_delay', 'transcription_delay')],
+    'VADMetrics': [],
+}
+
+
+def record_pipeline_metrics(metrics):
+    """Feed one livekit.agents metrics object into PIPELINE_SECONDS"""
+    speech_id = getattr(metrics, 'speech_id', None)
+    for stage, attribute in _PIPELINE_FIELDS.get(type(metrics).__name__, []):
+        record(stage, getattr(metrics, attribute, None), speech_id=speech_id)
+
+
+# Exporter
+
+def start_metrics_server(port: int = None, attempts: int = None):
+    """Serve /metrics on METRICS_PORT from a daemon thread (no-op when unset).
+
+    Agent job processes each call this, so the next free port out of
+    METRICS_PORT_RANGE consecutive ports is used.
+    """
+    port = port or int(os.getenv('METRICS_PORT', 0))
+    if not port:
+        return None
+    attempts = attempts or int(os.getenv('METRICS_PORT_RANGE', 8))
+
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+    class MetricsHandler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            body = render_prometheus().encode('utf-8')
+            self.send_response(200)
+            self.send_header('Content-Type', 'text/plain; version=0.0.4')
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    for candidate in range(port, port + attempts):
+        try:
+            server = ThreadingHTTPServer(('0.0.0.0', candidate), MetricsHandler)
+        except OSError:
+            continue
+        threading.Thread(target=server.serve_forever, name='metrics-http', daemon=True).start()
+        print(f"📈 Metrics on http://0.0.0.0:{candidate}/metrics")
+        return server
+    print(f"⚠️ Could not start metrics server: ports {port}-{port + attempts - 1} are busy")
+    return None